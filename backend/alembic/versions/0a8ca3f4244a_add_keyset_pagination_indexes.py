@@ -0,0 +1,48 @@
+"""Add composite indexes for keyset pagination
+
+Revision ID: 0a8ca3f4244a
+Revises: 6de4c97e21f6
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a8ca3f4244a'
+down_revision: Union[str, None] = '6de4c97e21f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block, and it keeps
+    # media_items writable while the indexes are being built.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_media_items_created_at_id', 'media_items', ['created_at', 'id'],
+                        unique=False, postgresql_concurrently=True)
+        op.create_index('ix_media_items_user_id_created_at_id', 'media_items', ['user_id', 'created_at', 'id'],
+                        unique=False, postgresql_concurrently=True)
+        op.create_index('ix_media_items_sighting_timestamp_id', 'media_items',
+                        [sa.text('sighting_timestamp DESC NULLS LAST'), sa.text('id DESC')],
+                        unique=False, postgresql_concurrently=True)
+        op.create_index('ix_validation_votes_media_item_id_created_at_id', 'validation_votes',
+                        ['media_item_id', 'created_at', 'id'],
+                        unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_validation_votes_media_item_id_created_at_id', table_name='validation_votes',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_media_items_sighting_timestamp_id', table_name='media_items',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_media_items_user_id_created_at_id', table_name='media_items',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_media_items_created_at_id', table_name='media_items',
+                      postgresql_concurrently=True)
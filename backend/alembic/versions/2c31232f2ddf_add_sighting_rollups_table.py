@@ -0,0 +1,57 @@
+"""Add sighting_rollups table
+
+Revision ID: 2c31232f2ddf
+Revises: 0a8ca3f4244a
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c31232f2ddf'
+down_revision: Union[str, None] = '0a8ca3f4244a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BACKFILL_SQL = """
+INSERT INTO sighting_rollups (granularity, period_start, cell_lat, cell_lon, species, health_status, sighting_count)
+SELECT '{granularity}', {period}, floor(latitude / 1.0)::int, floor(longitude / 1.0)::int,
+       coalesce(validated_species, species_ai_prediction), coalesce(validated_health_status, health_status_ai_prediction),
+       count(*)
+FROM media_items
+WHERE latitude IS NOT NULL AND longitude IS NOT NULL AND sighting_timestamp IS NOT NULL
+  AND coalesce(validated_species, species_ai_prediction) IS NOT NULL
+  AND coalesce(validated_health_status, health_status_ai_prediction) IS NOT NULL
+GROUP BY 2, 3, 4, 5, 6
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sighting_rollups',
+        sa.Column('granularity', sa.String(length=5), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('cell_lat', sa.Integer(), nullable=False),
+        sa.Column('cell_lon', sa.Integer(), nullable=False),
+        sa.Column('species', sa.String(), nullable=False),
+        sa.Column('health_status', sa.String(), nullable=False),
+        sa.Column('sighting_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('granularity', 'period_start', 'cell_lat', 'cell_lon', 'species', 'health_status')
+    )
+    op.create_index('ix_sighting_rollups_species_period', 'sighting_rollups',
+                    ['granularity', 'species', 'period_start'], unique=False)
+
+    # Seed the rollups from the existing sightings (same logic as rollup_service.rebuild_rollups)
+    op.execute(BACKFILL_SQL.format(granularity="day", period="(sighting_timestamp AT TIME ZONE 'UTC')::date"))
+    op.execute(BACKFILL_SQL.format(granularity="month", period="date_trunc('month', sighting_timestamp AT TIME ZONE 'UTC')::date"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sighting_rollups_species_period', table_name='sighting_rollups')
+    op.drop_table('sighting_rollups')
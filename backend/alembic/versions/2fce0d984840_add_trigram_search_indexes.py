@@ -0,0 +1,44 @@
+"""Add pg_trgm indexes for species/health search
+
+Revision ID: 2fce0d984840
+Revises: 2c31232f2ddf
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2fce0d984840'
+down_revision: Union[str, None] = '2c31232f2ddf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# index name -> searched column. app.crud.text_search always compares against lower(column).
+TRIGRAM_INDEXES = {
+    'ix_media_items_species_ai_prediction_trgm': 'species_ai_prediction',
+    'ix_media_items_validated_species_trgm': 'validated_species',
+    'ix_media_items_health_status_ai_prediction_trgm': 'health_status_ai_prediction',
+    'ix_media_items_validated_health_status_trgm': 'validated_health_status',
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for index_name, column in TRIGRAM_INDEXES.items():
+            op.create_index(index_name, 'media_items', [sa.text(f'lower({column}) gin_trgm_ops')],
+                            unique=False, postgresql_using='gin', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for index_name in TRIGRAM_INDEXES:
+            op.drop_index(index_name, table_name='media_items', postgresql_concurrently=True)
+    # The pg_trgm extension is left installed; other objects may depend on it.
@@ -0,0 +1,32 @@
+"""Add leaderboard index on users (score, id)
+
+Revision ID: 5b8e2d7a4c19
+Revises: c49aa31da47e
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8e2d7a4c19'
+down_revision: Union[str, None] = 'c49aa31da47e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_users_score_id', 'users',
+                        [sa.text('score DESC'), sa.text('id DESC')],
+                        unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_score_id', table_name='users', postgresql_concurrently=True)
@@ -0,0 +1,69 @@
+"""Add generated effective_species / effective_health columns
+
+Revision ID: 606e484ef084
+Revises: 2fce0d984840
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '606e484ef084'
+down_revision: Union[str, None] = '2fce0d984840'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Trigram indexes made redundant by searching the effective columns directly.
+SUPERSEDED_TRIGRAM_INDEXES = {
+    'ix_media_items_validated_species_trgm': 'validated_species',
+    'ix_media_items_health_status_ai_prediction_trgm': 'health_status_ai_prediction',
+    'ix_media_items_validated_health_status_trgm': 'validated_health_status',
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NOTE: adding a STORED generated column rewrites media_items under an exclusive lock.
+    op.add_column('media_items', sa.Column(
+        'effective_species', sa.String(),
+        sa.Computed('COALESCE(validated_species, species_ai_prediction)', persisted=True), nullable=True))
+    op.add_column('media_items', sa.Column(
+        'effective_health', sa.String(),
+        sa.Computed('COALESCE(validated_health_status, health_status_ai_prediction)', persisted=True), nullable=True))
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_media_items_effective_species', 'media_items', ['effective_species'],
+                        unique=False, postgresql_concurrently=True)
+        op.create_index('ix_media_items_effective_health', 'media_items', ['effective_health'],
+                        unique=False, postgresql_concurrently=True)
+        op.create_index('ix_media_items_effective_species_sighting_timestamp', 'media_items',
+                        ['effective_species', 'sighting_timestamp'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_media_items_effective_species_trgm', 'media_items',
+                        [sa.text('lower(effective_species) gin_trgm_ops')],
+                        unique=False, postgresql_using='gin', postgresql_concurrently=True)
+        op.create_index('ix_media_items_effective_health_trgm', 'media_items',
+                        [sa.text('lower(effective_health) gin_trgm_ops')],
+                        unique=False, postgresql_using='gin', postgresql_concurrently=True)
+        for index_name in SUPERSEDED_TRIGRAM_INDEXES:
+            op.drop_index(index_name, table_name='media_items', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for index_name, column in SUPERSEDED_TRIGRAM_INDEXES.items():
+            op.create_index(index_name, 'media_items', [sa.text(f'lower({column}) gin_trgm_ops')],
+                            unique=False, postgresql_using='gin', postgresql_concurrently=True)
+        op.drop_index('ix_media_items_effective_health_trgm', table_name='media_items', postgresql_concurrently=True)
+        op.drop_index('ix_media_items_effective_species_trgm', table_name='media_items', postgresql_concurrently=True)
+        op.drop_index('ix_media_items_effective_species_sighting_timestamp', table_name='media_items',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_media_items_effective_health', table_name='media_items', postgresql_concurrently=True)
+        op.drop_index('ix_media_items_effective_species', table_name='media_items', postgresql_concurrently=True)
+    op.drop_column('media_items', 'effective_health')
+    op.drop_column('media_items', 'effective_species')
@@ -0,0 +1,56 @@
+"""Add validation_tallies table
+
+Revision ID: 6e05faa6c0be
+Revises: 606e484ef084
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e05faa6c0be'
+down_revision: Union[str, None] = '606e484ef084'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BACKFILL_SQL = """
+INSERT INTO validation_tallies (media_item_id, attribute, kind, value, vote_count)
+SELECT media_item_id, '{attribute}', 'confirm', '', count(*)
+FROM validation_votes
+WHERE {vote_column} IS TRUE
+GROUP BY media_item_id
+UNION ALL
+SELECT media_item_id, '{attribute}', 'correction', {corrected_column}, count(*)
+FROM validation_votes
+WHERE {vote_column} IS FALSE AND coalesce({corrected_column}, '') <> ''
+GROUP BY media_item_id, {corrected_column}
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('validation_tallies',
+        sa.Column('media_item_id', sa.Integer(), nullable=False),
+        sa.Column('attribute', sa.String(length=10), nullable=False),
+        sa.Column('kind', sa.String(length=10), nullable=False),
+        sa.Column('value', sa.String(length=255), nullable=False),
+        sa.Column('vote_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['media_item_id'], ['media_items.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('media_item_id', 'attribute', 'kind', 'value')
+    )
+
+    # Seed the tallies from the existing votes (same rules as crud_validation_tally.tally_entries)
+    op.execute(BACKFILL_SQL.format(attribute="species", vote_column="vote_on_species",
+                                   corrected_column="corrected_species_name"))
+    op.execute(BACKFILL_SQL.format(attribute="health", vote_column="vote_on_health",
+                                   corrected_column="corrected_health_status"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('validation_tallies')
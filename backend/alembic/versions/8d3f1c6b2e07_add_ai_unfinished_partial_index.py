@@ -0,0 +1,35 @@
+"""Add partial index on media items with unfinished AI processing
+
+Revision ID: 8d3f1c6b2e07
+Revises: 5b8e2d7a4c19
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d3f1c6b2e07'
+down_revision: Union[str, None] = '5b8e2d7a4c19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The list, per-user and map orderings are already served by the keyset pagination
+    # indexes (0a8ca3f4244a); this adds the one hot filter still without an index.
+    # Nearly every item is 'completed', so the partial index stays tiny.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_media_items_ai_unfinished', 'media_items', ['ai_processing_status', 'updated_at'],
+                        unique=False, postgresql_concurrently=True,
+                        postgresql_where=sa.text("ai_processing_status <> 'completed'"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_media_items_ai_unfinished', table_name='media_items', postgresql_concurrently=True)
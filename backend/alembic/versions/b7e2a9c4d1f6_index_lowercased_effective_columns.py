@@ -0,0 +1,48 @@
+"""Index lower(effective_species / effective_health) instead of the raw columns
+
+Revision ID: b7e2a9c4d1f6
+Revises: 8d3f1c6b2e07
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2a9c4d1f6'
+down_revision: Union[str, None] = '8d3f1c6b2e07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Every filter goes through text_match, which compares lower(column): btree indexes on the
+# raw columns (606e484ef084) are never used, so they are replaced by expression indexes.
+# (new index, expressions, raw-column index it replaces, its columns)
+INDEXES = [
+    ('ix_media_items_effective_species_lower', ['lower(effective_species)'],
+     'ix_media_items_effective_species', ['effective_species']),
+    ('ix_media_items_effective_health_lower', ['lower(effective_health)'],
+     'ix_media_items_effective_health', ['effective_health']),
+    ('ix_media_items_effective_species_lower_sighting_timestamp', ['lower(effective_species)', 'sighting_timestamp'],
+     'ix_media_items_effective_species_sighting_timestamp', ['effective_species', 'sighting_timestamp']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for index_name, expressions, old_index_name, _ in INDEXES:
+            op.create_index(index_name, 'media_items', [sa.text(expression) for expression in expressions],
+                            unique=False, postgresql_concurrently=True)
+            op.drop_index(old_index_name, table_name='media_items', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for index_name, _, old_index_name, columns in INDEXES:
+            op.create_index(old_index_name, 'media_items', columns, unique=False, postgresql_concurrently=True)
+            op.drop_index(index_name, table_name='media_items', postgresql_concurrently=True)
@@ -0,0 +1,70 @@
+"""Add validation queue columns and partial priority index
+
+Revision ID: c49aa31da47e
+Revises: 6e05faa6c0be
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c49aa31da47e'
+down_revision: Union[str, None] = '6e05faa6c0be'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BACKFILL_COUNTS_SQL = """
+UPDATE media_items
+SET validation_vote_count = tallies.total_votes, validation_leading_count = tallies.leading_count
+FROM (
+    SELECT media_item_id, sum(vote_count) AS total_votes, max(vote_count) AS leading_count
+    FROM validation_tallies
+    WHERE vote_count > 0
+    GROUP BY media_item_id
+) AS tallies
+WHERE media_items.id = tallies.media_item_id
+"""
+
+# validation_service.validation_priority as of this revision (CONSENSUS_THRESHOLD = 3).
+# Only items that can appear in the queue need it; the app keeps it current from now on.
+BACKFILL_PRIORITY_SQL = """
+UPDATE media_items
+SET validation_priority = round((
+      0.5 * (1 - least(greatest(coalesce(ai_confidence_score, 0.5), 0), 1))
+    + 0.3 / (1 + validation_vote_count)
+    + 0.2 * least(validation_leading_count, 2) / 2.0
+)::numeric, 6)
+WHERE is_validated_by_community = false AND ai_processing_status = 'completed'
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('media_items', sa.Column('validation_vote_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('media_items', sa.Column('validation_leading_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('media_items', sa.Column('validation_priority', sa.Float(), server_default='0', nullable=False))
+    op.execute(BACKFILL_COUNTS_SQL)
+    op.execute(BACKFILL_PRIORITY_SQL)
+
+    # Partial index: only items still waiting for consensus are indexed, so the queue
+    # query is a short index range scan however many items are already validated.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_media_items_validation_queue', 'media_items',
+                        [sa.text('validation_priority DESC'), sa.text('id DESC')],
+                        unique=False, postgresql_concurrently=True,
+                        postgresql_where=sa.text("is_validated_by_community = false AND ai_processing_status = 'completed'"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_media_items_validation_queue', table_name='media_items',
+                      postgresql_concurrently=True)
+    op.drop_column('media_items', 'validation_priority')
+    op.drop_column('media_items', 'validation_leading_count')
+    op.drop_column('media_items', 'validation_vote_count')
@@ -5,6 +5,7 @@ from app.api.v1.endpoints import media
 from app.api.v1.endpoints import map
 from app.api.v1.endpoints import validation
 from app.api.v1.endpoints import research  # <-- THIS IMPORT IS CRUCIAL
+from app.api.v1.endpoints import gamification
 
 api_v1_router = APIRouter()
 
@@ -13,3 +14,4 @@ api_v1_router.include_router(media.router, prefix="/media", tags=["Media"])
 api_v1_router.include_router(map.router, prefix="/map", tags=["Map"])
 api_v1_router.include_router(validation.router, prefix="/validation", tags=["Validation"])
 api_v1_router.include_router(research.router, prefix="/research", tags=["Research"])  # <-- THIS INCLUDE IS CRUCIAL
+api_v1_router.include_router(gamification.router, prefix="/gamification", tags=["Gamification"])
@@ -1,13 +1,14 @@
 # E:\Marine_life\backend\app\api\v1\endpoints\gamification.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession  # For async DB operations (not used directly)
-from typing import List  # For type hinting (not used directly)
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession  # For async DB operations
+from typing import List, Optional  # For type hinting
 
 from app import schemas            # For schemas.User
 from app import crud              # For accessing CRUD operations (e.g., crud_user)
-from app.db.database import get_db  # For DB session (not used directly)
+from app.db.database import get_read_db  # For DB session
 from app.core.security import get_current_active_user  # To retrieve current user
+from app.crud.pagination import InvalidCursorError, NEXT_CURSOR_HEADER, next_cursor_for
 from app.models.user import User as UserModel  # SQLAlchemy model for User
 
 router = APIRouter()
@@ -27,3 +28,67 @@ async def get_my_gamification_data(
     # The current_user object (SQLAlchemy model) already has score and earned_badges loaded.
     # FastAPI's response_model=schemas.User will automatically serialize these.
     return current_user
+
+
+def _entries(users: List[UserModel], first_rank: int) -> List[schemas.LeaderboardEntry]:
+    return [
+        schemas.LeaderboardEntry(
+            rank=first_rank + offset, user_id=user.id, username=user.username,
+            score=user.score, earned_badges=user.earned_badges,
+        )
+        for offset, user in enumerate(users)
+    ]
+
+@router.get(
+    "/leaderboard",
+    response_model=List[schemas.LeaderboardEntry],
+    summary="Get the leaderboard",
+    description="Users ranked by score. Paginate with the cursor from the X-Next-Cursor response header."
+)
+async def get_leaderboard(
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+):
+    try:
+        users = await crud.crud_user.get_leaderboard(db, limit=limit, cursor=cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if not users:
+        return []
+    # Without a cursor the page starts at rank 1; later pages look up their first row's rank.
+    first_rank = 1 if cursor is None else await crud.crud_user.get_leaderboard_rank(db, users[0].score, users[0].id)
+    next_cursor = next_cursor_for(users, limit, "score")
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return _entries(users, first_rank)
+
+@router.get(
+    "/leaderboard/me",
+    response_model=schemas.LeaderboardEntry,
+    summary="Get my leaderboard rank"
+)
+async def get_my_rank(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserModel = Depends(get_current_active_user)
+):
+    rank = await crud.crud_user.get_leaderboard_rank(db, current_user.score, current_user.id)
+    return _entries([current_user], rank)[0]
+
+@router.get(
+    "/leaderboard/around-me",
+    response_model=List[schemas.LeaderboardEntry],
+    summary="Get the users ranked around me",
+    description="Returns up to `radius` users ranked directly above the current user, the user, and up to `radius` below."
+)
+async def get_leaderboard_around_me(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserModel = Depends(get_current_active_user),
+    radius: int = Query(5, ge=1, le=50),
+):
+    rank = await crud.crud_user.get_leaderboard_rank(db, current_user.score, current_user.id)
+    above, below = await crud.crud_user.get_leaderboard_neighbours(
+        db, score=current_user.score, user_id=current_user.id, radius=radius
+    )
+    return _entries(above + [current_user] + below, rank - len(above))
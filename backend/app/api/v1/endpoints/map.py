@@ -1,15 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
 from typing import List, Optional
 from datetime import datetime # Ensure datetime is imported if using date filters later
 
 from app import schemas
-from app.db.database import get_db
-from app.models.media import MediaItem as MediaItemModel
+from app.db.database import get_read_db
+from app.core.response_cache import MEDIA_NAMESPACE, response_cache
+from app.crud.crud_media import map_points_query
+from app.crud.pagination import InvalidCursorError, NEXT_CURSOR_HEADER, next_cursor_for
+from app.crud.text_search import MatchMode
 
 router = APIRouter()
 
+MAP_PAGE_ADAPTER = TypeAdapter(List[schemas.MapDataPoint])
+
 @router.get(
     "/data", 
     response_model=List[schemas.MapDataPoint],
@@ -17,12 +22,15 @@ router = APIRouter()
     description="Retrieves a list of media item locations and basic info for map display. Filters can be applied."
 )
 async def get_map_data_points(
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
     skip: int = 0, 
     limit: int = 1000, 
+    cursor: Optional[str] = None,
+    species: Optional[str] = None, # Filter by final species (validated, otherwise AI predicted)
+    health_status: Optional[str] = None, # Filter by final health status
+    match: MatchMode = "contains",
     # Future filter ideas (can be added here):
-    # species: Optional[str] = None, # Filter by validated species
-    # health_status: Optional[str] = None,
     # date_from: Optional[datetime] = None,
     # date_to: Optional[datetime] = None,
     # bbox: Optional[str] = None,
@@ -32,19 +40,24 @@ async def get_map_data_points(
     Each point includes ID, latitude, longitude, AI predictions (if available),
     validated predictions (if available), and file URL.
     Currently returns all items with valid (non-null) latitude and longitude.
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the next page.
+    Responses are cached per query string until the next write to media_items.
     """
-    query = (
-        select(MediaItemModel)
-        .filter(MediaItemModel.latitude.isnot(None))
-        .filter(MediaItemModel.longitude.isnot(None))
-        .order_by(MediaItemModel.sighting_timestamp.desc().nullslast(), MediaItemModel.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-    )
-    
+    cached = await response_cache.lookup(MEDIA_NAMESPACE, request)
+    if cached.hit:
+        return cached.to_response()
+
+    try:
+        query = map_points_query(species, health_status, match, cursor=cursor, skip=skip, limit=limit)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
     result = await db.execute(query)
     media_items_from_db = result.scalars().all()
 
+    next_cursor = next_cursor_for(media_items_from_db, limit, "sighting_timestamp")
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+
     map_data_points = []
     for item in media_items_from_db:
         if item.latitude is not None and item.longitude is not None:
@@ -53,6 +66,9 @@ async def get_map_data_points(
                     id=item.id,
                     latitude=item.latitude,
                     longitude=item.longitude,
+                    species=item.effective_species,
+                    health_status=item.effective_health,
+                    sighting_timestamp=item.sighting_timestamp,
                     species_prediction=item.species_ai_prediction, # Keep AI prediction
                     health_prediction=item.health_status_ai_prediction, # Keep AI prediction
                     # --- ADD VALIDATED FIELDS ---
@@ -63,4 +79,6 @@ async def get_map_data_points(
                 )
             )
     
-    return map_data_points
\ No newline at end of file
+    body = MAP_PAGE_ADAPTER.dump_json(map_data_points)
+    await response_cache.store(cached, body, headers)
+    return Response(content=body, media_type="application/json", headers=headers)
\ No newline at end of file
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import logging
@@ -7,9 +7,12 @@ import logging
 from app.celery_app import celery_app
 
 from app import schemas, crud
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
 from app.core import security
+from app.crud.pagination import InvalidCursorError, NEXT_CURSOR_HEADER, next_cursor_for
+from app.crud.text_search import MatchMode
 from app.models.user import User as UserModel
+from app.services import badge_service
 from app.services.media_storage_service import upload_file_to_storage
 # Import the task so we can call .apply_async on it
 from app.tasks.ai_tasks import process_media_with_gemini
@@ -68,28 +71,58 @@ async def upload_media(
         await db.commit()
     # --- END OF FIX ---
 
-    # Award points for uploading
+    # Award points for uploading, then the upload-count badges
     await crud.crud_user.add_score_and_check_badges(db, user=current_user, points=10)
+    await badge_service.award_badges(db, [current_user.id], badge_service.UPLOAD_METRICS)
     
     await db.refresh(item)
     return item
 
 @router.get("/", response_model=List[schemas.MediaItem])
-async def list_media(db: AsyncSession = Depends(get_db), skip: int = 0, limit: int = 100):
-    media_items = await crud.crud_media.get_media_items(db, skip, limit)
+async def list_media(
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    species: Optional[str] = None,
+    match: MatchMode = "contains"
+):
+    try:
+        media_items = await crud.crud_media.get_media_items(
+            db, skip, limit, species_filter=species, species_match=match, cursor=cursor
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    next_cursor = next_cursor_for(media_items, limit, "created_at")
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     logger.info(f"Retrieved {len(media_items)} media items for listing.")
     return media_items
 
 @router.get("/{item_id}", response_model=schemas.MediaItem)
-async def get_media(item_id: int, db: AsyncSession = Depends(get_db)):
+async def get_media(item_id: int, db: AsyncSession = Depends(get_read_db)):
     item = await crud.crud_media.get_media_item(db, item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Media item not found")
     return item
 
 @router.get("/user/{user_id}", response_model=List[schemas.MediaItem])
-async def list_user_media(user_id: int, db: AsyncSession = Depends(get_db)):
-    return await crud.crud_media.get_media_items_by_user(db=db, user_id=user_id)
+async def list_user_media(
+    user_id: int,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    limit: int = 100,
+    cursor: Optional[str] = None
+):
+    try:
+        media_items = await crud.crud_media.get_media_items_by_user(db=db, user_id=user_id, limit=limit, cursor=cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    next_cursor = next_cursor_for(media_items, limit, "created_at")
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return media_items
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_media(item_id: int, db: AsyncSession = Depends(get_db), current_user: UserModel = Depends(security.get_current_active_user)):
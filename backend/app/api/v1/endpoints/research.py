@@ -1,16 +1,56 @@
 # E:\Marine_life\backend\app\api\v1\endpoints\research.py
-from fastapi import APIRouter, Depends, Query, HTTPException, status
+import csv
+import io
+import json
+import numpy as np
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import TypeAdapter
+from sqlalchemy import func
 from sqlalchemy.future import select
-from typing import List, Optional
-from datetime import datetime, timezone
+from typing import AsyncIterator, List, Literal, Optional
+from datetime import date, datetime, timezone
 
 from app import schemas
-from app.db.database import get_db
+from app.core.config import settings
+from app.core.response_cache import MEDIA_NAMESPACE, response_cache
+from app.db.database import get_read_db, AsyncReadSessionLocal
 from app.models.media import MediaItem as MediaItemModel
+from app.models.sighting_rollup import SightingRollup as SightingRollupModel
+from app.crud.pagination import InvalidCursorError, NEXT_CURSOR_HEADER, next_cursor_for
+from app.crud.text_search import MatchMode
+from app.crud.crud_research import (
+    ResearchFilters, apply_research_filters, dataset_rows_query, research_page_query, research_rows_query,
+)
+from app.services import arrow_export_service, rollup_service
+from app.services.density_service import DensityGrid, GridTooLargeError
 
 router = APIRouter()  # Ensure this line is present and correctly defined
 
+RESEARCH_PAGE_ADAPTER = TypeAdapter(List[schemas.ResearchDataPoint])
+
+EXPORT_COLUMNS = ["id", "latitude", "longitude", "species", "health_status", "sighting_timestamp"]
+
+
+def research_filters(
+    species: Optional[str] = Query(None, description="Filter by species (validated or AI predicted). Case-insensitive."),
+    health_status: Optional[str] = Query(None, description="Filter by health status (validated or AI predicted). Case-insensitive."),
+    date_from: Optional[datetime] = Query(None, description="Filter by sighting date from (ISO 8601 format)."),
+    date_to: Optional[datetime] = Query(None, description="Filter by sighting date to (ISO 8601 format)."),
+    only_validated: bool = Query(False, description="If true, only return items with community validation consensus."),
+    match: MatchMode = Query("contains", description="How species/health_status are matched: 'exact', 'prefix', 'contains' or 'fuzzy' (typo-tolerant).")
+) -> ResearchFilters:
+    """Dependency collecting the filters shared by all research endpoints."""
+    return ResearchFilters(
+        species=species,
+        health_status=health_status,
+        date_from=date_from,
+        date_to=date_to,
+        only_validated=only_validated,
+        match=match,
+    )
+
 @router.get(
     "/data", 
     response_model=List[schemas.ResearchDataPoint],
@@ -18,65 +58,260 @@ router = APIRouter()  # Ensure this line is present and correctly defined
     description="Provides aggregated and anonymized marine life sighting data for researchers. Includes validated species/health if available, otherwise AI predictions. This endpoint is public and has basic filtering."
 )
 async def get_research_data(
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
     skip: int = 0,
     limit: int = 1000,
-    species: Optional[str] = Query(None, description="Filter by species (validated or AI predicted). Case-insensitive."),
-    health_status: Optional[str] = Query(None, description="Filter by health status (validated or AI predicted). Case-insensitive."),
-    date_from: Optional[datetime] = Query(None, description="Filter by sighting date from (ISO 8601 format)."),
-    date_to: Optional[datetime] = Query(None, description="Filter by sighting date to (ISO 8601 format)."),
-    only_validated: bool = Query(False, description="If true, only return items with community validation consensus.")
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page."),
+    filters: ResearchFilters = Depends(research_filters)
 ):
-    query = select(MediaItemModel)
-    query = (
-        query.filter(MediaItemModel.latitude.isnot(None))
-             .filter(MediaItemModel.longitude.isnot(None))
-             .filter(MediaItemModel.sighting_timestamp.isnot(None))
+    # Identical dashboard queries are served from the response cache as pre-serialized JSON.
+    cached = await response_cache.lookup(MEDIA_NAMESPACE, request)
+    if cached.hit:
+        return cached.to_response()
+
+    try:
+        query = research_page_query(filters, cursor=cursor, skip=skip, limit=limit)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    result = await db.execute(query)
+    media_items_from_db = result.scalars().all()
+
+    next_cursor = next_cursor_for(media_items_from_db, limit, "sighting_timestamp")
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+
+    research_data = [
+        schemas.ResearchDataPoint(
+            id=item.id, 
+            latitude=item.latitude,
+            longitude=item.longitude,
+            species=item.effective_species,
+            health_status=item.effective_health,
+            sighting_timestamp=item.sighting_timestamp
+        )
+        for item in media_items_from_db
+    ]
+
+    body = RESEARCH_PAGE_ADAPTER.dump_json(research_data)
+    await response_cache.store(cached, body, headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def _stream_rows(query) -> AsyncIterator[list]:
+    """
+    Yield the rows of `query` in partitions of EXPORT_BATCH_SIZE using a
+    server-side cursor, so only one partition is ever held in memory.
+
+    The generator opens its own (replica) session: the request-scoped session is
+    closed before a StreamingResponse body is sent.
+    """
+    query = query.execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+    async with AsyncReadSessionLocal() as session:
+        result = await session.stream(query)
+        async for partition in result.partitions():
+            yield partition
+
+
+async def _ndjson_chunks(filters: ResearchFilters) -> AsyncIterator[bytes]:
+    async for rows in _stream_rows(research_rows_query(filters)):
+        lines = []
+        for row in rows:
+            record = dict(zip(EXPORT_COLUMNS, row))
+            record["sighting_timestamp"] = record["sighting_timestamp"].isoformat()
+            lines.append(json.dumps(record, separators=(",", ":")))
+        yield ("\n".join(lines) + "\n").encode()
+
+
+async def _csv_chunks(filters: ResearchFilters) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for rows in _stream_rows(research_rows_query(filters)):
+        for row in rows:
+            writer.writerow([*row[:-1], row[-1].isoformat()])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+@router.get(
+    "/export",
+    summary="Stream the full research dataset",
+    description="Streams every research data point matching the filters as NDJSON, CSV, Parquet or an Arrow IPC stream. Memory use is constant regardless of result size; send 'Accept-Encoding: gzip' for a compressed NDJSON/CSV download."
+)
+async def export_research_data(
+    format: Literal["ndjson", "csv", "parquet", "arrow"] = Query(
+        "ndjson",
+        description="Output format: 'ndjson' (one JSON object per line), 'csv', 'parquet' (single file) or 'arrow' (IPC stream). "
+                    "The columnar formats also include confidence, validation flag and created_at."
+    ),
+    filters: ResearchFilters = Depends(research_filters)
+):
+    if format in ("parquet", "arrow"):
+        body = arrow_export_service.stream_arrow(_stream_rows(dataset_rows_query(filters)), format)
+        media_type = "application/vnd.apache.parquet" if format == "parquet" else "application/vnd.apache.arrow.stream"
+    elif format == "csv":
+        body, media_type = _csv_chunks(filters), "text/csv"
+    else:
+        body, media_type = _ndjson_chunks(filters), "application/x-ndjson"
+
+    filename = f"marine_life_research_{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
-    if species:
-        query = query.filter(
-            (MediaItemModel.validated_species.ilike(f"%{species}%")) |
-            (MediaItemModel.species_ai_prediction.ilike(f"%{species}%") & MediaItemModel.validated_species.is_(None))
+
+@router.get(
+    "/density",
+    summary="Sighting density grid",
+    description="Bins every sighting matching the filters on a regular lat/lon grid and returns the counts per cell, "
+                "optionally split into per-species and/or per-health-status layers (divide a health layer by the total "
+                "for disease prevalence). 'json' returns only non-empty cells as [row, col, count] triples; 'npy' returns "
+                "a dense uint32 NumPy array of shape (1 + layers, rows, cols), layer 0 being the total, with the layer "
+                "names in the X-Grid-Layers header."
+)
+async def get_density_grid(
+    resolution: float = Query(1.0, gt=0, le=45, description="Cell size in degrees."),
+    min_lat: float = Query(-90, ge=-90, le=90),
+    max_lat: float = Query(90, ge=-90, le=90),
+    min_lon: float = Query(-180, ge=-180, le=180),
+    max_lon: float = Query(180, ge=-180, le=180),
+    layers: Literal["none", "species", "health", "both"] = Query("none", description="Extra layers to split the counts into."),
+    max_layers: int = Query(20, ge=1, le=200, description="Maximum layers per group; further values are merged into '__other__'."),
+    format: Literal["json", "npy"] = Query("json"),
+    filters: ResearchFilters = Depends(research_filters)
+):
+    if min_lat >= max_lat or min_lon >= max_lon:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Bounds must satisfy min < max.")
+    groups = {"none": [], "species": ["species"], "health": ["health"], "both": ["species", "health"]}[layers]
+    try:
+        grid = DensityGrid(min_lat, max_lat, min_lon, max_lon, resolution, max_layers=max_layers, layer_groups=len(groups))
+    except GridTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    label_columns = {"species": MediaItemModel.effective_species, "health": MediaItemModel.effective_health}
+    query = apply_research_filters(
+        select(MediaItemModel.latitude, MediaItemModel.longitude, *(label_columns[group] for group in groups)),
+        filters,
+    ).filter(
+        MediaItemModel.latitude.between(min_lat, max_lat),
+        MediaItemModel.longitude.between(min_lon, max_lon),
+    )
+    # Only lat/lon/labels are fetched, one server-side partition at a time, and binned with NumPy.
+    async for rows in _stream_rows(query):
+        grid.add_rows(rows, groups)
+
+    if format == "npy":
+        buffer = io.BytesIO()
+        np.save(buffer, grid.as_array())
+        return Response(
+            content=buffer.getvalue(),
+            media_type="application/octet-stream",
+            headers={
+                "X-Grid-Layers": json.dumps(["total", *grid.layer_names]),
+                "X-Grid-Bounds": json.dumps([min_lat, max_lat, min_lon, max_lon]),
+                "X-Grid-Resolution": str(resolution),
+            },
         )
-    if health_status:
-        query = query.filter(
-            (MediaItemModel.validated_health_status.ilike(f"%{health_status}%")) |
-            (MediaItemModel.health_status_ai_prediction.ilike(f"%{health_status}%") & MediaItemModel.validated_health_status.is_(None))
+    return grid.to_dict()
+
+
+class RollupWindow:
+    """Dependency collecting the time window / region / value filters of the rollup endpoints."""
+    def __init__(
+        self,
+        date_from: Optional[date] = Query(None, description="First sighting day (inclusive, UTC)."),
+        date_to: Optional[date] = Query(None, description="Last sighting day (inclusive, UTC)."),
+        min_lat: Optional[float] = Query(None, ge=-90, le=90),
+        max_lat: Optional[float] = Query(None, ge=-90, le=90),
+        min_lon: Optional[float] = Query(None, ge=-180, le=180),
+        max_lon: Optional[float] = Query(None, ge=-180, le=180),
+        species: Optional[str] = Query(None, description="Exact species (case-insensitive)."),
+        health_status: Optional[str] = Query(None, description="Exact health status (case-insensitive)."),
+    ):
+        self.date_from = date_from
+        self.date_to = date_to
+        self.min_lat = min_lat
+        self.max_lat = max_lat
+        self.min_lon = min_lon
+        self.max_lon = max_lon
+        self.species = species
+        self.health_status = health_status
+
+    def apply(self, query, granularity: str):
+        return rollup_service.apply_rollup_window(
+            query, granularity,
+            date_from=self.date_from, date_to=self.date_to,
+            min_lat=self.min_lat, max_lat=self.max_lat, min_lon=self.min_lon, max_lon=self.max_lon,
+            species=self.species, health_status=self.health_status,
         )
-    
-    if date_from:
-        query = query.filter(MediaItemModel.sighting_timestamp >= date_from)
-    if date_to:
-        query = query.filter(MediaItemModel.sighting_timestamp <= date_to)
 
-    if only_validated:
-        query = query.filter(MediaItemModel.is_validated_by_community == True)
 
-    query = query.order_by(MediaItemModel.sighting_timestamp.desc(), MediaItemModel.created_at.desc())
-    query = query.offset(skip).limit(limit)
+@router.get(
+    "/stats/counts",
+    response_model=schemas.RollupCounts,
+    summary="Sighting counts by species and health status",
+    description="Counts sightings per (species, health status) for a time window and region, served from the precomputed rollups. The region is resolved to whole rollup cells."
+)
+async def get_rollup_counts(
+    window: RollupWindow = Depends(),
+    db: AsyncSession = Depends(get_read_db)
+):
+    granularity = rollup_service.choose_granularity(window.date_from, window.date_to)
+    total_count = func.sum(SightingRollupModel.sighting_count)
+    query = window.apply(
+        select(SightingRollupModel.species, SightingRollupModel.health_status, total_count.label("count")),
+        granularity,
+    ).group_by(SightingRollupModel.species, SightingRollupModel.health_status).order_by(total_count.desc())
+    result = await db.execute(query)
+    items = [schemas.RollupCount(species=row.species, health_status=row.health_status, count=row.count) for row in result]
+    return schemas.RollupCounts(granularity=granularity, total=sum(item.count for item in items), items=items)
+
 
+@router.get(
+    "/stats/trend",
+    response_model=schemas.RollupTrend,
+    summary="Sighting counts over time",
+    description="Returns a time series of sighting counts per day or per month for a time window and region, optionally for one species and/or health status."
+)
+async def get_rollup_trend(
+    granularity: Literal["day", "month"] = Query("month"),
+    window: RollupWindow = Depends(),
+    db: AsyncSession = Depends(get_read_db)
+):
+    total_count = func.sum(SightingRollupModel.sighting_count)
+    query = window.apply(
+        select(SightingRollupModel.period_start, total_count.label("count")), granularity
+    ).group_by(SightingRollupModel.period_start).order_by(SightingRollupModel.period_start)
     result = await db.execute(query)
-    media_items_from_db = result.scalars().all()
+    return schemas.RollupTrend(
+        granularity=granularity,
+        species=window.species,
+        health_status=window.health_status,
+        points=[schemas.RollupTrendPoint(period_start=row.period_start, count=row.count) for row in result],
+    )
 
-    research_data = []
-    for item in media_items_from_db:
-        final_species = item.validated_species or item.species_ai_prediction
-        final_health = item.validated_health_status or item.health_status_ai_prediction
-
-        if item.latitude is None or item.longitude is None or \
-           final_species is None or final_health is None or item.sighting_timestamp is None:
-            continue 
-
-        research_data.append(
-            schemas.ResearchDataPoint(
-                id=item.id, 
-                latitude=item.latitude,
-                longitude=item.longitude,
-                species=final_species,
-                health_status=final_health,
-                sighting_timestamp=item.sighting_timestamp
-            )
-        )
-    
-    return research_data
+
+@router.get(
+    "/stats/top-species",
+    response_model=List[schemas.SpeciesCount],
+    summary="Most sighted species",
+    description="Returns the N most sighted species for a time window and region, served from the precomputed rollups."
+)
+async def get_top_species(
+    limit: int = Query(10, ge=1, le=100),
+    window: RollupWindow = Depends(),
+    db: AsyncSession = Depends(get_read_db)
+):
+    granularity = rollup_service.choose_granularity(window.date_from, window.date_to)
+    total_count = func.sum(SightingRollupModel.sighting_count)
+    query = window.apply(
+        select(SightingRollupModel.species, total_count.label("count")), granularity
+    ).group_by(SightingRollupModel.species).order_by(total_count.desc()).limit(limit)
+    result = await db.execute(query)
+    return [schemas.SpeciesCount(species=row.species, count=row.count) for row in result]
@@ -1,13 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 
 from app import schemas
 from app import crud
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
 from app.core import security
 from app.core.security import get_current_active_user
+from app.crud.pagination import InvalidCursorError, NEXT_CURSOR_HEADER, next_cursor_for
 from app.models.user import User as UserModel
 
 router = APIRouter()
@@ -28,11 +29,18 @@ async def create_new_user(user_in: schemas.UserCreate, db: AsyncSession = Depend
 @router.post("/login", response_model=schemas.Token, summary="User Login")
 async def login_for_access_token(db: AsyncSession = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
     user = await crud.crud_user.get_user_by_username(db, username=form_data.username)
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password", headers={"WWW-Authenticate": "Bearer"})
+    password_ok, upgraded_hash = await security.verify_password(form_data.password, user.hashed_password)
+    if not password_ok:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect username or password", headers={"WWW-Authenticate": "Bearer"})
     
     if not user.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user. Please contact support.")
+
+    # The stored hash uses an outdated BCRYPT_ROUNDS; upgrade it while we have the plaintext.
+    if upgraded_hash:
+        await crud.crud_user.update_password_hash(db, user, upgraded_hash)
     
     # --- FIX IS HERE ---
     # The token payload needs to contain enough information for the frontend.
@@ -71,22 +79,31 @@ async def update_user_me(
     summary="List media items uploaded by the current user"
 )
 async def read_own_media_items(
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     current_user: UserModel = Depends(get_current_active_user),
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = None
 ):
-    media_items = await crud.crud_media.get_media_items(
-        db=db, 
-        user_id=current_user.id,
-        skip=skip, 
-        limit=limit
-    )
+    try:
+        media_items = await crud.crud_media.get_media_items(
+            db=db, 
+            user_id=current_user.id,
+            skip=skip, 
+            limit=limit,
+            cursor=cursor
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    next_cursor = next_cursor_for(media_items, limit, "created_at")
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return media_items
 
 # --- DEVELOPMENT ONLY: List all users (remove in production) ---
 @router.get("/admin/list", response_model=List[schemas.User], summary="List all users (development only)")
-async def list_all_users(db: AsyncSession = Depends(get_db)):
+async def list_all_users(db: AsyncSession = Depends(get_read_db)):
     """
     DEVELOPMENT ONLY: List all users in the database.
     This should be removed in production for security reasons.
@@ -98,7 +115,7 @@ async def list_all_users(db: AsyncSession = Depends(get_db)):
 
 # --- NEW PUBLIC ENDPOINT TO FETCH A USER'S PUBLIC PROFILE ---
 @router.get("/{user_id}", response_model=schemas.User, summary="Get a user's public profile")
-async def get_user_profile(user_id: int, db: AsyncSession = Depends(get_db)):
+async def get_user_profile(user_id: int, db: AsyncSession = Depends(get_read_db)):
     """
     Fetches a user's public profile information by their ID.
     This is what the frontend AuthContext will call.
@@ -1,14 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Path
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status, Path
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 # Import the service here, where it belongs
 from app.services import validation_service 
+from app.services.validation_coalescer import validation_coalescer
 
 from app import schemas
 from app import crud
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
 from app.core.security import get_current_active_user
+from app.crud.pagination import InvalidCursorError, NEXT_CURSOR_HEADER, next_cursor_for
 from app.models.user import User as UserModel
 from app.models.media import MediaItem as MediaItemModel
 
@@ -38,36 +40,134 @@ async def submit_or_update_validation_vote(
             detail="At least one vote (species/health) or a comment must be provided.",
         )
 
-    previous_vote = await crud.crud_validation_vote.get_vote_by_media_and_user(db, media_item_id, current_user.id)
-    
-    # Step 1: Create or update the vote record in the database
-    vote_data = await crud.crud_validation_vote.create_or_update_validation_vote(
+    # Step 1: Create or update the vote record in the database (one upsert statement;
+    # `is_new_vote` comes from the write itself, so concurrent first votes cannot both score)
+    vote_data, is_new_vote = await crud.crud_validation_vote.create_or_update_validation_vote(
         db=db, media_item_id=media_item_id, user_id=current_user.id, vote_in=vote_in
     )
     
     # Step 2: After the vote is saved, call the service to re-evaluate the media item's status
-    # This is the correct architectural flow.
-    await validation_service.re_evaluate_media_item_validation(db=db, media_item_id=media_item_id)
+    # This is the correct architectural flow. For hot items the re-evaluation can be
+    # debounced: the vote is already committed, the coalescer catches up within its window.
+    if validation_coalescer.enabled:
+        await validation_coalescer.mark_dirty(media_item_id)
+    else:
+        await validation_service.re_evaluate_media_item_validation(db=db, media_item_id=media_item_id)
     
     # Gamification Logic
-    if not previous_vote: # Only award points for a brand new vote
+    if is_new_vote: # Only award points for a brand new vote
         await crud.crud_user.add_score_and_check_badges(
             db=db, user=current_user, points=POINTS_FOR_VALIDATION_VOTE
         )
 
     return schemas.ValidationVote(**vote_data)
 
+@router.post(
+    "/batch",
+    response_model=schemas.ValidationVoteBatchResponse,
+    summary="Submit or update many validation votes at once",
+    description="Saves up to 200 votes in one request: one upsert statement for all votes, one set-based "
+                "re-evaluation of the affected media items and one score update. Each vote gets its own result; "
+                "votes on unknown items, empty votes and repeated media items are skipped, not failed."
+)
+async def submit_validation_vote_batch(
+    batch: schemas.ValidationVoteBatch,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserModel = Depends(get_current_active_user)
+):
+    results: List[Optional[schemas.ValidationVoteBatchResult]] = [None] * len(batch.votes)
+    pending: Dict[int, int] = {}  # media_item_id -> position in the batch
+    for position, vote_in in enumerate(batch.votes):
+        if vote_in.media_item_id in pending:
+            results[position] = schemas.ValidationVoteBatchResult(
+                media_item_id=vote_in.media_item_id, status="duplicate",
+                detail="Only the first vote per media item in a batch is used.",
+            )
+        elif vote_in.vote_on_species is None and vote_in.vote_on_health is None and vote_in.comment is None:
+            results[position] = schemas.ValidationVoteBatchResult(
+                media_item_id=vote_in.media_item_id, status="invalid",
+                detail="At least one vote (species/health) or a comment must be provided.",
+            )
+        else:
+            pending[vote_in.media_item_id] = position
+
+    existing_ids = await crud.crud_media.get_existing_media_item_ids(db, list(pending))
+    for media_item_id in set(pending) - existing_ids:
+        results[pending.pop(media_item_id)] = schemas.ValidationVoteBatchResult(
+            media_item_id=media_item_id, status="not_found", detail="Media item not found"
+        )
+
+    new_votes = 0
+    if pending:
+        saved = await crud.crud_validation_vote.upsert_validation_votes(
+            db, current_user.id, {media_item_id: batch.votes[position] for media_item_id, position in pending.items()}
+        )
+        for vote_data, inserted in saved:
+            new_votes += inserted
+            results[pending[vote_data["media_item_id"]]] = schemas.ValidationVoteBatchResult(
+                media_item_id=vote_data["media_item_id"],
+                status="created" if inserted else "updated",
+                vote=schemas.ValidationVote(**vote_data),
+            )
+
+        if validation_coalescer.enabled:
+            for media_item_id in pending:
+                await validation_coalescer.mark_dirty(media_item_id)
+        else:
+            await validation_service.re_evaluate_media_items(db, pending)
+
+    # Gamification Logic: one score update for all brand new votes of the batch
+    points = new_votes * POINTS_FOR_VALIDATION_VOTE
+    if points:
+        await crud.crud_user.add_score_and_check_badges(db=db, user=current_user, points=points)
+
+    return schemas.ValidationVoteBatchResponse(results=results, points_awarded=points)
+
+@router.get(
+    "/queue",
+    response_model=List[schemas.MediaItem],
+    summary="Get the next media items that need my validation",
+    description="Returns AI-processed items without community consensus that the current user has not voted on yet, "
+                "most in need first: low AI confidence, few votes, or close to the consensus threshold."
+)
+async def get_validation_queue(
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserModel = Depends(get_current_active_user)
+):
+    return await crud.crud_media.get_validation_queue(db, user_id=current_user.id, limit=limit)
+
 @router.get(
     "/media/{media_item_id}/validations",
-    response_model=List[schemas.ValidationVote],
-    summary="Get all validation votes for a media item"
+    response_model=schemas.ValidationVoteThread,
+    summary="Get all validation votes for a media item",
+    description="Returns a page of votes (newest first) with each voter's username and badges, plus the item's "
+                "confirm/correction counts, in two queries whatever the number of votes. Pass the returned "
+                "next_cursor (also in the X-Next-Cursor header) to get the next page."
 )
 async def get_all_validations_for_media_item(
+    response: Response,
     media_item_id: int = Path(..., description="The ID of the media item."),
-    db: AsyncSession = Depends(get_db)
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    votes = await crud.crud_validation_vote.get_votes_for_media_item(db, media_item_id=media_item_id)
-    return votes
+    try:
+        votes = await crud.crud_validation_vote.get_votes_for_media_item(
+            db, media_item_id=media_item_id, limit=limit, cursor=cursor, with_voters=True
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    tallies = await crud.crud_validation_tally.get_tallies_for_media_item(db, media_item_id)
+
+    next_cursor = next_cursor_for(votes, limit, "created_at")
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return schemas.ValidationVoteThread(
+        items=votes,
+        counts=crud.crud_validation_tally.vote_counts(tallies),
+        next_cursor=next_cursor,
+    )
 
 @router.get(
     "/media/{media_item_id}/validate/me",
@@ -76,7 +176,7 @@ async def get_all_validations_for_media_item(
 )
 async def get_my_validation_vote_for_media_item(
     media_item_id: int = Path(..., description="The ID of the media item."),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: UserModel = Depends(get_current_active_user)
 ):
     my_vote = await crud.crud_validation_vote.get_vote_by_media_and_user(db, media_item_id=media_item_id, user_id=current_user.id)
@@ -1,3 +1,4 @@
+from datetime import timedelta
 from celery import Celery
 from app.core.config import settings
 
@@ -5,7 +6,7 @@ celery_app = Celery(
     "worker",
     broker=settings.CELERY_BROKER_URL,
     backend=settings.CELERY_RESULT_BACKEND,
-    include=["app.tasks.ai_tasks"]
+    include=["app.tasks.ai_tasks", "app.tasks.export_tasks", "app.tasks.gamification_tasks"]
 )
 
 celery_app.conf.update(
@@ -28,4 +29,20 @@ celery_app.conf.update(
         'heartbeat': 10,
     }
     # --- END OF SETTINGS ---
-)
\ No newline at end of file
+)
+
+# Periodic jobs, run by `celery -A app.celery_app beat`.
+celery_app.conf.beat_schedule = {
+    "write-parquet-snapshot": {
+        "task": "tasks.write_parquet_snapshot",
+        "schedule": timedelta(hours=settings.EXPORT_SNAPSHOT_INTERVAL_HOURS),
+    },
+    "rebuild-leaderboard": {
+        "task": "tasks.rebuild_leaderboard",
+        "schedule": timedelta(hours=settings.LEADERBOARD_REBUILD_INTERVAL_HOURS),
+    },
+    "evaluate-badges": {
+        "task": "tasks.evaluate_badges",
+        "schedule": timedelta(hours=settings.BADGE_EVALUATION_INTERVAL_HOURS),
+    },
+}
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "marine-life-api" # Set this to your Render service name
@@ -17,6 +18,40 @@ class Settings(BaseSettings):
     def DATABASE_URL(self) -> str:
         return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    # --- Read Replica (optional) ---
+    # When set, GET endpoints and research exports read from this server (same credentials/DB name).
+    POSTGRES_REPLICA_SERVER: Optional[str] = None
+    POSTGRES_REPLICA_PORT: Optional[int] = None
+    READ_YOUR_WRITES_SECONDS: int = 10 # After a write, the client reads from the primary this long (> replica lag)
+
+    @property
+    def REPLICA_DATABASE_URL(self) -> Optional[str]:
+        if not self.POSTGRES_REPLICA_SERVER:
+            return None
+        port = self.POSTGRES_REPLICA_PORT or self.POSTGRES_PORT
+        return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_REPLICA_SERVER}:{port}/{self.POSTGRES_DB}"
+
+    # --- Database Connection Pool ---
+    DB_POOL_SIZE: int = 10 # Connections kept open per API worker process
+    DB_MAX_OVERFLOW: int = 10 # Extra connections opened under load, closed when returned
+    DB_POOL_TIMEOUT_SECONDS: float = 10.0 # Max wait for a free connection before the request fails
+    DB_POOL_RECYCLE_SECONDS: int = 1800 # Replace connections older than this (proxies drop idle ones)
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_WARMUP_CONNECTIONS: int = 5 # Opened at startup so the first requests don't pay for connecting
+    DB_STATEMENT_CACHE_SIZE: int = 100 # asyncpg prepared statement cache per connection
+    # Sync (psycopg2) engine, per Celery pool process (and script). A prefork process runs
+    # one task at a time and AI results are written by its batched writer, so one
+    # connection plus one for an overlapping flush; with --pool=threads use the concurrency.
+    DB_WORKER_POOL_SIZE: int = 1
+    DB_WORKER_MAX_OVERFLOW: int = 1
+    # Behind PgBouncer in transaction pooling mode: disables prepared statement caching
+    # and the client-side pool (PgBouncer does the pooling).
+    DB_PGBOUNCER_MODE: bool = False
+
+    # --- SQL Instrumentation ---
+    DB_SLOW_QUERY_MS: float = 200.0 # Statements slower than this are logged (parameters redacted)
+    DB_QUERY_COUNT_WARN: int = 30 # Requests running more queries are logged as a likely N+1
+
     # --- Cloudinary Object Storage ---
     CLOUDINARY_CLOUD_NAME: str
     CLOUDINARY_API_KEY: str
@@ -28,13 +63,61 @@ class Settings(BaseSettings):
     # --- Redis (Celery Backend) ---
     CELERY_RESULT_BACKEND: str
     
+    # --- Redis (shared cache / pub-sub, optional) ---
+    REDIS_URL: Optional[str] = None
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = 0.5
+
+    # --- Response Cache (map / research endpoints) ---
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_ENTRIES: int = 512
+    RESPONSE_CACHE_TTL_SECONDS: int = 60
+    RESPONSE_CACHE_VERSION_CHECK_SECONDS: float = 1.0 # Max staleness across workers when Redis is used
+
+    # --- Validation ---
+    # When > 0, votes only mark their media item dirty and a background coalescer
+    # re-evaluates each dirty item at most once per window (0 = re-evaluate inline).
+    VALIDATION_COALESCE_WINDOW_SECONDS: float = 0.0
+
+    # --- Gamification ---
+    LEADERBOARD_REBUILD_INTERVAL_HOURS: int = 24 # Full rebuild of the Redis leaderboard (REDIS_URL only)
+    BADGE_EVALUATION_INTERVAL_HOURS: int = 24 # Set-based evaluation of every badge rule for every user
+
+    # --- Rate Limiting / Load Shedding ---
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_WINDOW_SECONDS: int = 60
+    RATE_LIMIT_USER_BUDGET: int = 600 # Cost units per window per authenticated user (see rate_limit.ROUTE_COSTS)
+    RATE_LIMIT_IP_BUDGET: int = 300 # Cost units per window per client IP for anonymous requests
+    RATE_LIMIT_AUTHENTICATED_IP_BUDGET: int = 3000 # Per client IP across all its authenticated users (NAT, offices)
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = False # Enable behind a reverse proxy that sets X-Forwarded-For
+    LOAD_SHED_ENABLED: bool = True
+    LOAD_SHED_LOOP_LAG_MS: float = 250.0
+    LOAD_SHED_POOL_WAIT_MS: float = 200.0 # Recent DB connection checkout wait at which heavy routes are shed
+
     # --- Google AI ---
     GOOGLE_API_KEY: str
 
+    # --- AI Result Writes (Celery workers) ---
+    AI_RESULT_BATCH_SIZE: int = 20 # Results written per transaction; 1 writes each result at once
+    AI_RESULT_FLUSH_MS: int = 500 # Max time a result waits in the worker's buffer
+
+    # --- Research Data Export ---
+    EXPORT_BATCH_SIZE: int = 5000 # Rows fetched per server-side cursor round trip
+    EXPORT_SNAPSHOT_FOLDER: str = "marine_life_exports" # Cloudinary folder of the Parquet snapshots, served under /exports
+    EXPORT_SNAPSHOT_KEEP: int = 3
+    EXPORT_SNAPSHOT_INTERVAL_HOURS: int = 24
+
     # --- JWT Authentication ---
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    # Authenticated users are cached per worker for this long (0 = always query the DB)
+    AUTH_USER_CACHE_TTL_SECONDS: int = 60
+    AUTH_USER_CACHE_MAX_ENTRIES: int = 10000
+
+    # --- Password Hashing ---
+    BCRYPT_ROUNDS: int = 12 # Existing hashes with another cost are rehashed on login
+    PASSWORD_HASH_WORKERS: int = 4 # Threads per worker process running bcrypt
+    PASSWORD_HASH_MAX_PENDING: int = 32 # Running + queued hashes before new ones get a 503
 
     # This allows pydantic to look for a .env file
     class Config:
@@ -0,0 +1,94 @@
+import logging
+from typing import Iterable, Optional, Tuple
+
+from app.core.config import settings
+from app.core.redis_client import get_async_redis, get_sync_redis
+
+logger = logging.getLogger(__name__)
+
+# Redis sorted set of user scores; members are zero-padded user ids (see _member).
+LEADERBOARD_KEY = "leaderboard:scores"
+REBUILD_CHUNK = 5000
+
+# ZADD only into an existing leaderboard: before the first rebuild, a set holding just
+# the users who scored recently would report wrong ranks instead of falling back to SQL.
+# GT keeps the highest score when concurrent awards race (scores never decrease).
+_RECORD_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('ZADD', KEYS[1], 'GT', ARGV[1], ARGV[2])
+end
+return 0
+"""
+
+
+def _member(user_id: int) -> str:
+    # Equal scores are ordered by member; zero padding makes that the numeric id order,
+    # so ZREVRANK matches ORDER BY score DESC, id DESC in SQL.
+    return f"{user_id:012d}"
+
+
+class Leaderboard:
+    """
+    Optional Redis mirror of users.score giving O(log n) rank lookups.
+
+    Ranks are positions in `ORDER BY score DESC, id DESC`, the order of the
+    ix_users_score_id index, so the SQL fallback (an index-only count) returns the same
+    number. Scores are recorded after every award; the periodic rebuild task
+    (tasks.rebuild_leaderboard) creates the set and corrects any drift. Without
+    REDIS_URL, or before the first rebuild, `rank` returns None and callers use SQL.
+    """
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.REDIS_URL)
+
+    async def record(self, user_id: int, score: int) -> None:
+        redis = get_async_redis()
+        if redis is None:
+            return
+        try:
+            await redis.eval(_RECORD_SCRIPT, 1, LEADERBOARD_KEY, score, _member(user_id))
+        except Exception as e:
+            logger.warning(f"Leaderboard: could not record score of user {user_id}: {e}")
+
+    async def rank(self, user_id: int) -> Optional[int]:
+        """1-based rank of `user_id`, or None if Redis cannot answer."""
+        redis = get_async_redis()
+        if redis is None:
+            return None
+        try:
+            position = await redis.zrevrank(LEADERBOARD_KEY, _member(user_id))
+        except Exception as e:
+            logger.warning(f"Leaderboard: rank lookup failed, falling back to SQL: {e}")
+            return None
+        return position + 1 if position is not None else None
+
+    def rebuild(self, scores: Iterable[Tuple[int, int]]) -> int:
+        """
+        Replace the leaderboard with `scores` ((user_id, score) pairs), atomically.
+        Returns the number of users written, or -1 if Redis is not configured.
+        """
+        redis = get_sync_redis()
+        if redis is None:
+            return -1
+        staging_key = f"{LEADERBOARD_KEY}:rebuild"
+        redis.delete(staging_key)
+        written = 0
+        chunk = {}
+        for user_id, score in scores:
+            chunk[_member(user_id)] = score
+            if len(chunk) >= REBUILD_CHUNK:
+                redis.zadd(staging_key, chunk)
+                written += len(chunk)
+                chunk = {}
+        if chunk:
+            redis.zadd(staging_key, chunk)
+            written += len(chunk)
+        if written:
+            redis.rename(staging_key, LEADERBOARD_KEY)
+        else:
+            redis.delete(LEADERBOARD_KEY)
+        return written
+
+
+leaderboard = Leaderboard()
@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Callable, Deque, Dict
+
+
+class _Timing:
+    """Running summary of an observed value (count, sum, max and recent percentiles)."""
+
+    def __init__(self, window: int = 1024):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.recent.append(value)
+
+    def snapshot(self) -> dict:
+        recent = sorted(self.recent)
+
+        def percentile(p: float) -> float:
+            return recent[min(len(recent) - 1, int(p * len(recent)))] if recent else 0.0
+
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+        }
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics registry (per worker process), exposed as JSON on /metrics.
+    Counters and timings are recorded by the code paths themselves; collectors are
+    callables evaluated at snapshot time for values that are cheaper to read on demand.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._timings: Dict[str, _Timing] = defaultdict(_Timing)
+        self._collectors: Dict[str, Callable[[], dict]] = {}
+        self._started_at = time.time()
+
+    def inc(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            self._timings[name].observe(value)
+
+    def register_collector(self, name: str, collector: Callable[[], dict]) -> None:
+        self._collectors[name] = collector
+
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            data = {
+                "uptime_seconds": time.time() - self._started_at,
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "timings": {name: timing.snapshot() for name, timing in self._timings.items()},
+            }
+        for name, collector in self._collectors.items():
+            try:
+                data[name] = collector()
+            except Exception as e:
+                data[name] = {"error": str(e)}
+        return data
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,87 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple, TypeVar
+
+from passlib.context import CryptContext
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+T = TypeVar("T")
+
+# Hashes with a different cost than BCRYPT_ROUNDS verify fine but are reported as needing
+# an update, which is how login upgrades them in place.
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+
+class PasswordHasherBusyError(Exception):
+    """Raised when more password hashes are pending than PASSWORD_HASH_MAX_PENDING allows."""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt off the event loop in a small dedicated thread pool.
+
+    bcrypt releases the GIL while hashing, so threads give real parallelism and, more
+    importantly, a login no longer blocks every other request on the worker for the
+    100-300 ms a hash takes. The pool is bounded by PASSWORD_HASH_WORKERS and admission
+    by PASSWORD_HASH_MAX_PENDING (running + queued): beyond that, callers get
+    PasswordHasherBusyError immediately instead of piling up behind a login storm.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0  # Only touched from the event loop thread
+        metrics.register_collector("password_hasher", self.stats)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+            )
+        return self._executor
+
+    async def _run(self, operation: str, fn: Callable[..., T], *args) -> T:
+        if self._pending >= settings.PASSWORD_HASH_MAX_PENDING:
+            metrics.inc("password_hash.rejected")
+            raise PasswordHasherBusyError()
+
+        submitted_at = time.perf_counter()
+
+        def job() -> T:
+            started_at = time.perf_counter()
+            metrics.observe("password_hash.queue_seconds", started_at - submitted_at)
+            try:
+                return fn(*args)
+            finally:
+                metrics.observe(f"password_hash.{operation}_seconds", time.perf_counter() - started_at)
+
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), job)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Return (matches, new_hash); new_hash is set when the stored hash uses an outdated cost."""
+        return await self._run("verify", pwd_context.verify_and_update, password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": settings.PASSWORD_HASH_WORKERS,
+            "max_pending": settings.PASSWORD_HASH_MAX_PENDING,
+            "pending": self._pending,
+            "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+        }
+
+
+password_hasher = PasswordHasher()
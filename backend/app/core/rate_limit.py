@@ -0,0 +1,264 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+from jose import JWTError, jwt
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.redis_client import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+# Never limited or shed: probes and monitoring must keep answering under load.
+EXEMPT_PATHS = {"/", "/health", "/metrics"}
+
+# Cost of a request in rate-limit units (default 1). The first matching rule wins;
+# a path ending in "/" matches as a prefix. Heavier routes spend the budget faster.
+ROUTE_COSTS = (
+    ("POST", f"{settings.API_V1_STR}/media/upload", 20),
+    ("POST", f"{settings.API_V1_STR}/users/login", 10),
+    ("POST", f"{settings.API_V1_STR}/users/register", 10),
+    ("POST", f"{settings.API_V1_STR}/validation/batch", 10),
+    ("GET", f"{settings.API_V1_STR}/research/export", 50),
+    ("GET", f"{settings.API_V1_STR}/research/density", 20),
+    ("GET", f"{settings.API_V1_STR}/research/", 5),
+    ("GET", f"{settings.API_V1_STR}/map/", 2),
+)
+
+# Atomic sliding-window counter: the previous fixed window counts in proportion to how
+# much of it still overlaps the sliding window. KEYS: current, previous window.
+# ARGV: cost, budget, weight of the previous window, ttl.
+_HIT_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local used = previous * tonumber(ARGV[3]) + current
+if used + tonumber(ARGV[1]) > tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('INCRBY', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+
+def route_cost(method: str, path: str) -> int:
+    for rule_method, rule_path, cost in ROUTE_COSTS:
+        if method == rule_method and (path == rule_path or (rule_path.endswith("/") and path.startswith(rule_path))):
+            return cost
+    return 1
+
+
+class SlidingWindowLimiter:
+    """
+    Per-identity sliding-window budget (sliding-window counter approximation: two
+    fixed-window counters per identity instead of a log of every request).
+
+    Counters live in Redis when REDIS_URL is set, so the budget is shared by all workers;
+    otherwise, or while Redis is unreachable, in this process (budget per worker).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._windows: Dict[str, Tuple[int, int, int]] = {}  # identity -> (window index, current, previous)
+        self._swept_window = 0
+
+    async def hit(self, identity: str, cost: int, budget: int) -> Tuple[bool, int]:
+        """Spend `cost` from the identity's budget. Returns (allowed, seconds until the window rolls over)."""
+        window = settings.RATE_LIMIT_WINDOW_SECONDS
+        now = time.time()
+        index = int(now // window)
+        elapsed = now - index * window
+        previous_weight = 1.0 - elapsed / window
+        retry_after = max(1, math.ceil(window - elapsed))
+
+        redis = get_async_redis()
+        if redis is not None:
+            try:
+                allowed = await redis.eval(
+                    _HIT_SCRIPT, 2, f"ratelimit:{identity}:{index}", f"ratelimit:{identity}:{index - 1}",
+                    cost, budget, previous_weight, window * 2,
+                )
+                return bool(allowed), retry_after
+            except Exception as e:
+                metrics.inc("rate_limit.redis_errors")
+                logger.warning(f"Rate limiter: Redis unavailable, limiting locally: {e}")
+        return self._hit_local(identity, cost, budget, index, previous_weight), retry_after
+
+    def _hit_local(self, identity: str, cost: int, budget: int, index: int, previous_weight: float) -> bool:
+        with self._lock:
+            if index != self._swept_window:
+                # Identities idle for two windows have no effect on any budget anymore.
+                self._windows = {key: entry for key, entry in self._windows.items() if entry[0] >= index - 1}
+                self._swept_window = index
+            entry_index, current, previous = self._windows.get(identity, (index, 0, 0))
+            if entry_index != index:
+                previous = current if entry_index == index - 1 else 0
+                current = 0
+            if previous * previous_weight + current + cost > budget:
+                self._windows[identity] = (index, current, previous)
+                return False
+            self._windows[identity] = (index, current + cost, previous)
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"local_identities": len(self._windows)}
+
+
+class LoadShedder:
+    """
+    Global admission control. Requests are rejected with 503 + Retry-After while the
+    worker is overloaded, so it recovers instead of queueing work it cannot finish:
+
+    - event-loop lag above LOAD_SHED_LOOP_LAG_MS (measured by a background task), or
+    - requests waiting longer than LOAD_SHED_POOL_WAIT_MS for a DB connection from the pool.
+
+    Routes with a cost above 1 (uploads, research, exports) are shed first; cheap
+    routes are only shed once the loop lag reaches twice the threshold.
+    """
+
+    def __init__(self):
+        self._loop_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _monitor(self, interval: float = 0.1) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            lag = max(0.0, time.perf_counter() - started - interval)
+            # Rise at once, decay gradually: one quiet tick does not end an overload.
+            self._loop_lag = max(lag, self._loop_lag * 0.8)
+            metrics.set_gauge("load_shed.loop_lag_ms", self._loop_lag * 1000)
+
+    def _pool_wait(self) -> float:
+        from app.db.database import engine  # Imported lazily: the DB layer is not needed to build the app
+
+        pool = engine.sync_engine.pool
+        return pool.recent_checkout_wait() if hasattr(pool, "recent_checkout_wait") else 0.0
+
+    def should_shed(self, cost: int) -> bool:
+        if not settings.LOAD_SHED_ENABLED:
+            return False
+        lag_threshold = settings.LOAD_SHED_LOOP_LAG_MS / 1000
+        if cost > 1:
+            return self._loop_lag > lag_threshold or self._pool_wait() > settings.LOAD_SHED_POOL_WAIT_MS / 1000
+        return self._loop_lag > 2 * lag_threshold
+
+    def start(self) -> None:
+        if settings.LOAD_SHED_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._monitor())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.LOAD_SHED_ENABLED,
+            "loop_lag_ms": self._loop_lag * 1000,
+            "pool_wait_ms": self._pool_wait() * 1000,
+        }
+
+
+rate_limiter = SlidingWindowLimiter()
+load_shedder = LoadShedder()
+metrics.register_collector("rate_limit", rate_limiter.stats)
+metrics.register_collector("load_shedder", load_shedder.stats)
+
+
+def _bearer_subject(scope) -> Optional[str]:
+    """The subject of a valid bearer token, or None."""
+    headers = dict(scope.get("headers", ()))
+    authorization = headers.get(b"authorization", b"")
+    if authorization[:7].lower() == b"bearer ":
+        try:
+            payload = jwt.decode(authorization[7:].decode(), settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            if payload.get("sub"):
+                return payload["sub"]
+        except (JWTError, UnicodeDecodeError):
+            pass  # Invalid tokens are treated as anonymous; the endpoint rejects them anyway
+    return None
+
+
+def _client_ip(scope) -> str:
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded_for = dict(scope.get("headers", ())).get(b"x-forwarded-for")
+        if forwarded_for:
+            return forwarded_for.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def client_identity(scope) -> str:
+    """`user:<username>` for a valid bearer token, otherwise `ip:<client address>`."""
+    subject = _bearer_subject(scope)
+    return f"user:{subject}" if subject else f"ip:{_client_ip(scope)}"
+
+
+def _rate_limit_buckets(scope) -> List[Tuple[str, int]]:
+    """
+    (identity, budget) pairs a request is charged to. Authenticated requests pay both
+    their user's budget and a per-IP ceiling, so many tokens used from one address (or a
+    client minting tokens) cannot multiply the user budget.
+    """
+    ip = _client_ip(scope)
+    subject = _bearer_subject(scope)
+    if subject is None:
+        return [(f"ip:{ip}", settings.RATE_LIMIT_IP_BUDGET)]
+    return [
+        (f"user:{subject}", settings.RATE_LIMIT_USER_BUDGET),
+        (f"ip-auth:{ip}", settings.RATE_LIMIT_AUTHENTICATED_IP_BUDGET),
+    ]
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware applying load shedding and per-identity rate limits before routing.
+    Authenticated requests share RATE_LIMIT_USER_BUDGET cost units per window per user
+    and RATE_LIMIT_AUTHENTICATED_IP_BUDGET per client IP; anonymous ones
+    RATE_LIMIT_IP_BUDGET per client IP. Exceeding any of them returns 429.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        cost = route_cost(scope["method"], scope["path"])
+        if load_shedder.should_shed(cost):
+            metrics.inc("load_shed.rejected")
+            response = JSONResponse(
+                {"detail": "Server is overloaded, please retry shortly."}, status_code=503, headers={"Retry-After": "1"}
+            )
+            await response(scope, receive, send)
+            return
+
+        if settings.RATE_LIMIT_ENABLED:
+            for identity, budget in _rate_limit_buckets(scope):
+                allowed, retry_after = await rate_limiter.hit(identity, cost, budget)
+                if not allowed:
+                    break  # Rejected: the remaining buckets are not charged
+            if not allowed:
+                metrics.inc("rate_limit.rejected")
+                response = JSONResponse(
+                    {"detail": "Rate limit exceeded, please slow down."},
+                    status_code=429, headers={"Retry-After": str(retry_after)},
+                )
+                await response(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,31 @@
+from typing import Optional
+
+import redis
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+
+# Shared Redis clients for caching, pub/sub and rate limiting. Redis is optional:
+# every caller must fall back to in-process behaviour when these return None.
+_async_client: Optional[aioredis.Redis] = None
+_sync_client: Optional[redis.Redis] = None
+
+
+def get_async_redis() -> Optional[aioredis.Redis]:
+    """Return the shared asyncio Redis client, or None if REDIS_URL is not configured."""
+    global _async_client
+    if not settings.REDIS_URL:
+        return None
+    if _async_client is None:
+        _async_client = aioredis.from_url(settings.REDIS_URL, socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS)
+    return _async_client
+
+
+def get_sync_redis() -> Optional[redis.Redis]:
+    """Return the shared blocking Redis client (Celery workers, scripts), or None if not configured."""
+    global _sync_client
+    if not settings.REDIS_URL:
+        return None
+    if _sync_client is None:
+        _sync_client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS)
+    return _sync_client
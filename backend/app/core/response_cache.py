@@ -0,0 +1,200 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.redis_client import get_async_redis, get_sync_redis
+
+logger = logging.getLogger(__name__)
+
+# Cache namespace for everything derived from media_items (map and research pages).
+MEDIA_NAMESPACE = "media"
+
+
+@dataclass
+class CacheLookup:
+    """Result of `ResponseCache.lookup`: a hit carries the stored body, a miss carries the key to store under."""
+    key: str
+    namespace: str = MEDIA_NAMESPACE
+    body: Optional[bytes] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def hit(self) -> bool:
+        return self.body is not None
+
+    def to_response(self) -> Response:
+        return Response(content=self.body, media_type="application/json", headers=self.headers)
+
+
+class ResponseCache:
+    """
+    Two-tier cache of pre-serialized JSON responses, keyed by the normalized query string.
+
+    Tier 1 is an in-process LRU; tier 2 is Redis when REDIS_URL is set. Entries are
+    never invalidated one by one: every write to media_items bumps the namespace
+    version, and the version is part of every key, so stale entries simply stop being
+    read and age out (LRU eviction / Redis TTL).
+
+    Stale-read bound: within one process a bump is visible immediately. Other
+    processes see it after at most RESPONSE_CACHE_VERSION_CHECK_SECONDS with Redis,
+    or RESPONSE_CACHE_TTL_SECONDS (the entry lifetime) without it.
+
+    With a read replica, the cached endpoints may have read rows the replica had not yet
+    received when the version was bumped; caching those under the new version would serve
+    them as fresh. So nothing is stored while this process's newest known bump of the
+    namespace is younger than READ_YOUR_WRITES_SECONDS (the assumed maximum replica lag).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, bytes, Dict[str, str]]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._version_checked_at: Dict[str, float] = {}
+        self._bumped_at: Dict[str, float] = {}  # When this process first saw the current version
+        metrics.register_collector("response_cache", self.stats)
+
+    # --- versions ---
+    async def _current_version(self, namespace: str) -> int:
+        redis = get_async_redis()
+        now = time.monotonic()
+        if redis is not None and now - self._version_checked_at.get(namespace, 0.0) >= settings.RESPONSE_CACHE_VERSION_CHECK_SECONDS:
+            try:
+                remote = int(await redis.get(f"cache:version:{namespace}") or 0)
+                with self._lock:
+                    if remote > self._versions.get(namespace, 0):
+                        # Bumped by another process up to one check interval ago; counting
+                        # from now only makes the no-store window longer.
+                        self._versions[namespace] = remote
+                        self._bumped_at[namespace] = now
+                    self._version_checked_at[namespace] = now
+            except Exception as e:
+                logger.warning(f"Response cache: could not read version from Redis: {e}")
+        return self._versions.get(namespace, 0)
+
+    def _bump_local(self, namespace: str) -> None:
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            self._bumped_at[namespace] = time.monotonic()
+        metrics.inc(f"response_cache.invalidations.{namespace}")
+
+    async def invalidate(self, namespace: str = MEDIA_NAMESPACE) -> None:
+        """Bump the namespace version after a committed write (async code paths)."""
+        self._bump_local(namespace)
+        redis = get_async_redis()
+        if redis is not None:
+            try:
+                version = int(await redis.incr(f"cache:version:{namespace}"))
+                with self._lock:
+                    self._versions[namespace] = max(self._versions[namespace], version)
+            except Exception as e:
+                logger.warning(f"Response cache: could not bump version in Redis: {e}")
+
+    def invalidate_sync(self, namespace: str = MEDIA_NAMESPACE) -> None:
+        """Bump the namespace version from synchronous code (Celery workers, scripts)."""
+        self._bump_local(namespace)
+        redis = get_sync_redis()
+        if redis is not None:
+            try:
+                redis.incr(f"cache:version:{namespace}")
+            except Exception as e:
+                logger.warning(f"Response cache: could not bump version in Redis: {e}")
+
+    # --- entries ---
+    @staticmethod
+    def _normalized_query(request: Request) -> str:
+        params = sorted((k, v) for k, v in request.query_params.multi_items() if v != "")
+        return f"{request.url.path}?{json.dumps(params, separators=(',', ':'))}"
+
+    async def lookup(self, namespace: str, request: Request) -> CacheLookup:
+        """Look a request up in both tiers. On a miss, store the computed body with `store(lookup, ...)`."""
+        version = await self._current_version(namespace)
+        digest = hashlib.sha1(self._normalized_query(request).encode()).hexdigest()
+        key = f"cache:{namespace}:{version}:{digest}"
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return CacheLookup(key=key, namespace=namespace)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                metrics.inc("response_cache.hits.local")
+                return CacheLookup(key=key, body=entry[1], headers=entry[2])
+
+        redis = get_async_redis()
+        if redis is not None:
+            try:
+                raw = await redis.get(key)
+                if raw is not None:
+                    header_line, body = raw.split(b"\n", 1)
+                    headers = json.loads(header_line)
+                    self._store_local(key, body, headers)
+                    metrics.inc("response_cache.hits.redis")
+                    return CacheLookup(key=key, body=body, headers=headers)
+            except Exception as e:
+                logger.warning(f"Response cache: Redis read failed: {e}")
+
+        metrics.inc("response_cache.misses")
+        return CacheLookup(key=key, namespace=namespace)
+
+    def _replica_may_lag(self, namespace: str) -> bool:
+        with self._lock:
+            bumped_at = self._bumped_at.get(namespace)
+        return bumped_at is not None and time.monotonic() - bumped_at < settings.READ_YOUR_WRITES_SECONDS
+
+    def _store_local(self, key: str, body: bytes, headers: Dict[str, str]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + settings.RESPONSE_CACHE_TTL_SECONDS, body, headers)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.RESPONSE_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    async def store(self, lookup: CacheLookup, body: bytes, headers: Optional[Dict[str, str]] = None) -> None:
+        """
+        Store a freshly computed body under the key of its (missed) lookup. The key carries
+        the version read *before* the query ran, so a write that commits meanwhile makes
+        this entry unreachable instead of serving it as fresh.
+        """
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return
+        if settings.REPLICA_DATABASE_URL and self._replica_may_lag(lookup.namespace):
+            metrics.inc("response_cache.stores_skipped_replica_lag")
+            return
+        headers = headers or {}
+        self._store_local(lookup.key, body, headers)
+        redis = get_async_redis()
+        if redis is not None:
+            try:
+                payload = json.dumps(headers).encode() + b"\n" + body
+                await redis.set(lookup.key, payload, ex=settings.RESPONSE_CACHE_TTL_SECONDS)
+            except Exception as e:
+                logger.warning(f"Response cache: Redis write failed: {e}")
+
+    def stats(self) -> dict:
+        hits = metrics.counter("response_cache.hits.local") + metrics.counter("response_cache.hits.redis")
+        misses = metrics.counter("response_cache.misses")
+        with self._lock:
+            entries = len(self._entries)
+            versions = dict(self._versions)
+        return {
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "entries": entries,
+            "versions": versions,
+            "redis_enabled": bool(settings.REDIS_URL),
+            "stale_read_bound_seconds": (
+                settings.RESPONSE_CACHE_VERSION_CHECK_SECONDS if settings.REDIS_URL
+                else settings.RESPONSE_CACHE_TTL_SECONDS
+            ),
+        }
+
+
+response_cache = ResponseCache()
@@ -1,12 +1,13 @@
 import asyncio # Ensure asyncio is imported here if used directly, otherwise remove
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
+from app.core.password_hasher import PasswordHasherBusyError, password_hasher
+from app.core.user_cache import auth_user_cache
 from app.models.user import User as UserModel
 from app.db.database import get_db # THIS LINE IS ADDED BACK
 
@@ -14,14 +15,23 @@ from app.db.database import get_db # THIS LINE IS ADDED BACK
 # It's only needed within the functions that use it as a dependency.
 # from app.db.database import get_db # THIS LINE IS REMOVED
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/users/login")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+def _hasher_busy() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many password operations in progress, please retry shortly.", headers={"Retry-After": "1"})
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def verify_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Check a password off the event loop. Returns (matches, new_hash) where new_hash is set if the stored hash should be upgraded."""
+    try:
+        return await password_hasher.verify_and_update(plain_password, hashed_password)
+    except PasswordHasherBusyError:
+        raise _hasher_busy()
+
+async def get_password_hash(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHasherBusyError:
+        raise _hasher_busy()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -39,9 +49,13 @@ async def get_current_user(db: AsyncSession = Depends(get_db), token: str = Depe
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = await crud_user.get_user_by_username(db, username=username)
+    # Hot path: served from the per-worker user cache, the DB is only hit on a miss
+    user = await auth_user_cache.get(db, username)
     if user is None:
-        raise credentials_exception
+        user = await crud_user.get_user_by_username(db, username=username)
+        if user is None:
+            raise credentials_exception
+        auth_user_cache.put(user)
     return user
 
 async def get_current_active_user(current_user: UserModel = Depends(get_current_user)) -> UserModel:
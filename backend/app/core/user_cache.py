@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.redis_client import get_async_redis
+from app.models.user import User as UserModel
+
+logger = logging.getLogger(__name__)
+
+# Redis pub/sub channel carrying the usernames whose cached principal must be dropped.
+INVALIDATION_CHANNEL = "auth:user-invalidate"
+
+
+class AuthUserCache:
+    """
+    Per-process TTL/LRU cache of authenticated users, keyed by the JWT subject (username),
+    so `get_current_user` does not query `users` on every request.
+
+    Entries are plain column snapshots, not ORM objects: on a hit the snapshot is turned
+    back into a User attached to the request's session without a query, so endpoints can
+    keep modifying and committing it as before.
+
+    Writes through crud_user invalidate the entry here and, with REDIS_URL set, in every
+    other worker through pub/sub. Changes made outside the API (scripts, psql) are picked
+    up after at most AUTH_USER_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._listener: Optional[asyncio.Task] = None
+        metrics.register_collector("auth_user_cache", self.stats)
+
+    @property
+    def enabled(self) -> bool:
+        return settings.AUTH_USER_CACHE_TTL_SECONDS > 0
+
+    async def get(self, db: AsyncSession, username: str) -> Optional[UserModel]:
+        """Return the cached user attached to `db`, or None on a miss."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None or entry[0] <= time.monotonic():
+                metrics.inc("auth_user_cache.misses")
+                return None
+            self._entries.move_to_end(username)
+            snapshot = entry[1]
+        metrics.inc("auth_user_cache.hits")
+
+        user = UserModel(**{**snapshot, "earned_badges": list(snapshot["earned_badges"] or [])})
+        make_transient_to_detached(user)  # Looks like a freshly loaded, unmodified row
+        return await db.merge(user, load=False)
+
+    def put(self, user: UserModel) -> None:
+        if not self.enabled:
+            return
+        snapshot = {column.key: getattr(user, column.key) for column in UserModel.__table__.columns}
+        snapshot["earned_badges"] = list(snapshot["earned_badges"] or [])
+        with self._lock:
+            self._entries[user.username] = (time.monotonic() + settings.AUTH_USER_CACHE_TTL_SECONDS, snapshot)
+            self._entries.move_to_end(user.username)
+            while len(self._entries) > settings.AUTH_USER_CACHE_MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def _drop(self, username: str) -> None:
+        with self._lock:
+            self._entries.pop(username, None)
+
+    async def invalidate(self, *usernames: str) -> None:
+        """Drop the cached principals of `usernames` here and in every other worker."""
+        for username in usernames:
+            self._drop(username)
+        redis = get_async_redis()
+        if redis is not None:
+            for username in usernames:
+                try:
+                    await redis.publish(INVALIDATION_CHANNEL, username)
+                except Exception as e:
+                    logger.warning(f"Auth user cache: could not publish invalidation: {e}")
+
+    async def _listen(self) -> None:
+        while True:
+            redis = get_async_redis()
+            if redis is None:
+                return
+            pubsub = redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Entries may have changed while we were not subscribed.
+                with self._lock:
+                    self._entries.clear()
+                while True:
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self._drop(message["data"].decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Auth user cache: invalidation listener failed, retrying: {e}")
+                await asyncio.sleep(1.0)
+            finally:
+                await pubsub.aclose()
+
+    def start(self) -> None:
+        if self.enabled and settings.REDIS_URL and self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is None:
+            return
+        self._listener.cancel()
+        try:
+            await self._listener
+        except asyncio.CancelledError:
+            pass
+        self._listener = None
+
+    def stats(self) -> dict:
+        hits = metrics.counter("auth_user_cache.hits")
+        misses = metrics.counter("auth_user_cache.misses")
+        with self._lock:
+            entries = len(self._entries)
+        return {
+            "enabled": self.enabled,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "entries": entries,
+            "cross_worker_invalidation": bool(settings.REDIS_URL),
+        }
+
+
+auth_user_cache = AuthUserCache()
@@ -2,4 +2,6 @@
 
 from . import crud_user
 from . import crud_media
-from . import crud_validation_vote
\ No newline at end of file
+from . import crud_validation_vote
+from . import crud_validation_tally
+from . import crud_research
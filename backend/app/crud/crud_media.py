@@ -4,7 +4,30 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime, timezone # Ensure timezone is imported for manual timestamp updates
 
 from app.models.media import MediaItem as MediaItemModel # Your SQLAlchemy model for MediaItem
+from app.models.validation_vote import ValidationVote as ValidationVoteModel
 from app.schemas.media import MediaItemCreate, MediaItemUpdate # Your Pydantic schemas for MediaItem
+from app.crud.pagination import keyset_after
+from app.crud.text_search import MatchMode, text_match
+from app.services import rollup_service
+from app.core.response_cache import response_cache
+
+# MediaItem fields the cached map/research payloads and filters are built from (the
+# effective_* columns derive from the AI and validated values). Writes that change none
+# of them leave the response cache valid.
+CACHED_MEDIA_FIELDS = (
+    "latitude", "longitude", "sighting_timestamp", "file_url",
+    "species_ai_prediction", "health_status_ai_prediction",
+    "validated_species", "validated_health_status", "is_validated_by_community",
+)
+
+
+def cached_fields_changed(before: Dict[str, Any], after: Dict[str, Any]) -> bool:
+    """True if a field of CACHED_MEDIA_FIELDS present in `after` differs from `before`."""
+    return any(field in after and after[field] != before.get(field) for field in CACHED_MEDIA_FIELDS)
+
+
+def _cached_snapshot(db_media_item: MediaItemModel) -> Dict[str, Any]:
+    return {field: getattr(db_media_item, field) for field in CACHED_MEDIA_FIELDS}
 
 # --- CREATE MediaItem ---
 async def create_media_item(
@@ -33,7 +56,10 @@ async def create_media_item(
         updated_at=datetime.now(timezone.utc) # Explicitly set updated_at on creation
     )
     db.add(db_media_item) # Add the new object to the session
+    # Count the sighting in the rollups in the same transaction (usually a no-op: AI results arrive later)
+    await rollup_service.apply_rollup_changes(db, [(None, rollup_service.rollup_key_for_item(db_media_item))])
     await db.commit()      # Commit the transaction to save to the database
+    await response_cache.invalidate() # Map/research pages may now include this item
     await db.refresh(db_media_item) # Refresh the instance to get DB-generated values (ID, created_at)
     return db_media_item
 
@@ -54,13 +80,76 @@ async def get_media_item(db: AsyncSession, media_item_id: int) -> Optional[Media
     )
     return result.scalar_one_or_none() # Efficiently gets one result or None
 
+# --- GET MediaItem by ID, locked ---
+async def get_media_item_for_update(db: AsyncSession, media_item_id: int) -> Optional[MediaItemModel]:
+    """
+    Retrieve a media item with SELECT ... FOR UPDATE, locking its row until the commit.
+
+    Writers that move a sighting between rollup buckets must compute the old rollup key
+    from this locked read: from an unlocked one, two concurrent writers could both apply
+    a delta from the same stale key. `populate_existing` re-reads an instance already
+    loaded in the session, so the caller's object holds the current values afterwards.
+    """
+    result = await db.execute(
+        select(MediaItemModel)
+        .filter(MediaItemModel.id == media_item_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one_or_none()
+
+# --- Check which MediaItems exist ---
+async def get_existing_media_item_ids(db: AsyncSession, media_item_ids: List[int]) -> set:
+    """
+    Return the subset of `media_item_ids` that exist, with a single query.
+    """
+    result = await db.execute(
+        select(MediaItemModel.id).filter(MediaItemModel.id.in_(media_item_ids))
+    )
+    return set(result.scalars().all())
+
 # --- GET Multiple MediaItems (with pagination and potential filtering) ---
+def media_items_query(
+    skip: int = 0,
+    limit: int = 100,
+    user_id: Optional[int] = None,
+    species_filter: Optional[str] = None,
+    species_match: MatchMode = "contains",
+    cursor: Optional[str] = None,
+):
+    """
+    The SELECT run by get_media_items (arguments as documented there), so its plan can be checked.
+
+    Raises:
+        InvalidCursorError: If the cursor cannot be decoded.
+    """
+    query = select(MediaItemModel) # Start with a base query to select all MediaItems
+    
+    # Apply filters if they are provided
+    if user_id is not None:
+        query = query.filter(MediaItemModel.user_id == user_id)
+    
+    if species_filter:
+        # Case-insensitive match on lower(species_ai_prediction), served by its trigram index
+        query = query.filter(text_match(MediaItemModel.species_ai_prediction, species_filter, species_match))
+            
+    # Add other filters here (e.g., for location, date, validation status)
+
+    # Apply ordering (newest first, id as tie-breaker) and pagination
+    if cursor:
+        query = query.filter(keyset_after(MediaItemModel.created_at, MediaItemModel.id, cursor))
+    elif skip:
+        query = query.offset(skip)
+    return query.order_by(MediaItemModel.created_at.desc(), MediaItemModel.id.desc()).limit(limit)
+
 async def get_media_items(
     db: AsyncSession, 
     skip: int = 0, 
     limit: int = 100,
     user_id: Optional[int] = None,        # Optional filter: get items for a specific user
     species_filter: Optional[str] = None, # Optional filter: search by AI predicted species
+    species_match: MatchMode = "contains", # How species_filter is matched (exact/prefix/contains/fuzzy)
+    cursor: Optional[str] = None,         # Opaque keyset cursor from the previous page
     # Add more filters here as needed: location (bounding box), date range, validated status, etc.
 ) -> List[MediaItemModel]:
     """
@@ -68,29 +157,21 @@ async def get_media_items(
     
     Args:
         db: The asynchronous database session.
-        skip: Number of records to skip (for pagination).
+        skip: Number of records to skip (legacy offset pagination, ignored when a cursor is given).
         limit: Maximum number of records to return.
         user_id: Optional user ID to filter media items by owner.
-        species_filter: Optional string to filter media items by AI predicted species (case-insensitive like search).
+        species_filter: Optional string to filter media items by AI predicted species (case-insensitive).
+        species_match: Match mode for species_filter, see app.crud.text_search (trigram-indexed).
+        cursor: Optional cursor (see app.crud.pagination) to continue after the previous page.
+                Keyset pagination on (created_at, id) costs the same for every page.
         
     Returns:
         A list of MediaItemModel instances.
-    """
-    query = select(MediaItemModel) # Start with a base query to select all MediaItems
-    
-    # Apply filters if they are provided
-    if user_id is not None:
-        query = query.filter(MediaItemModel.user_id == user_id)
-    
-    if species_filter:
-        # Using ilike for case-insensitive partial string matching
-        query = query.filter(MediaItemModel.species_ai_prediction.ilike(f"%{species_filter}%"))
-            
-    # Add other filters here (e.g., for location, date, validation status)
 
-    # Apply ordering (e.g., newest first) and pagination
-    query = query.order_by(MediaItemModel.created_at.desc()).offset(skip).limit(limit)
-    
+    Raises:
+        InvalidCursorError: If the cursor cannot be decoded.
+    """
+    query = media_items_query(skip, limit, user_id, species_filter, species_match, cursor)
     result = await db.execute(query)
     return result.scalars().all() # Get all matching MediaItemModel instances
 
@@ -101,7 +182,7 @@ async def update_media_item(
     db: AsyncSession, 
     db_media_item: MediaItemModel,   # The existing ORM model instance retrieved from the DB
     media_item_in: MediaItemUpdate # Pydantic schema containing the update data
-) -> MediaItemModel:
+) -> Optional[MediaItemModel]:
     """
     Update an existing media item in the database.
     
@@ -112,10 +193,15 @@ async def update_media_item(
                        Only fields explicitly set in media_item_in will be updated.
                        
     Returns:
-        The updated MediaItemModel instance.
+        The updated MediaItemModel instance, or None if it was deleted meanwhile.
     """
     # Get a dictionary of only the fields that were explicitly provided in the input schema
     update_data = media_item_in.model_dump(exclude_unset=True) 
+    # Lock the row and reload it: the old rollup key must come from the current values
+    if await get_media_item_for_update(db, db_media_item.id) is None:
+        return None
+    old_rollup_key = rollup_service.rollup_key_for_item(db_media_item)
+    cached_before = _cached_snapshot(db_media_item)
 
     for field_name, value in update_data.items():
         # Update the attribute on the SQLAlchemy model instance if the value is not None.
@@ -129,7 +215,13 @@ async def update_media_item(
         # But be careful with NOT NULL constraints.
 
     db.add(db_media_item) # Add the modified object to the session
+    await rollup_service.apply_rollup_changes(
+        db, [(old_rollup_key, rollup_service.rollup_key_for_item(db_media_item))]
+    )
+    cached_changed = cached_fields_changed(cached_before, _cached_snapshot(db_media_item))
     await db.commit()      # Commit the changes to the database
+    if cached_changed:
+        await response_cache.invalidate()
     await db.refresh(db_media_item) # Refresh to get any DB-side updates (like updated_at)
     return db_media_item
 
@@ -148,10 +240,12 @@ async def delete_media_item(db: AsyncSession, media_item_id: int) -> Optional[Me
     Returns:
         The deleted MediaItemModel instance if found and deleted, otherwise None.
     """
-    db_media_item = await get_media_item(db, media_item_id=media_item_id)
+    db_media_item = await get_media_item_for_update(db, media_item_id=media_item_id)
     if db_media_item:
+        await rollup_service.apply_rollup_changes(db, [(rollup_service.rollup_key_for_item(db_media_item), None)])
         await db.delete(db_media_item)
         await db.commit()
+        await response_cache.invalidate()
         return db_media_item # The object is now marked as deleted in the session
     return None
         
@@ -180,10 +274,13 @@ async def update_media_item_ai_results(
     Returns:
         The updated MediaItemModel instance, or None if not found.
     """
-    db_media_item = await get_media_item(db, media_item_id=media_item_id)
+    db_media_item = await get_media_item_for_update(db, media_item_id=media_item_id)
     if not db_media_item:
         return None # Media item not found
 
+    old_rollup_key = rollup_service.rollup_key_for_item(db_media_item)
+    cached_before = _cached_snapshot(db_media_item)
+
     # Update fields if new values are provided
     if species is not None:
         db_media_item.species_ai_prediction = species
@@ -199,29 +296,94 @@ async def update_media_item_ai_results(
     db_media_item.updated_at = datetime.now(timezone.utc) 
 
     db.add(db_media_item)
+    await rollup_service.apply_rollup_changes(
+        db, [(old_rollup_key, rollup_service.rollup_key_for_item(db_media_item))]
+    )
+    cached_changed = cached_fields_changed(cached_before, _cached_snapshot(db_media_item))
     await db.commit()
+    if cached_changed:
+        await response_cache.invalidate()
     await db.refresh(db_media_item)
     return db_media_item
 
+# --- Map data points ---
+def map_points_query(
+    species: Optional[str] = None,
+    health_status: Optional[str] = None,
+    match: MatchMode = "contains",
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 1000,
+):
+    """
+    Located items for GET /map/data, newest sighting first (undated last), filtered on the
+    effective species/health and keyset-paginated on (sighting_timestamp, id).
+
+    Raises:
+        InvalidCursorError: If the cursor cannot be decoded.
+    """
+    query = (
+        select(MediaItemModel)
+        .filter(MediaItemModel.latitude.isnot(None))
+        .filter(MediaItemModel.longitude.isnot(None))
+    )
+    if species:
+        query = query.filter(text_match(MediaItemModel.effective_species, species, match))
+    if health_status:
+        query = query.filter(text_match(MediaItemModel.effective_health, health_status, match))
+    if cursor:
+        query = query.filter(
+            keyset_after(MediaItemModel.sighting_timestamp, MediaItemModel.id, cursor, nullable=True)
+        )
+    elif skip:
+        query = query.offset(skip)
+    return query.order_by(
+        MediaItemModel.sighting_timestamp.desc().nullslast(), MediaItemModel.id.desc()
+    ).limit(limit)
+
+# --- GET the validation work queue ---
+def validation_queue_query(user_id: int, limit: int = 20):
+    """The SELECT run by get_validation_queue."""
+    already_voted = (
+        select(ValidationVoteModel.id)
+        .filter(ValidationVoteModel.media_item_id == MediaItemModel.id)
+        .filter(ValidationVoteModel.user_id == user_id)
+    )
+    return (
+        select(MediaItemModel)
+        .filter(MediaItemModel.is_validated_by_community == False)  # noqa: E712 - must match the partial index predicate
+        .filter(MediaItemModel.ai_processing_status == "completed")
+        .filter(~already_voted.exists())
+        .order_by(MediaItemModel.validation_priority.desc(), MediaItemModel.id.desc())
+        .limit(limit)
+    )
+
+async def get_validation_queue(db: AsyncSession, user_id: int, limit: int = 20) -> List[MediaItemModel]:
+    """
+    Items that most need community validation, for one validator.
+
+    Only AI-processed items without consensus are considered, ranked by the maintained
+    validation_priority and served from the partial ix_media_items_validation_queue index.
+    Items the user already voted on are skipped with an anti-join on uq_user_media_vote.
+    """
+    result = await db.execute(validation_queue_query(user_id, limit))
+    return result.scalars().all()
+
 # --- GET MediaItems by User ---
-async def get_media_items_by_user(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100):
+async def get_media_items_by_user(
+    db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100, cursor: Optional[str] = None
+):
     """
     Retrieve a list of media items for a specific user, with pagination.
     
     Args:
         db: The asynchronous database session.
         user_id: The ID of the user whose media items you want to retrieve.
-        skip: Number of records to skip (for pagination).
+        skip: Number of records to skip (legacy offset pagination, ignored when a cursor is given).
         limit: Maximum number of records to return.
+        cursor: Optional keyset cursor on (created_at, id) from the previous page.
         
     Returns:
         A list of MediaItemModel instances belonging to the specified user.
     """
-    result = await db.execute(
-        select(MediaItemModel)
-        .filter(MediaItemModel.user_id == user_id)
-        .order_by(MediaItemModel.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-    )
-    return result.scalars().all()
\ No newline at end of file
+    return await get_media_items(db, skip=skip, limit=limit, user_id=user_id, cursor=cursor)
\ No newline at end of file
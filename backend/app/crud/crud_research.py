@@ -0,0 +1,157 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.future import select
+from sqlalchemy.sql import Select
+
+from app.models.media import MediaItem as MediaItemModel
+from app.crud.pagination import keyset_after
+from app.crud.text_search import MatchMode, text_match
+
+
+@dataclass
+class ResearchFilters:
+    """
+    The filter set shared by every research endpoint (paged data, exports, ...).
+    Built once per request by the `research_filters` dependency in the research router.
+    """
+    species: Optional[str] = None
+    health_status: Optional[str] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    only_validated: bool = False
+    match: MatchMode = "contains"
+
+
+def final_species_column():
+    """Validated species if the community reached consensus, otherwise the AI prediction."""
+    return MediaItemModel.effective_species
+
+
+def final_health_column():
+    """Validated health status if the community reached consensus, otherwise the AI prediction."""
+    return MediaItemModel.effective_health
+
+
+def apply_research_filters(query: Select, filters: ResearchFilters) -> Select:
+    """
+    Apply the research filters to a query over media_items.
+
+    Only sightings with a location and a timestamp are ever exposed to researchers.
+
+    Args:
+        query: A select() whose FROM clause includes media_items.
+        filters: The ResearchFilters for this request.
+
+    Returns:
+        The filtered query.
+    """
+    query = (
+        query.filter(MediaItemModel.latitude.isnot(None))
+             .filter(MediaItemModel.longitude.isnot(None))
+             .filter(MediaItemModel.sighting_timestamp.isnot(None))
+    )
+
+    if filters.species:
+        query = query.filter(text_match(MediaItemModel.effective_species, filters.species, filters.match))
+    if filters.health_status:
+        query = query.filter(text_match(MediaItemModel.effective_health, filters.health_status, filters.match))
+
+    if filters.date_from:
+        query = query.filter(MediaItemModel.sighting_timestamp >= filters.date_from)
+    if filters.date_to:
+        query = query.filter(MediaItemModel.sighting_timestamp <= filters.date_to)
+
+    if filters.only_validated:
+        query = query.filter(MediaItemModel.is_validated_by_community == True)
+
+    return query
+
+
+def research_order():
+    """
+    Newest-first sort key of research listings. Spelled DESC NULLS LAST like
+    ix_media_items_sighting_timestamp_id: timestamps are never NULL here, but the planner
+    only walks the index for the exact NULLS ordering it was built with.
+    """
+    return MediaItemModel.sighting_timestamp.desc().nullslast()
+
+
+def research_page_query(
+    filters: ResearchFilters, cursor: Optional[str] = None, skip: int = 0, limit: int = 1000
+) -> Select:
+    """
+    One page of GET /research/data: classified items, newest first, keyset-paginated on
+    (sighting_timestamp, id).
+
+    Raises:
+        InvalidCursorError: If the cursor cannot be decoded.
+    """
+    query = apply_research_filters(select(MediaItemModel), filters)
+    query = query.filter(MediaItemModel.effective_species.isnot(None)).filter(MediaItemModel.effective_health.isnot(None))
+    if cursor:
+        query = query.filter(keyset_after(MediaItemModel.sighting_timestamp, MediaItemModel.id, cursor))
+    elif skip:
+        query = query.offset(skip)
+    return query.order_by(research_order(), MediaItemModel.id.desc()).limit(limit)
+
+
+def research_rows_query(filters: ResearchFilters) -> Select:
+    """
+    Build a column-only query returning one flat row per research data point:
+    (id, latitude, longitude, species, health_status, sighting_timestamp).
+
+    Rows without a final species or health status are dropped in SQL, so callers
+    can stream the result without loading ORM objects.
+    """
+    species = final_species_column()
+    health = final_health_column()
+    query = select(
+        MediaItemModel.id,
+        MediaItemModel.latitude,
+        MediaItemModel.longitude,
+        species.label("species"),
+        health.label("health_status"),
+        MediaItemModel.sighting_timestamp,
+    )
+    query = apply_research_filters(query, filters)
+    query = query.filter(species.isnot(None)).filter(health.isnot(None))
+    return query.order_by(research_order(), MediaItemModel.id.desc())
+
+
+# Column order of the columnar (Arrow/Parquet) sightings dataset.
+DATASET_COLUMNS = [
+    "id", "latitude", "longitude", "species", "health_status", "ai_confidence_score",
+    "is_validated_by_community", "sighting_timestamp", "created_at",
+]
+
+
+def dataset_rows_query(filters: ResearchFilters, oldest_first: bool = False) -> Select:
+    """
+    Like `research_rows_query`, but with the wider DATASET_COLUMNS column set used by
+    the columnar exports. All filters are pushed down into the SQL.
+
+    Args:
+        filters: The ResearchFilters to apply.
+        oldest_first: Order by ascending sighting time (used by the partitioned snapshot job).
+    """
+    species = final_species_column()
+    health = final_health_column()
+    query = select(
+        MediaItemModel.id,
+        MediaItemModel.latitude,
+        MediaItemModel.longitude,
+        species.label("species"),
+        health.label("health_status"),
+        MediaItemModel.ai_confidence_score,
+        MediaItemModel.is_validated_by_community,
+        MediaItemModel.sighting_timestamp,
+        MediaItemModel.created_at,
+    )
+    query = apply_research_filters(query, filters)
+    query = query.filter(species.isnot(None)).filter(health.isnot(None))
+    if oldest_first:
+        # The backward scan of ix_media_items_sighting_timestamp_id (ASC NULLS FIRST)
+        return query.order_by(MediaItemModel.sighting_timestamp.asc().nullsfirst(), MediaItemModel.id.asc())
+    return query.order_by(research_order(), MediaItemModel.id.desc())
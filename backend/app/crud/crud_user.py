@@ -1,10 +1,21 @@
+from sqlalchemy import String, any_, cast, func, inspect, not_, tuple_, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import List, Optional
+from sqlalchemy.orm import load_only
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import List, Optional, Tuple
 
 from app.models.user import User as UserModel
 from app.schemas.user import UserCreate, UserUpdate
+from app.core.leaderboard import leaderboard
 from app.core.security import get_password_hash
+from app.core.user_cache import auth_user_cache
+from app.crud.pagination import keyset_after
+from app.services import badge_service
+
+# Columns the leaderboard views need; keeps their rows narrow.
+LEADERBOARD_COLUMNS = (UserModel.id, UserModel.username, UserModel.score, UserModel.earned_badges)
 
 async def get_user_by_username(db: AsyncSession, username: str) -> Optional[UserModel]:
     result = await db.execute(select(UserModel).filter(UserModel.username == username))
@@ -15,11 +26,12 @@ async def get_user_by_email(db: AsyncSession, email: str) -> Optional[UserModel]
     return result.scalar_one_or_none()
 
 async def create_user(db: AsyncSession, user_in: UserCreate) -> UserModel:
-    hashed_password = get_password_hash(user_in.password)
+    hashed_password = await get_password_hash(user_in.password)
     db_user = UserModel(email=user_in.email, username=user_in.username, hashed_password=hashed_password)
     db.add(db_user)
     await db.commit()
     await db.refresh(db_user)
+    await leaderboard.record(db_user.id, db_user.score)
     return db_user
 
 # --- NEW FUNCTION TO FIX THE BUG ---
@@ -29,10 +41,11 @@ async def update_user(db: AsyncSession, db_user: UserModel, user_in: UserUpdate)
     """
     # Get a dictionary of the fields that were actually provided by the user
     update_data = user_in.model_dump(exclude_unset=True)
+    previous_username = db_user.username
 
     # If the user is updating their password, we need to hash it first
     if "password" in update_data and update_data["password"]:
-        hashed_password = get_password_hash(update_data["password"])
+        hashed_password = await get_password_hash(update_data["password"])
         db_user.hashed_password = hashed_password
         del update_data["password"]  # Remove password from dict to avoid setting it directly
 
@@ -41,38 +54,110 @@ async def update_user(db: AsyncSession, db_user: UserModel, user_in: UserUpdate)
         setattr(db_user, field, value)
 
     db.add(db_user)
+    usernames = {previous_username, db_user.username}
     await db.commit()
+    # Tokens carry the username, so the old one must stop resolving too
+    await auth_user_cache.invalidate(*usernames)
     await db.refresh(db_user)
     return db_user
 # --- END NEW FUNCTION ---
 
-async def add_score_and_check_badges(db: AsyncSession, user: UserModel, points: int) -> UserModel:
-    await db.refresh(user)
-    
-    user.score += points
-
-    BADGE_THRESHOLDS = {
-        "Ocean Explorer": 10,
-        "Marine Scientist I": 50,
-        "Deep Sea Diver": 100,
-    }
-
-    new_badges = list(user.earned_badges)
-    made_change = False
-
-    for badge, threshold in BADGE_THRESHOLDS.items():
-        if user.score >= threshold and badge not in new_badges:
-            new_badges.append(badge)
-            made_change = True
-    
-    if made_change:
-        user.earned_badges = new_badges
+async def update_password_hash(db: AsyncSession, db_user: UserModel, hashed_password: str) -> None:
+    """Store an upgraded hash of the user's unchanged password (see BCRYPT_ROUNDS)."""
+    db_user.hashed_password = hashed_password
+    username = db_user.username
+    db.add(db_user)
+    await db.commit()
+    await auth_user_cache.invalidate(username)
+
+def _score_and_badges_update(user_id: int, points: int):
+    """
+    UPDATE users SET score = score + :points, earned_badges = earned_badges || <newly reached score badges>
+    RETURNING *: the increment and the badge check see the same row version, so concurrent
+    awards can neither lose points nor skip or duplicate a badge.
+    """
+    users = UserModel.__table__
+    new_score = users.c.score + points
+    badges = badge_service.rules_values(badge_service.rules_for((badge_service.SCORE,)))
+    reached = (
+        select(func.array_agg(aggregate_order_by(cast(badges.c.name, String(50)), badges.c.threshold)))
+        .where(badges.c.threshold <= new_score, not_(badges.c.name == any_(users.c.earned_badges)))
+        .scalar_subquery()
+    )
+    return (
+        update(users)
+        .where(users.c.id == user_id)
+        # array || NULL leaves the array unchanged when no new badge was reached.
+        .values(score=new_score, earned_badges=users.c.earned_badges.concat(reached))
+        .returning(*users.c)
+    )
 
+async def add_score_and_check_badges(db: AsyncSession, user: UserModel, points: int) -> UserModel:
+    """
+    Atomically add `points` to the user's score and award the score badges reached, in
+    one statement. The returned row is loaded back into `user`, so no refresh is needed.
+    """
+    # From the identity key: the caller's commits expired `user`, and reading an expired
+    # attribute would lazy-load it, which an AsyncSession cannot do.
+    user_id = inspect(user).identity[0]
     try:
-        db.add(user)
+        row = (await db.execute(_score_and_badges_update(user_id, points))).mappings().one()
         await db.commit()
-        await db.refresh(user)
-        return user
     except Exception as e:
         await db.rollback()
-        raise Exception(f"Failed to update user score: {str(e)}") from e
\ No newline at end of file
+        raise Exception(f"Failed to update user score: {str(e)}") from e
+
+    for key, value in row.items():
+        set_committed_value(user, key, value)
+    await auth_user_cache.invalidate(row["username"])
+    await leaderboard.record(user_id, row["score"])
+    return user
+
+def leaderboard_query(limit: int = 50, cursor: Optional[str] = None):
+    """The SELECT run by get_leaderboard."""
+    query = select(UserModel).options(load_only(*LEADERBOARD_COLUMNS))
+    if cursor:
+        query = query.filter(keyset_after(UserModel.score, UserModel.id, cursor, numeric=True))
+    return query.order_by(UserModel.score.desc(), UserModel.id.desc()).limit(limit)
+
+async def get_leaderboard(db: AsyncSession, limit: int = 50, cursor: Optional[str] = None) -> List[UserModel]:
+    """
+    Users by score, highest first (ties: newest account first), keyset-paginated on
+    (score, id) so every page is a seek into ix_users_score_id.
+    """
+    result = await db.execute(leaderboard_query(limit, cursor))
+    return list(result.scalars().all())
+
+async def get_leaderboard_neighbours(
+    db: AsyncSession, score: int, user_id: int, radius: int
+) -> Tuple[List[UserModel], List[UserModel]]:
+    """Return the `radius` users ranked directly above and below a (score, user_id) position, in rank order."""
+    position = tuple_(UserModel.score, UserModel.id)
+    base = select(UserModel).options(load_only(*LEADERBOARD_COLUMNS))
+    above = await db.execute(
+        base.filter(position > tuple_(score, user_id))
+        .order_by(UserModel.score.asc(), UserModel.id.asc()).limit(radius)
+    )
+    below = await db.execute(
+        base.filter(position < tuple_(score, user_id))
+        .order_by(UserModel.score.desc(), UserModel.id.desc()).limit(radius)
+    )
+    return list(reversed(above.scalars().all())), list(below.scalars().all())
+
+def leaderboard_rank_query(score: int, user_id: int):
+    """Count of the users ranked above a (score, user_id) position (SQL fallback of get_leaderboard_rank)."""
+    return (
+        select(func.count()).select_from(UserModel)
+        .where(tuple_(UserModel.score, UserModel.id) > tuple_(score, user_id))
+    )
+
+async def get_leaderboard_rank(db: AsyncSession, score: int, user_id: int) -> int:
+    """
+    1-based leaderboard rank of a (score, user_id) position. Served from the Redis
+    leaderboard when available, otherwise counted with an index-only scan.
+    """
+    rank = await leaderboard.rank(user_id)
+    if rank is not None:
+        return rank
+    result = await db.execute(leaderboard_rank_query(score, user_id))
+    return result.scalar_one() + 1
@@ -0,0 +1,167 @@
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import String, delete, func, literal, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.validation_tally import ValidationTally as ValidationTallyModel
+from app.models.validation_vote import ValidationVote as ValidationVoteModel
+
+CONFIRM = "confirm"
+CORRECTION = "correction"
+
+# What one vote contributes to the tallies: (attribute, kind, value).
+TallyEntry = Tuple[str, str, str]
+
+
+def tally_entries(vote) -> List[TallyEntry]:
+    """
+    Tally entries of a vote (a ValidationVote or any object with the same attribute names).
+    None (no vote) contributes nothing.
+    """
+    if vote is None:
+        return []
+    entries: List[TallyEntry] = []
+    for attribute, voted, corrected in (
+        ("species", vote.vote_on_species, vote.corrected_species_name),
+        ("health", vote.vote_on_health, vote.corrected_health_status),
+    ):
+        if voted is True:
+            entries.append((attribute, CONFIRM, ""))
+        elif voted is False and corrected:
+            entries.append((attribute, CORRECTION, corrected))
+    return entries
+
+
+def tally_deltas(changes: Iterable[Tuple[int, object, object]]) -> Counter:
+    """
+    Net tally delta of a list of vote changes (media_item_id, vote before, vote after),
+    keyed on (media_item_id, attribute, kind, value).
+    """
+    deltas: Counter = Counter()
+    for media_item_id, old_vote, new_vote in changes:
+        for entry in tally_entries(old_vote):
+            deltas[(media_item_id, *entry)] -= 1
+        for entry in tally_entries(new_vote):
+            deltas[(media_item_id, *entry)] += 1
+    return deltas
+
+
+def tally_upsert_statement(deltas: Counter):
+    """
+    One multi-row INSERT ... ON CONFLICT DO UPDATE adding `deltas` to the tallies.
+    Returns None if there is nothing to apply.
+    """
+    # Sorted so concurrent writers always lock tally rows in the same order.
+    values = [
+        {"media_item_id": media_item_id, "attribute": attribute, "kind": kind, "value": value, "vote_count": delta}
+        for (media_item_id, attribute, kind, value), delta in sorted(deltas.items())
+        if delta != 0
+    ]
+    if not values:
+        return None
+    stmt = insert(ValidationTallyModel).values(values)
+    return stmt.on_conflict_do_update(
+        index_elements=["media_item_id", "attribute", "kind", "value"],
+        set_={"vote_count": ValidationTallyModel.vote_count + stmt.excluded.vote_count},
+    )
+
+
+async def apply_vote_changes(db: AsyncSession, changes: Iterable[Tuple[int, object, object]]) -> None:
+    """
+    Apply vote changes (media_item_id, vote before, vote after) to the tallies inside the
+    caller's transaction (no commit), so tallies and votes always commit together.
+    """
+    stmt = tally_upsert_statement(tally_deltas(changes))
+    if stmt is not None:
+        await db.execute(stmt)
+
+
+async def get_tallies_for_media_item(db: AsyncSession, media_item_id: int) -> List[ValidationTallyModel]:
+    result = await db.execute(
+        select(ValidationTallyModel)
+        .filter(ValidationTallyModel.media_item_id == media_item_id)
+        .filter(ValidationTallyModel.vote_count > 0)
+    )
+    return result.scalars().all()
+
+
+def vote_counts(tallies: Iterable[ValidationTallyModel]) -> dict:
+    """Tally rows of one item as {attribute: {"confirm": n, "corrections": {value: n}}}."""
+    counts = {"species": {"confirm": 0, "corrections": {}}, "health": {"confirm": 0, "corrections": {}}}
+    for tally in tallies:
+        if tally.kind == CONFIRM:
+            counts[tally.attribute]["confirm"] = tally.vote_count
+        else:
+            counts[tally.attribute]["corrections"][tally.value] = tally.vote_count
+    return counts
+
+
+async def get_tallies_for_media_items(db: AsyncSession, media_item_ids: List[int]) -> list:
+    """(media_item_id, attribute, kind, value, vote_count) rows of several media items, in one query."""
+    result = await db.execute(
+        select(
+            ValidationTallyModel.media_item_id, ValidationTallyModel.attribute, ValidationTallyModel.kind,
+            ValidationTallyModel.value, ValidationTallyModel.vote_count,
+        )
+        .filter(ValidationTallyModel.media_item_id.in_(media_item_ids))
+        .filter(ValidationTallyModel.vote_count > 0)
+    )
+    return result.all()
+
+
+def tally_aggregate_select(media_item_ids: Optional[List[int]] = None):
+    """
+    Set-based equivalent of `tally_entries` over every vote (or the votes on `media_item_ids`):
+    one GROUP BY per (attribute, kind), returning (media_item_id, attribute, kind, value,
+    vote_count) rows.
+    """
+    selects = []
+    for attribute, voted, corrected in (
+        ("species", ValidationVoteModel.vote_on_species, ValidationVoteModel.corrected_species_name),
+        ("health", ValidationVoteModel.vote_on_health, ValidationVoteModel.corrected_health_status),
+    ):
+        selects.append(
+            select(
+                ValidationVoteModel.media_item_id, literal(attribute, String).label("attribute"),
+                literal(CONFIRM, String).label("kind"), literal("", String).label("value"),
+                func.count().label("vote_count"),
+            )
+            .filter(voted.is_(True))
+            .group_by(ValidationVoteModel.media_item_id)
+        )
+        selects.append(
+            select(
+                ValidationVoteModel.media_item_id, literal(attribute, String).label("attribute"),
+                literal(CORRECTION, String).label("kind"), corrected.label("value"),
+                func.count().label("vote_count"),
+            )
+            .filter(voted.is_(False))
+            .filter(func.coalesce(corrected, "") != "")
+            .group_by(ValidationVoteModel.media_item_id, corrected)
+        )
+    if media_item_ids is not None:
+        selects = [query.filter(ValidationVoteModel.media_item_id.in_(media_item_ids)) for query in selects]
+    return union_all(*selects)
+
+
+async def rebuild_tallies(db: AsyncSession, media_item_ids: Optional[List[int]] = None) -> int:
+    """
+    Replace the tallies of every media item (or of `media_item_ids`) with a fresh
+    aggregate of validation_votes (no commit).
+
+    Returns:
+        The number of tally rows written.
+    """
+    stale = delete(ValidationTallyModel)
+    if media_item_ids is not None:
+        stale = stale.where(ValidationTallyModel.media_item_id.in_(media_item_ids))
+    await db.execute(stale)
+    result = await db.execute(
+        insert(ValidationTallyModel).from_select(
+            ["media_item_id", "attribute", "kind", "value", "vote_count"], tally_aggregate_select(media_item_ids)
+        )
+    )
+    return result.rowcount
@@ -1,10 +1,23 @@
+from sqlalchemy import Boolean, Integer, cast, column, func, literal, literal_column, values
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import List, Optional, Union
-from datetime import datetime, timezone
+from sqlalchemy.orm import joinedload
+from typing import Dict, List, Optional, Tuple, Union
+from types import SimpleNamespace
 
+from app.models.user import User as UserModel
 from app.models.validation_vote import ValidationVote as ValidationVoteModel
 from app.schemas.validation_vote import ValidationVoteCreate, ValidationVoteUpdate
+from app.crud.pagination import keyset_after
+from app.crud import crud_validation_tally
+
+# Vote fields that feed the validation tallies.
+TALLIED_FIELDS = ("vote_on_species", "corrected_species_name", "vote_on_health", "corrected_health_status")
+# Vote fields submitted by clients.
+VOTE_FIELDS = (*TALLIED_FIELDS, "comment")
+# Columns returned to the API for a vote.
+VOTE_COLUMNS = ("id", "media_item_id", "user_id", *VOTE_FIELDS, "created_at", "updated_at")
 
 # We remove the import of the validation service, as CRUD should not know about services.
 # from app.services import validation_service  <-- REMOVED
@@ -24,66 +37,139 @@ async def get_validation_vote(db: AsyncSession, vote_id: int) -> Optional[Valida
     return result.scalar_one_or_none()
 
 async def get_votes_for_media_item(
-    db: AsyncSession, media_item_id: int, skip: int = 0, limit: int = 100
+    db: AsyncSession, media_item_id: int, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+    with_voters: bool = False
 ) -> List[ValidationVoteModel]:
+    query = select(ValidationVoteModel).filter(ValidationVoteModel.media_item_id == media_item_id)
+    if with_voters:
+        # Voter name/badges come from the same query (many-to-one JOIN), not one request per voter.
+        query = query.options(
+            joinedload(ValidationVoteModel.user, innerjoin=True).load_only(UserModel.id, UserModel.username, UserModel.earned_badges)
+        )
+    # Keyset pagination on (created_at, id); offset is kept only for legacy callers.
+    if cursor:
+        query = query.filter(keyset_after(ValidationVoteModel.created_at, ValidationVoteModel.id, cursor))
+    elif skip:
+        query = query.offset(skip)
     result = await db.execute(
-        select(ValidationVoteModel)
-        .filter(ValidationVoteModel.media_item_id == media_item_id)
-        .offset(skip)
-        .limit(limit)
-        .order_by(ValidationVoteModel.created_at.desc())
+        query.order_by(ValidationVoteModel.created_at.desc(), ValidationVoteModel.id.desc()).limit(limit)
     )
     return result.scalars().all()
 
+def _upsert_votes_statement(user_id: int, votes: Dict[int, Union[ValidationVoteCreate, ValidationVoteUpdate]]):
+    """
+    One statement writing a user's votes on several media items:
+
+        WITH previous AS (SELECT ... FOR UPDATE),
+             upserted AS (INSERT ... SELECT ... ON CONFLICT (user_id, media_item_id) DO UPDATE
+                          ... RETURNING *, (xmax = 0) AS inserted)
+        SELECT upserted.*, previous.* FROM upserted LEFT JOIN previous ...
+
+    On conflict only the non-null submitted fields replace the stored ones. `inserted` is
+    true for brand new votes; `previous` carries the values before the write, which the
+    tallies need. The insert reads its rows through a join with `previous`, so an existing
+    vote is locked (and re-read if a concurrent request changed it) before it is updated.
+    """
+    table = ValidationVoteModel.__table__
+    previous = (
+        select(table.c.media_item_id, *(table.c[field] for field in TALLIED_FIELDS))
+        .where(table.c.user_id == user_id)
+        .where(table.c.media_item_id.in_(list(votes)))
+        .with_for_update()
+        .cte("previous")
+    )
+    incoming = values(
+        column("media_item_id", Integer), *(column(field, table.c[field].type) for field in VOTE_FIELDS),
+        name="incoming",
+    ).data([
+        (media_item_id, *(getattr(vote_in, field) for field in VOTE_FIELDS))
+        for media_item_id, vote_in in sorted(votes.items())  # Sorted: rows are always locked in the same order
+    ])
+    insert_stmt = insert(ValidationVoteModel).from_select(
+        ["media_item_id", "user_id", *VOTE_FIELDS],
+        # Casts: a VALUES column holding only NULLs would otherwise be typed as text.
+        select(
+            incoming.c.media_item_id, literal(user_id, Integer),
+            *(cast(incoming.c[field], table.c[field].type) for field in VOTE_FIELDS),
+        )
+        .select_from(incoming.outerjoin(previous, previous.c.media_item_id == incoming.c.media_item_id))
+        .order_by(incoming.c.media_item_id),
+    )
+    upserted = (
+        insert_stmt.on_conflict_do_update(
+            constraint="uq_user_media_vote",
+            set_={
+                **{field: func.coalesce(insert_stmt.excluded[field], table.c[field]) for field in VOTE_FIELDS},
+                "updated_at": func.now(),
+            },
+        )
+        .returning(*table.c, literal_column("xmax = 0", Boolean).label("inserted"))
+        .cte("upserted")
+    )
+    return (
+        select(
+            upserted,
+            previous.c.media_item_id.isnot(None).label("had_previous"),
+            *(previous.c[field].label(f"previous_{field}") for field in TALLIED_FIELDS),
+        )
+        .select_from(upserted.outerjoin(previous, previous.c.media_item_id == upserted.c.media_item_id))
+        .order_by(upserted.c.media_item_id)
+    )
+
+
+async def upsert_validation_votes(
+    db: AsyncSession,
+    user_id: int,
+    votes: Dict[int, Union[ValidationVoteCreate, ValidationVoteUpdate]],
+) -> List[Tuple[dict, bool]]:
+    """
+    Create or update a user's votes (keyed by media item id) with a single upsert statement,
+    update the tallies and commit.
+
+    Returns:
+        (vote data, inserted) per media item, in media item id order. `inserted` is True
+        only for votes that did not exist before, whatever concurrent requests did.
+    """
+    rows = (await db.execute(_upsert_votes_statement(user_id, votes))).all()
+
+    changes = []
+    raced_media_item_ids = []
+    for row in rows:
+        if not row.inserted and not row.had_previous:
+            # A concurrent first vote committed after our snapshot: we updated a row we
+            # could not read, so its old values are unknown. Recount that item instead.
+            raced_media_item_ids.append(row.media_item_id)
+            continue
+        previous = SimpleNamespace(**{field: getattr(row, f"previous_{field}") for field in TALLIED_FIELDS})
+        changes.append((row.media_item_id, previous if row.had_previous else None, row))
+    await crud_validation_tally.apply_vote_changes(db, changes)
+    if raced_media_item_ids:
+        await crud_validation_tally.rebuild_tallies(db, media_item_ids=raced_media_item_ids)
+    await db.commit()
+
+    return [({key: getattr(row, key) for key in VOTE_COLUMNS}, row.inserted) for row in rows]
+
+
 async def create_or_update_validation_vote(
     db: AsyncSession, 
     media_item_id: int, 
     user_id: int, 
     vote_in: Union[ValidationVoteCreate, ValidationVoteUpdate]
-) -> dict:
-    existing_vote = await get_vote_by_media_and_user(db, media_item_id, user_id)
-
-    if existing_vote:
-        update_data = vote_in.model_dump(exclude_unset=True) 
-        for field, value in update_data.items():
-            if value is not None:
-                setattr(existing_vote, field, value)
-        existing_vote.updated_at = datetime.now(timezone.utc)
-        db.add(existing_vote)
-        await db.commit()
-        await db.refresh(existing_vote)
-        vote_record = existing_vote
-    else:
-        new_vote_data = vote_in.model_dump()
-        db_vote = ValidationVoteModel(
-            media_item_id=media_item_id,
-            user_id=user_id,
-            **new_vote_data
-        )
-        db.add(db_vote)
-        await db.commit()
-        await db.refresh(db_vote)
-        vote_record = db_vote
-
-    # Eagerly load all fields into a dict
-    vote_data = {
-        "id": vote_record.id,
-        "media_item_id": vote_record.media_item_id,
-        "user_id": vote_record.user_id,
-        "vote_on_species": vote_record.vote_on_species,
-        "corrected_species_name": vote_record.corrected_species_name,
-        "vote_on_health": vote_record.vote_on_health,
-        "corrected_health_status": vote_record.corrected_health_status,
-        "comment": vote_record.comment,
-        "created_at": vote_record.created_at,
-        "updated_at": vote_record.updated_at,
-    }
-    return vote_data
+) -> Tuple[dict, bool]:
+    """
+    Create or update the user's vote on one media item in a single round trip.
+
+    Returns:
+        The vote data and whether the vote is brand new (drives scoring).
+    """
+    [(vote_data, inserted)] = await upsert_validation_votes(db, user_id, {media_item_id: vote_in})
+    return vote_data, inserted
 
 async def delete_validation_vote(db: AsyncSession, vote_id: int) -> Optional[ValidationVoteModel]:
     db_vote = await get_validation_vote(db, vote_id)
     if db_vote:
         # Note: The re-evaluation call will now be handled in the endpoint that calls this.
+        await crud_validation_tally.apply_vote_changes(db, [(db_vote.media_item_id, db_vote, None)])
         await db.delete(db_vote)
         await db.commit()
         return db_vote
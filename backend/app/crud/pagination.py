@@ -0,0 +1,92 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple, Union
+
+from sqlalchemy import and_, or_, tuple_
+
+# Response header used by list endpoints to hand the next page's cursor to the client.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a client sends a cursor we did not issue (or cannot parse)."""
+
+
+SortValue = Union[datetime, int, None]
+
+
+def encode_cursor(sort_value: SortValue, item_id: int) -> str:
+    """
+    Encode a (sort value, id) pair into an opaque, URL-safe cursor string.
+
+    Args:
+        sort_value: The value of the ordering column for the last row of the page
+            (a timestamp or an integer such as a score; may be None).
+        item_id: The primary key of the last row of the page (tie-breaker).
+
+    Returns:
+        A base64url string without padding.
+    """
+    payload = [sort_value.isoformat() if isinstance(sort_value, datetime) else sort_value, item_id]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, numeric: bool = False) -> Tuple[SortValue, int]:
+    """
+    Decode a cursor produced by `encode_cursor`. `numeric` is True for integer sort columns.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_raw, item_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if sort_raw is None:
+            sort_value = None
+        elif numeric:
+            sort_value = int(sort_raw)
+        else:
+            sort_value = datetime.fromisoformat(sort_raw)
+        return sort_value, int(item_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError("Invalid pagination cursor.") from e
+
+
+def keyset_after(sort_column, id_column, cursor: str, nullable: bool = False, numeric: bool = False):
+    """
+    Build the WHERE clause that selects rows coming *after* `cursor` in a
+    `ORDER BY sort_column DESC [NULLS LAST], id_column DESC` listing.
+
+    The non-null case is a row-value comparison so PostgreSQL can seek
+    directly into the matching composite index instead of counting rows.
+
+    Args:
+        sort_column: The primary ordering column (e.g. created_at).
+        id_column: The unique tie-breaker column (the primary key).
+        cursor: The opaque cursor from the previous page.
+        nullable: True if sort_column can be NULL (NULLs are ordered last).
+        numeric: True if sort_column is an integer column rather than a timestamp.
+    """
+    sort_value, last_id = decode_cursor(cursor, numeric=numeric)
+    if sort_value is None:
+        if not nullable:
+            raise InvalidCursorError("Invalid pagination cursor.")
+        # We are already inside the trailing block of NULL sort values.
+        return and_(sort_column.is_(None), id_column < last_id)
+
+    condition = tuple_(sort_column, id_column) < tuple_(sort_value, last_id)
+    if nullable:
+        condition = or_(condition, sort_column.is_(None))
+    return condition
+
+
+def next_cursor_for(items: List[Any], limit: int, sort_attr: str) -> Optional[str]:
+    """
+    Return the cursor for the page after `items`, or None if this was the last page.
+    """
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(getattr(last, sort_attr), last.id)
@@ -0,0 +1,39 @@
+from typing import Literal
+
+from sqlalchemy import func
+
+# How a species / health search term is matched against the stored values:
+#   exact    - whole value, case-insensitive
+#   prefix   - value starts with the term
+#   contains - term appears anywhere in the value (the historical behaviour)
+#   fuzzy    - trigram word similarity, tolerant of typos ("dolfin" finds "Dolphin")
+MatchMode = Literal["exact", "prefix", "contains", "fuzzy"]
+
+
+def escape_like(term: str) -> str:
+    """Escape LIKE wildcards so user input is matched literally."""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def text_match(column, term: str, mode: MatchMode = "contains"):
+    """
+    Build a case-insensitive predicate matching `term` against `column`.
+
+    Every mode compares against lower(column), so all of them can be answered by the
+    `gin (lower(column) gin_trgm_ops)` indexes instead of a sequential scan.
+
+    Args:
+        column: The text column to search.
+        term: The user's search term.
+        mode: One of MatchMode.
+    """
+    normalized = func.lower(column)
+    term = term.strip().lower()
+    if mode == "exact":
+        return normalized == term
+    if mode == "prefix":
+        return normalized.like(f"{escape_like(term)}%", escape="\\")
+    if mode == "fuzzy":
+        # `lower(col) %> term` is pg_trgm's indexable word-similarity operator.
+        return normalized.op("%>")(term)
+    return normalized.like(f"%{escape_like(term)}%", escape="\\")
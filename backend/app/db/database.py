@@ -1,15 +1,44 @@
+from fastapi import Request
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.pool import async_engine_options, pool_stats
+from app.db.query_stats import instrument_engine
+from app.db.routing import prefers_primary
 
-engine = create_async_engine(settings.DATABASE_URL)
+engine = create_async_engine(settings.DATABASE_URL, **async_engine_options())
 AsyncSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession)
 Base = declarative_base()
+instrument_engine(engine.sync_engine)
+metrics.register_collector("db_pool", lambda: pool_stats(engine.sync_engine, settings.DB_MAX_OVERFLOW))
+
+# Read-only work (GET handlers, research exports) goes to the replica when one is configured.
+if settings.REPLICA_DATABASE_URL:
+    read_engine = create_async_engine(settings.REPLICA_DATABASE_URL, **async_engine_options())
+    instrument_engine(read_engine.sync_engine)
+    metrics.register_collector("db_pool_replica", lambda: pool_stats(read_engine.sync_engine, settings.DB_MAX_OVERFLOW))
+else:
+    read_engine = engine
+AsyncReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine, class_=AsyncSession)
 
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
 
+async def get_read_db(request: Request):
+    """
+    Session for read-only handlers: the replica, or the primary for clients that wrote
+    in the last READ_YOUR_WRITES_SECONDS so they see their own upload/vote.
+    """
+    if read_engine is not engine and await prefers_primary(request):
+        metrics.inc("db.reads.primary_sticky")
+        session_factory = AsyncSessionLocal
+    else:
+        session_factory = AsyncReadSessionLocal
+    async with session_factory() as session:
+        yield session
+
 async def create_db_and_tables():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
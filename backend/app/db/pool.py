@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict
+from uuid import uuid4
+
+from sqlalchemy import exc as sqla_exc, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# A checkout wait older than this no longer describes the pool's current state.
+WAIT_SIGNAL_MAX_AGE_SECONDS = 5.0
+# Connection record info key carrying the connect time of a just-created connection to `_do_get`.
+_CONNECT_SECONDS_KEY = "_connect_seconds"
+
+
+class _CheckoutTimingMixin:
+    """
+    Records how long each connection checkout waited for a free pooled connection (`_do_get`
+    is the hook every SQLAlchemy pool implements), as the `db.pool.checkout_wait_seconds`
+    timing and as a smoothed recent value used by the load shedder.
+
+    Opening a new connection (TCP + TLS + auth, e.g. while the pool grows after a cold
+    start or `pool_recycle`) is not contention: it is timed separately as
+    `db.pool.connect_seconds` and subtracted from the wait.
+    """
+
+    _wait_lock = threading.Lock()
+    _recent_wait = 0.0
+    _recent_wait_at = 0.0
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        record = super()._create_connection()
+        connect_seconds = time.perf_counter() - started
+        record.info[_CONNECT_SECONDS_KEY] = connect_seconds
+        metrics.observe("db.pool.connect_seconds", connect_seconds)
+        return record
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except sqla_exc.TimeoutError:
+            self._record_wait(time.perf_counter() - started)  # Pool exhausted: the clearest overload signal
+            raise
+        connect_seconds = record.info.pop(_CONNECT_SECONDS_KEY, 0.0)
+        self._record_wait(max(0.0, time.perf_counter() - started - connect_seconds))
+        return record
+
+    def _record_wait(self, waited: float) -> None:
+        metrics.observe("db.pool.checkout_wait_seconds", waited)
+        with self._wait_lock:
+            self._recent_wait = max(waited, 0.8 * self._recent_wait)
+            self._recent_wait_at = time.monotonic()
+
+    def recent_checkout_wait(self) -> float:
+        """Smoothed checkout wait in seconds, or 0.0 if nothing was checked out lately."""
+        with self._wait_lock:
+            if time.monotonic() - self._recent_wait_at > WAIT_SIGNAL_MAX_AGE_SECONDS:
+                return 0.0
+            return self._recent_wait
+
+
+class InstrumentedAsyncQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class InstrumentedQueuePool(_CheckoutTimingMixin, QueuePool):
+    pass
+
+
+def async_engine_options() -> Dict[str, Any]:
+    """create_async_engine keyword arguments for the API's asyncpg engine."""
+    if settings.DB_PGBOUNCER_MODE:
+        # PgBouncer (transaction pooling) hands every transaction a possibly different
+        # server connection, so prepared statements must not be cached or reused by
+        # name, and pooling is left to PgBouncer itself.
+        return {
+            "poolclass": NullPool,
+            "connect_args": {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            },
+        }
+    return {
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": {"statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+    }
+
+
+def sync_engine_options(pool_size: int, max_overflow: int) -> Dict[str, Any]:
+    """create_engine keyword arguments for the psycopg2 engine used by Celery workers and scripts."""
+    if settings.DB_PGBOUNCER_MODE:
+        return {"poolclass": NullPool}  # psycopg2 does not use server-side prepared statements
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def pool_stats(engine, max_overflow: int) -> dict:
+    """Current pool occupancy (metrics collector); pass `AsyncEngine.sync_engine` for the async engine."""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__}
+    capacity = pool.size() + max_overflow
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "utilization": pool.checkedout() / capacity if capacity else 0.0,
+        "recent_checkout_wait_ms": (
+            pool.recent_checkout_wait() * 1000 if isinstance(pool, _CheckoutTimingMixin) else 0.0
+        ),
+    }
+
+
+async def warm_up(engine: AsyncEngine, connections: int) -> int:
+    """
+    Open `connections` pool connections concurrently at startup (TCP + TLS + auth +
+    asyncpg type introspection), so the first requests after a deploy do not pay for it.
+    Failures are logged, not raised: the app still starts and connects on demand.
+    """
+    if connections <= 0 or not isinstance(engine.sync_engine.pool, QueuePool):
+        return 0
+
+    async def open_one() -> bool:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+        return True
+
+    started = time.perf_counter()
+    try:
+        results = await asyncio.wait_for(
+            asyncio.gather(*(open_one() for _ in range(connections)), return_exceptions=True),
+            timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        )
+    except asyncio.TimeoutError:
+        logger.warning(f"DB pool warm-up: timed out after {settings.DB_POOL_TIMEOUT_SECONDS}s")
+        return 0
+    opened = sum(1 for result in results if result is True)
+    failures = [result for result in results if isinstance(result, Exception)]
+    if failures:
+        logger.warning(f"DB pool warm-up: {len(failures)} of {connections} connections failed: {failures[0]}")
+    logger.info(f"DB pool warm-up: {opened} connections ready in {time.perf_counter() - started:.2f}s")
+    return opened
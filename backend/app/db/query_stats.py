@@ -0,0 +1,162 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_STATEMENT_LENGTH = 1000
+MAX_SLOW_PER_REQUEST = 10
+
+
+def redact_parameters(parameters: Any) -> Any:
+    """Bound parameters with every value replaced by its type name, safe to log."""
+    if isinstance(parameters, dict):
+        return {key: redact_parameters(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [redact_parameters(value) for value in parameters]
+    return f"<{type(parameters).__name__}>" if parameters is not None else None
+
+
+def _slow_entry(statement: str, parameters: Any, seconds: float, executemany: bool) -> Dict[str, Any]:
+    if executemany:
+        parameters = parameters[:1] if isinstance(parameters, (list, tuple)) else parameters
+    return {
+        "ms": round(seconds * 1000, 1),
+        "statement": statement[:MAX_STATEMENT_LENGTH],
+        "parameters": redact_parameters(parameters),
+    }
+
+
+class QueryStats:
+    """Queries executed within one scope (a request, or an `assert_max_queries` block)."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: List[str] = []
+        self.slow: List[Dict[str, Any]] = []
+
+    def record(self, statement: str, seconds: float, slow: Optional[Dict[str, Any]]) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.statements.append(statement[:MAX_STATEMENT_LENGTH])
+        if slow is not None and len(self.slow) < MAX_SLOW_PER_REQUEST:
+            self.slow.append(slow)
+
+
+# The current request's stats; contextvars reach the greenlet SQLAlchemy runs the cursor in.
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+# assert_max_queries blocks, which count queries from any thread (e.g. a TestClient's).
+_captures: List[QueryStats] = []
+_captures_lock = threading.Lock()
+_recent_slow: Deque[Dict[str, Any]] = deque(maxlen=50)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's execution context, so a statement that fails (and never
+    # reaches after_cursor_execute) leaves nothing behind on the connection.
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - context._query_started
+    metrics.observe("db.query_seconds", seconds)
+
+    slow = None
+    if seconds * 1000 >= settings.DB_SLOW_QUERY_MS:
+        slow = _slow_entry(statement, parameters, seconds, executemany)
+        metrics.inc("db.slow_queries")
+        _recent_slow.append(slow)
+        logger.warning(f"Slow query ({slow['ms']} ms): {slow['statement']} parameters={slow['parameters']}")
+
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, seconds, slow)
+    if _captures:
+        with _captures_lock:
+            for capture in _captures:
+                capture.record(statement, seconds, slow)
+
+
+def instrument_engine(engine) -> None:
+    """Time every statement run on `engine` (an Engine; pass `AsyncEngine.sync_engine`)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def stats() -> dict:
+    return {"recent_slow": list(_recent_slow)}
+
+
+metrics.register_collector("db_queries", stats)
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware counting the queries and DB time of each request. Both are exported as
+    `db.request_queries` / `db.request_seconds` timings; requests running more than
+    DB_QUERY_COUNT_WARN queries (likely an N+1 loop) are logged. With DEBUG on, the
+    response carries `Server-Timing: db;dur=<ms>;desc="<n> queries"`, shown by browser
+    dev tools (queries run after the headers are sent, e.g. while streaming, are not included).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        query_stats = QueryStats()
+        token = _current.set(query_stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and settings.DEBUG:
+                timing = f'db;dur={query_stats.seconds * 1000:.1f};desc="{query_stats.count} queries"'
+                message.setdefault("headers", []).append((b"server-timing", timing.encode("latin-1")))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            metrics.observe("db.request_queries", query_stats.count)
+            metrics.observe("db.request_seconds", query_stats.seconds)
+            if query_stats.count > settings.DB_QUERY_COUNT_WARN:
+                metrics.inc("db.requests_over_query_budget")
+                logger.warning(
+                    f"{scope['method']} {scope['path']} ran {query_stats.count} queries "
+                    f"({query_stats.seconds * 1000:.1f} ms), possible N+1"
+                )
+
+
+@contextmanager
+def assert_max_queries(max_queries: int) -> Iterator[QueryStats]:
+    """
+    Fail with AssertionError if the block runs more than `max_queries` statements,
+    listing them. Counts queries from every thread, so it wraps TestClient calls:
+
+        with assert_max_queries(6):
+            client.post("/api/v1/media/upload", ...)
+    """
+    capture = QueryStats()
+    with _captures_lock:
+        _captures.append(capture)
+    try:
+        yield capture
+    finally:
+        with _captures_lock:
+            _captures.remove(capture)
+    if capture.count > max_queries:
+        listing = "\n".join(f"  {i}. {statement}" for i, statement in enumerate(capture.statements, 1))
+        raise AssertionError(f"Expected at most {max_queries} queries, {capture.count} were executed:\n{listing}")
@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+from typing import Dict
+
+from fastapi import Request
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.rate_limit import client_identity
+from app.core.redis_client import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+READ_ONLY_METHODS = {"GET", "HEAD", "OPTIONS"}
+MAX_LOCAL_IDENTITIES = 10000
+
+
+class RecentWriters:
+    """
+    Clients (by `client_identity`: the JWT subject, otherwise the IP) that wrote within
+    the last READ_YOUR_WRITES_SECONDS. Kept server-side, so it works for cross-origin
+    frontends that send no cookies: in Redis when REDIS_URL is set, so a write handled
+    by one worker is seen by all of them, and always in this process as well.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._until: Dict[str, float] = {}  # identity -> monotonic deadline
+
+    def _key(self, identity: str) -> str:
+        return f"db:recent-write:{identity}"
+
+    async def mark(self, identity: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if len(self._until) > MAX_LOCAL_IDENTITIES:  # Drop expired entries
+                self._until = {key: until for key, until in self._until.items() if until > now}
+            self._until[identity] = now + settings.READ_YOUR_WRITES_SECONDS
+        redis = get_async_redis()
+        if redis is not None:
+            try:
+                await redis.set(self._key(identity), 1, ex=settings.READ_YOUR_WRITES_SECONDS)
+            except Exception as e:
+                logger.warning(f"Read-your-writes: could not record write in Redis: {e}")
+
+    async def wrote_recently(self, identity: str) -> bool:
+        with self._lock:
+            if self._until.get(identity, 0.0) > time.monotonic():
+                return True
+        redis = get_async_redis()
+        if redis is None:
+            return False
+        try:
+            return bool(await redis.exists(self._key(identity)))
+        except Exception as e:
+            logger.warning(f"Read-your-writes: Redis unavailable, using the primary: {e}")
+            return True  # Cannot tell: the primary is always correct
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"local_identities": len(self._until)}
+
+
+recent_writers = RecentWriters()
+metrics.register_collector("read_your_writes", recent_writers.stats)
+
+
+async def prefers_primary(request: Request) -> bool:
+    """True if the client wrote within the last READ_YOUR_WRITES_SECONDS (replica may lag behind)."""
+    return await recent_writers.wrote_recently(client_identity(request.scope))
+
+
+class ReadYourWritesMiddleware:
+    """
+    Records clients that just wrote (any successful non-GET request, e.g. an upload or a
+    vote), so `get_read_db` serves their next reads from the primary until the replica
+    has caught up. Inactive without a replica.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in READ_ONLY_METHODS or not settings.REPLICA_DATABASE_URL:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_and_mark(message):
+            # Marked before the response leaves, so the client's next request already sees it.
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                await recent_writers.mark(client_identity(scope))
+            await send(message)
+
+        await self.app(scope, receive, send_and_mark)
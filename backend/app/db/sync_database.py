@@ -1,7 +1,15 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.pool import pool_stats, sync_engine_options
+from app.db.query_stats import instrument_engine
 
 SYNC_DATABASE_URL = settings.DATABASE_URL.replace("+asyncpg", "")
-sync_engine = create_engine(SYNC_DATABASE_URL)
-SyncSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
\ No newline at end of file
+# Used by Celery workers and scripts: sized to the worker, not to the API.
+sync_engine = create_engine(
+    SYNC_DATABASE_URL, **sync_engine_options(settings.DB_WORKER_POOL_SIZE, settings.DB_WORKER_MAX_OVERFLOW)
+)
+instrument_engine(sync_engine)
+SyncSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
+metrics.register_collector("db_pool_sync", lambda: pool_stats(sync_engine, settings.DB_WORKER_MAX_OVERFLOW))
\ No newline at end of file
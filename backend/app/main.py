@@ -1,7 +1,19 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import RedirectResponse
 from contextlib import asynccontextmanager
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.password_hasher import password_hasher
+from app.core.rate_limit import RateLimitMiddleware, load_shedder
+from app.core.user_cache import auth_user_cache
+from app.db import pool as db_pool
+from app.db.database import engine, read_engine
+from app.db.query_stats import QueryStatsMiddleware
+from app.db.routing import ReadYourWritesMiddleware
+from app.services.media_storage_service import export_file_url
+from app.services.validation_coalescer import validation_coalescer
 # We remove this as Alembic will handle it now
 # from app.db.database import create_db_and_tables 
 from app.api.v1.api_router import api_v1_router
@@ -12,7 +24,20 @@ async def lifespan(app: FastAPI):
     # The line below is removed. In a real production setup, you would run
     # 'alembic upgrade head' manually during deployment.
     # await create_db_and_tables() 
+    await db_pool.warm_up(engine, min(settings.DB_POOL_WARMUP_CONNECTIONS, settings.DB_POOL_SIZE))
+    if read_engine is not engine:
+        await db_pool.warm_up(read_engine, min(settings.DB_POOL_WARMUP_CONNECTIONS, settings.DB_POOL_SIZE))
+    validation_coalescer.start()
+    auth_user_cache.start()
+    load_shedder.start()
     yield
+    await load_shedder.stop()
+    await auth_user_cache.stop()
+    await validation_coalescer.stop()
+    password_hasher.shutdown()
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
     print("Application shutdown...")
 
 app = FastAPI(
@@ -22,6 +47,11 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Added first so they run inside CORS: 429/503 responses still carry the CORS headers.
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(RateLimitMiddleware)
+
 origins = ["http://localhost:3000", "http://localhost:3001", "http://127.0.0.1:3000", "http://127.0.0.1:3001","https://marine-life-frontend.onrender.com" ]
 app.add_middleware(
     CORSMiddleware,
@@ -29,16 +59,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["*"], # Using a wildcard for simplicity during development
-    expose_headers=["Content-Length", "Content-Disposition"],
+    expose_headers=["Content-Length", "Content-Disposition", "X-Next-Cursor", "X-Grid-Layers", "X-Grid-Bounds", "X-Grid-Resolution", "Retry-After"],
     max_age=600,
 )
 
+# Compresses large JSON pages and streamed exports for clients that send Accept-Encoding: gzip.
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 app.include_router(api_v1_router, prefix=settings.API_V1_STR)
 
+# Partitioned Parquet snapshots, uploaded to Cloudinary by the tasks.write_parquet_snapshot
+# Celery beat job. Start from /exports/latest.json to find the current snapshot's files.
+@app.get("/exports/{path:path}", include_in_schema=False)
+async def read_export(path: str):
+    return RedirectResponse(export_file_url(path))
+
 @app.get("/")
 async def read_root():
     return {"message": f"Welcome to the {settings.PROJECT_NAME}!"}
 
 @app.get("/health", tags=["Utilities"])
 async def health_check():
-    return {"status": "ok", "message": "API is healthy and running!"}
\ No newline at end of file
+    return {"status": "ok", "message": "API is healthy and running!"}
+
+@app.get("/metrics", tags=["Utilities"])
+async def read_metrics():
+    """In-process metrics of this worker (response cache hit ratio, etc.)."""
+    return metrics.snapshot()
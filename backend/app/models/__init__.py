@@ -1,9 +1,13 @@
 from .user import User
 from .media import MediaItem
 from .validation_vote import ValidationVote  # <-- ADD THIS IMPORT
+from .sighting_rollup import SightingRollup
+from .validation_tally import ValidationTally
 
 __all__ = [
     "User",
     "MediaItem",
     "ValidationVote",  # <-- ADD THIS TO THE LIST
+    "SightingRollup",
+    "ValidationTally",
 ]
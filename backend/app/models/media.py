@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, ARRAY, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, ARRAY, Text, Index, Computed, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base # <-- FIX: Import from the new base.py file
@@ -27,6 +27,15 @@ class MediaItem(Base):
     validated_health_status = Column(String, nullable=True)
     validation_score = Column(Integer, default=0, nullable=False)
     is_validated_by_community = Column(Boolean, default=False, nullable=False)
+    # Maintained by validation_service on every re-evaluation; they rank the validation queue.
+    validation_vote_count = Column(Integer, default=0, server_default="0", nullable=False)     # species + health opinions
+    validation_leading_count = Column(Integer, default=0, server_default="0", nullable=False)  # votes behind the leading value
+    validation_priority = Column(Float, default=0.0, server_default="0", nullable=False)       # higher = needs validation more
+
+    # Final values used by research/map/rollups: community consensus if reached, otherwise the AI guess.
+    # Stored generated columns, so they can be indexed and are never out of sync.
+    effective_species = Column(String, Computed("COALESCE(validated_species, species_ai_prediction)", persisted=True))
+    effective_health = Column(String, Computed("COALESCE(validated_health_status, health_status_ai_prediction)", persisted=True))
 
     # NEW AI Detailed Fields (from PROMPT_V3)
     ai_is_marine_life_present = Column(Boolean, nullable=True)
@@ -45,5 +54,29 @@ class MediaItem(Base):
     owner = relationship("User", back_populates="media_items")
     validation_votes = relationship("ValidationVote", back_populates="media_item", cascade="all, delete-orphan")
 
+    # Composite indexes backing keyset (cursor) pagination of the list endpoints.
+    __table_args__ = (
+        Index("ix_media_items_created_at_id", created_at, id),
+        Index("ix_media_items_user_id_created_at_id", user_id, created_at, id),
+        Index("ix_media_items_sighting_timestamp_id", sighting_timestamp.desc().nullslast(), id.desc()),
+        # On lower(), like every text_match filter; exact species over a time range is a range scan.
+        Index("ix_media_items_effective_species_lower", func.lower(effective_species)),
+        Index("ix_media_items_effective_health_lower", func.lower(effective_health)),
+        Index(
+            "ix_media_items_effective_species_lower_sighting_timestamp",
+            func.lower(effective_species), sighting_timestamp,
+        ),
+        # Only items that still need validation are indexed, so the queue is an index range scan.
+        Index(
+            "ix_media_items_validation_queue", validation_priority.desc(), id.desc(),
+            postgresql_where=text("is_validated_by_community = false AND ai_processing_status = 'completed'"),
+        ),
+        # Only items whose AI analysis has not completed: the small set the requeue sweep scans.
+        Index(
+            "ix_media_items_ai_unfinished", ai_processing_status, updated_at,
+            postgresql_where=text("ai_processing_status <> 'completed'"),
+        ),
+    )
+
     def __repr__(self):
         return f"<MediaItem(id={self.id}, user_id={self.user_id}, species_ai='{self.species_ai_prediction}')>"
\ No newline at end of file
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, Date, Index
+from app.db.base import Base
+
+class SightingRollup(Base):
+    """
+    Pre-aggregated sighting counts keyed on (granularity, period, spatial cell, species, health).
+    Maintained incrementally by app.services.rollup_service; rebuild with rebuild_rollups.py.
+    """
+    __tablename__ = "sighting_rollups"
+
+    granularity = Column(String(5), primary_key=True)   # "day" or "month"
+    period_start = Column(Date, primary_key=True)       # UTC day, or first day of the UTC month
+    cell_lat = Column(Integer, primary_key=True)        # floor(latitude / ROLLUP_CELL_DEGREES)
+    cell_lon = Column(Integer, primary_key=True)        # floor(longitude / ROLLUP_CELL_DEGREES)
+    species = Column(String, primary_key=True)
+    health_status = Column(String, primary_key=True)
+    sighting_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_sighting_rollups_species_period", "granularity", "species", "period_start"),
+    )
+
+    def __repr__(self):
+        return (f"<SightingRollup({self.granularity} {self.period_start}, cell=({self.cell_lat},{self.cell_lon}), "
+                f"species='{self.species}', health='{self.health_status}', count={self.sighting_count})>")
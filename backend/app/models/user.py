@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ARRAY, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ARRAY, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base  # <-- FIX: Import from the new base.py file
@@ -23,5 +23,10 @@ class User(Base):
     media_items = relationship("MediaItem", back_populates="owner", cascade="all, delete-orphan")
     validation_votes = relationship("ValidationVote", back_populates="user", cascade="all, delete-orphan")
 
+    # Leaderboard order: pages are index seeks and ranks are index-only counts.
+    __table_args__ = (
+        Index("ix_users_score_id", score.desc(), id.desc()),
+    )
+
     def __repr__(self):
         return f"<User(id={self.id}, username='{self.username}')>"
\ No newline at end of file
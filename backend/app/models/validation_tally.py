@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+from app.db.base import Base
+
+class ValidationTally(Base):
+    """
+    Running vote counts per media item, attribute and voted value, so consensus can be decided
+    without re-reading every vote. Maintained by app.crud.crud_validation_tally in the same
+    transaction as the vote write.
+
+    kind "confirm" counts votes confirming the AI prediction (value is ""), kind "correction"
+    counts disputing votes per corrected value.
+    """
+    __tablename__ = "validation_tallies"
+
+    media_item_id = Column(Integer, ForeignKey("media_items.id", ondelete="CASCADE"), primary_key=True)
+    attribute = Column(String(10), primary_key=True)   # "species" or "health"
+    kind = Column(String(10), primary_key=True)        # "confirm" or "correction"
+    value = Column(String(255), primary_key=True)      # corrected value, "" for confirms
+    vote_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return (f"<ValidationTally(media_item_id={self.media_item_id}, {self.attribute} {self.kind} "
+                f"'{self.value}', count={self.vote_count})>")
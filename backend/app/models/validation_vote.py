@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base # <-- FIX: Import from the new base.py file
@@ -26,6 +26,7 @@ class ValidationVote(Base):
 
     __table_args__ = (
         UniqueConstraint('user_id', 'media_item_id', name='uq_user_media_vote'),
+        Index('ix_validation_votes_media_item_id_created_at_id', 'media_item_id', 'created_at', 'id'),
     )
 
     def __repr__(self):
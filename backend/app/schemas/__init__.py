@@ -1,10 +1,15 @@
 from .user import (
-    User, UserCreate, UserUpdate, UserInDB, UserBase, UserInDBBase, Token, TokenData
+    User, UserCreate, UserUpdate, UserInDB, UserBase, UserInDBBase, Token, TokenData, LeaderboardEntry
 )
 from .media import (
     MediaItem, MediaItemCreate, MediaItemUpdate, MediaItemBase, MapDataPoint,
     ResearchDataPoint # <-- Ensure this is exported
 )
 from .validation_vote import (
-    ValidationVote, ValidationVoteCreate, ValidationVoteUpdate, ValidationVoteBase
-)
\ No newline at end of file
+    ValidationVote, ValidationVoteCreate, ValidationVoteUpdate, ValidationVoteBase,
+    ValidationVoteBatchItem, ValidationVoteBatch, ValidationVoteBatchResult, ValidationVoteBatchResponse,
+    VoterInfo, ValidationVoteWithVoter, AttributeVoteCounts, ValidationVoteCounts, ValidationVoteThread
+)
+from .rollup import (
+    RollupCount, RollupCounts, RollupTrendPoint, RollupTrend, SpeciesCount
+)
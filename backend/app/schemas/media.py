@@ -41,6 +41,9 @@ class MediaItemUpdate(BaseModel):
     validated_health_status: Optional[str] = Field(None, max_length=100)
     validation_score: Optional[int] = None
     is_validated_by_community: Optional[bool] = None
+    validation_vote_count: Optional[int] = None
+    validation_leading_count: Optional[int] = None
+    validation_priority: Optional[float] = None
 
 # --- MediaItem Response Model ---
 class MediaItem(MediaItemBase):
@@ -0,0 +1,28 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import date
+
+# --- Aggregates served from the sighting_rollups table ---
+class RollupCount(BaseModel):
+    species: str
+    health_status: str
+    count: int
+
+class RollupCounts(BaseModel):
+    granularity: str = Field(..., description="Rollup granularity used to answer the query ('day' or 'month').")
+    total: int
+    items: List[RollupCount]
+
+class RollupTrendPoint(BaseModel):
+    period_start: date
+    count: int
+
+class RollupTrend(BaseModel):
+    granularity: str
+    species: Optional[str] = None
+    health_status: Optional[str] = None
+    points: List[RollupTrendPoint]
+
+class SpeciesCount(BaseModel):
+    species: str
+    count: int
@@ -52,6 +52,14 @@ class User(UserBase):
     class Config:
         from_attributes = True
 
+# --- Leaderboard ---
+class LeaderboardEntry(BaseModel):
+    rank: int = Field(..., description="1-based position by score, highest first; equal scores are ordered newest account first.")
+    user_id: int
+    username: str
+    score: int
+    earned_badges: List[str]
+
 # --- User in Database (Complete internal representation) ---
 class UserInDB(UserInDBBase):
     hashed_password: str
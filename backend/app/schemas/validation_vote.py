@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, List, Literal, Optional
 from datetime import datetime
 
 # --- Base ValidationVote Properties ---
@@ -43,4 +43,52 @@ class ValidationVote(ValidationVoteBase):
     updated_at: datetime
 
     class Config:
-        from_attributes = True # Allows Pydantic to create from SQLAlchemy ORM instances
\ No newline at end of file
+        from_attributes = True # Allows Pydantic to create from SQLAlchemy ORM instances
+
+# --- Batch Vote Submission ---
+# Lets power validators submit many votes in one request.
+MAX_BATCH_VOTES = 200
+
+class ValidationVoteBatchItem(ValidationVoteCreate):
+    media_item_id: int
+
+class ValidationVoteBatch(BaseModel):
+    votes: List[ValidationVoteBatchItem] = Field(..., min_length=1, max_length=MAX_BATCH_VOTES)
+
+class ValidationVoteBatchResult(BaseModel):
+    media_item_id: int
+    # "created" / "updated" when the vote was saved; "not_found", "invalid" or "duplicate" when it was skipped.
+    status: Literal["created", "updated", "not_found", "invalid", "duplicate"]
+    vote: Optional[ValidationVote] = None
+    detail: Optional[str] = None
+
+class ValidationVoteBatchResponse(BaseModel):
+    results: List[ValidationVoteBatchResult]
+    points_awarded: int
+
+
+# --- Vote Listing (discussion thread) ---
+# Everything needed to render a media item's votes in one response.
+class VoterInfo(BaseModel):
+    id: int
+    username: str
+    earned_badges: List[str] = []
+
+    class Config:
+        from_attributes = True
+
+class ValidationVoteWithVoter(ValidationVote):
+    user: VoterInfo
+
+class AttributeVoteCounts(BaseModel):
+    confirm: int = 0 # Votes confirming the AI prediction
+    corrections: Dict[str, int] = {} # Disputing votes per corrected value
+
+class ValidationVoteCounts(BaseModel):
+    species: AttributeVoteCounts = AttributeVoteCounts()
+    health: AttributeVoteCounts = AttributeVoteCounts()
+
+class ValidationVoteThread(BaseModel):
+    items: List[ValidationVoteWithVoter]
+    counts: ValidationVoteCounts
+    next_cursor: Optional[str] = None # Also sent in the X-Next-Cursor header
@@ -0,0 +1,209 @@
+import atexit
+import logging
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Integer, column, select, update, values
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.response_cache import response_cache
+from app.db.sync_database import SyncSessionLocal
+from app.models.media import MediaItem as MediaItemModel
+from app.services import rollup_service, validation_service
+
+logger = logging.getLogger(__name__)
+
+# Columns written from an AI result (plus validation_priority, derived from the locked row).
+AI_RESULT_FIELDS = (
+    "ai_processing_status", "updated_at", "ai_model_version",
+    "species_ai_prediction", "health_status_ai_prediction", "ai_confidence_score",
+)
+
+# Columns of a MediaItem read (and locked) before its AI result is written.
+_LOCKED_COLUMNS = (
+    MediaItemModel.id, MediaItemModel.latitude, MediaItemModel.longitude, MediaItemModel.sighting_timestamp,
+    MediaItemModel.effective_species, MediaItemModel.effective_health,
+    MediaItemModel.validated_species, MediaItemModel.validated_health_status,
+    MediaItemModel.validation_vote_count, MediaItemModel.validation_leading_count,
+)
+
+# A batch failing this many flushes in a row is dropped (logged) instead of retried forever.
+MAX_FLUSH_ATTEMPTS = 3
+
+
+def _result_values(rows):
+    """The new per-item values as a VALUES clause (id, AI_RESULT_FIELDS..., validation_priority)."""
+    table = MediaItemModel.__table__
+    return values(
+        column("id", Integer),
+        *(column(field, table.c[field].type) for field in AI_RESULT_FIELDS),
+        column("validation_priority", table.c.validation_priority.type),
+        name="ai_results",
+    ).data(rows)
+
+
+class AIResultWriter:
+    """
+    Per-worker-process buffer of AI results, written to media_items in batches.
+
+    `add` queues the result of one media item; the buffer is flushed when it holds
+    AI_RESULT_BATCH_SIZE items or its oldest result is AI_RESULT_FLUSH_MS old (background
+    thread), and on worker shutdown. A flush is one transaction on one connection: the
+    rows are locked with a single SELECT ... FOR UPDATE (in id order, so concurrent
+    flushes cannot deadlock), written with one UPDATE ... FROM (VALUES ...), the rollup
+    deltas applied with one upsert, and the response cache invalidated once.
+
+    With AI_RESULT_BATCH_SIZE <= 1 every result is written immediately by the caller.
+    A result is only durable once flushed: a worker killed without a shutdown leaves
+    those items 'pending', the same state as a task that never ran.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending: Dict[int, Dict[str, Any]] = {}  # media_item_id -> update values (last result wins)
+        self._attempts: Dict[int, int] = {}
+        self._oldest: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._flushes = 0
+        self._written = 0
+        self._dropped = 0
+
+    def add(self, media_item_id: int, update_data: Dict[str, Any]) -> None:
+        if settings.AI_RESULT_BATCH_SIZE <= 1:
+            self._write({media_item_id: update_data})
+            return
+        with self._cond:
+            self._pending[media_item_id] = update_data
+            self._attempts.pop(media_item_id, None)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            full = len(self._pending) >= settings.AI_RESULT_BATCH_SIZE
+            self._ensure_flusher()
+            self._cond.notify()
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write everything buffered now. Returns the number of media items written."""
+        with self._cond:
+            batch, self._pending = self._pending, {}
+            attempts, self._attempts = self._attempts, {}
+            self._oldest = None
+        if not batch:
+            return 0
+        if self._write(batch):
+            return len(batch)
+        self._requeue(batch, attempts)
+        return 0
+
+    def _requeue(self, batch: Dict[int, Dict[str, Any]], attempts: Dict[int, int]) -> None:
+        with self._cond:
+            for media_item_id, update_data in batch.items():
+                if media_item_id in self._pending:
+                    continue  # A newer result arrived meanwhile
+                attempt = attempts.get(media_item_id, 0) + 1
+                if attempt >= MAX_FLUSH_ATTEMPTS:
+                    self._dropped += 1
+                    logger.error(f"AI result writer: dropping result of MediaItem {media_item_id} after {attempt} failed flushes")
+                    continue
+                self._pending[media_item_id] = update_data
+                self._attempts[media_item_id] = attempt
+            if self._pending and self._oldest is None:
+                self._oldest = time.monotonic()
+            self._cond.notify()
+
+    def _write(self, batch: Dict[int, Dict[str, Any]]) -> bool:
+        db = SyncSessionLocal()
+        try:
+            # Lock the rows and read what the rollups currently count for them
+            locked = db.execute(
+                select(*_LOCKED_COLUMNS)
+                .where(MediaItemModel.id.in_(sorted(batch)))
+                .order_by(MediaItemModel.id)
+                .with_for_update()
+            ).all()
+            if not locked:
+                db.rollback()
+                return True  # Items deleted before their analysis finished
+
+            rows = []
+            rollup_changes = []
+            for current in locked:
+                data = batch[current.id]
+                # The AI confidence is part of the validation queue ranking
+                priority = validation_service.validation_priority(
+                    data["ai_confidence_score"], current.validation_vote_count, current.validation_leading_count
+                )
+                rows.append((current.id, *(data[field] for field in AI_RESULT_FIELDS), priority))
+                rollup_changes.append((
+                    rollup_service.rollup_key(
+                        current.latitude, current.longitude, current.sighting_timestamp,
+                        current.effective_species, current.effective_health,
+                    ),
+                    rollup_service.rollup_key_for_item(SimpleNamespace(
+                        **current._asdict(),
+                        species_ai_prediction=data["species_ai_prediction"],
+                        health_status_ai_prediction=data["health_status_ai_prediction"],
+                    )),
+                ))
+
+            new_values = _result_values(rows)
+            db.execute(
+                update(MediaItemModel)
+                .where(MediaItemModel.id == new_values.c.id)
+                .values(**{field: new_values.c[field] for field in (*AI_RESULT_FIELDS, "validation_priority")})
+                .execution_options(synchronize_session=False)
+            )
+            rollup_service.apply_rollup_changes_sync(db, rollup_changes)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"AI result writer: error writing {len(batch)} results: {e}")
+            return False
+        finally:
+            db.close()
+
+        response_cache.invalidate_sync()  # Reaches the API workers through Redis when configured
+        with self._cond:
+            self._flushes += 1
+            self._written += len(rows)
+        logger.info(f"AI result writer: wrote {len(rows)} AI results in one transaction")
+        return True
+
+    def _ensure_flusher(self) -> None:
+        # Started lazily, so it runs in the Celery pool process and not in the parent it forked from.
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run_flusher, name="ai-result-writer", daemon=True)
+            self._thread.start()
+
+    def _run_flusher(self) -> None:
+        interval = settings.AI_RESULT_FLUSH_MS / 1000
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                remaining = self._oldest + interval - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("AI result writer: flush failed")
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "flushes": self._flushes,
+                "written": self._written,
+                "dropped": self._dropped,
+            }
+
+
+ai_result_writer = AIResultWriter()
+metrics.register_collector("ai_result_writer", ai_result_writer.stats)
+atexit.register(ai_result_writer.flush)
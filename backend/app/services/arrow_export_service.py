@@ -0,0 +1,149 @@
+import json
+import os
+from datetime import datetime, timezone
+from itertools import groupby
+from typing import AsyncIterator, Iterable, List, Sequence
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.crud.crud_research import DATASET_COLUMNS
+
+# Arrow schema of the sightings dataset; field order must match DATASET_COLUMNS.
+SIGHTINGS_SCHEMA = pa.schema([
+    pa.field("id", pa.int64(), nullable=False),
+    pa.field("latitude", pa.float64(), nullable=False),
+    pa.field("longitude", pa.float64(), nullable=False),
+    pa.field("species", pa.string(), nullable=False),
+    pa.field("health_status", pa.string(), nullable=False),
+    pa.field("ai_confidence_score", pa.float64()),
+    pa.field("is_validated_by_community", pa.bool_()),
+    pa.field("sighting_timestamp", pa.timestamp("us", tz="UTC"), nullable=False),
+    pa.field("created_at", pa.timestamp("us", tz="UTC")),
+])
+
+PARQUET_COMPRESSION = "zstd"
+SNAPSHOT_MANIFEST = "latest.json"
+
+
+class _ChunkSink:
+    """
+    Minimal writable file object that collects whatever the Arrow writers emit,
+    so a response generator can drain and send it after every record batch.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def rows_to_record_batch(rows: Sequence[Sequence]) -> pa.RecordBatch:
+    """
+    Convert a partition of dataset rows (tuples in DATASET_COLUMNS order) into a RecordBatch.
+    """
+    columns = list(zip(*rows)) if rows else [[] for _ in SIGHTINGS_SCHEMA]
+    arrays = [pa.array(column, type=field.type) for column, field in zip(columns, SIGHTINGS_SCHEMA)]
+    return pa.RecordBatch.from_arrays(arrays, schema=SIGHTINGS_SCHEMA)
+
+
+async def stream_arrow(partitions: AsyncIterator[Sequence[Sequence]], fmt: str) -> AsyncIterator[bytes]:
+    """
+    Encode partitions of dataset rows as a Parquet file ("parquet") or an Arrow IPC
+    stream ("arrow"), yielding the encoded bytes as soon as each batch is written.
+
+    Args:
+        partitions: Async iterator of row lists, e.g. from a server-side DB cursor.
+        fmt: "parquet" or "arrow".
+    """
+    sink = _ChunkSink()
+    native_sink = pa.PythonFile(sink, mode="w")
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(native_sink, SIGHTINGS_SCHEMA, compression=PARQUET_COMPRESSION)
+    else:
+        writer = pa.ipc.new_stream(native_sink, SIGHTINGS_SCHEMA)
+
+    async for rows in partitions:
+        writer.write_batch(rows_to_record_batch(rows))
+        data = sink.drain()
+        if data:
+            yield data
+
+    # Closing writes the Parquet footer / the IPC end-of-stream marker.
+    writer.close()
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def write_partitioned_snapshot(partitions: Iterable[Sequence[Sequence]], root_dir: str) -> dict:
+    """
+    Write the dataset as hive-partitioned Parquet files (year=YYYY/month=MM/part-0.parquet)
+    into a new timestamped directory under `root_dir`, plus its manifest as `latest.json`.
+    Rows must arrive ordered by sighting_timestamp ascending, so only one partition file
+    is open at a time.
+
+    Args:
+        partitions: Iterable of row lists in DATASET_COLUMNS order, oldest first.
+        root_dir: Local working directory; the files are published from there by the caller.
+
+    Returns:
+        The manifest, whose `files` are paths relative to `root_dir`.
+    """
+    snapshot_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    snapshot_dir = os.path.join(root_dir, "snapshots", snapshot_id)
+    ts_index = DATASET_COLUMNS.index("sighting_timestamp")
+
+    files = []
+    writer, current_key, row_count = None, None, 0
+    try:
+        for rows in partitions:
+            for key, group in groupby(rows, key=lambda r: (r[ts_index].year, r[ts_index].month)):
+                group = list(group)
+                if key != current_key:
+                    if writer is not None:
+                        writer.close()
+                    relative_path = f"year={key[0]:04d}/month={key[1]:02d}/part-0.parquet"
+                    os.makedirs(os.path.dirname(os.path.join(snapshot_dir, relative_path)), exist_ok=True)
+                    writer = pq.ParquetWriter(
+                        os.path.join(snapshot_dir, relative_path), SIGHTINGS_SCHEMA, compression=PARQUET_COMPRESSION
+                    )
+                    files.append(f"snapshots/{snapshot_id}/{relative_path}")
+                    current_key = key
+                writer.write_batch(rows_to_record_batch(group))
+                row_count += len(group)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    manifest = {
+        "snapshot_id": snapshot_id,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "row_count": row_count,
+        "partitioning": ["year", "month"],
+        "files": files,
+    }
+    os.makedirs(snapshot_dir, exist_ok=True)
+    with open(os.path.join(root_dir, SNAPSHOT_MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
@@ -0,0 +1,147 @@
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Sequence
+
+from sqlalchemy import Integer, String, and_, any_, case, cast, column, func, not_, select, update, values
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.user_cache import auth_user_cache
+from app.models.media import MediaItem as MediaItemModel
+from app.models.user import User as UserModel
+
+# --- Metrics a badge rule can depend on (one value per user) ---
+SCORE = "score"
+UPLOADS = "uploads"                            # Media items uploaded
+VALIDATED_SIGHTINGS = "validated_sightings"    # Uploads confirmed by community consensus
+SPECIES_OBSERVED = "species_observed"          # Distinct species among the validated sightings
+METRICS = (SCORE, UPLOADS, VALIDATED_SIGHTINGS, SPECIES_OBSERVED)
+
+# Metrics that can change on each event; only the rules on these are evaluated.
+UPLOAD_METRICS = (UPLOADS,)
+VALIDATION_METRICS = (VALIDATED_SIGHTINGS, SPECIES_OBSERVED)
+
+
+@dataclass(frozen=True)
+class BadgeRule:
+    """A badge is earned once the user's `metric` reaches `threshold`."""
+    name: str
+    metric: str
+    threshold: int
+
+    def __post_init__(self):
+        if self.metric not in METRICS:
+            raise ValueError(f"Unknown badge metric '{self.metric}', expected one of {METRICS}.")
+
+
+# Adding a badge is adding a rule: the next matching event awards it incrementally and the
+# nightly evaluation (tasks.evaluate_badges) awards it to everyone who already qualifies.
+BADGE_RULES = (
+    BadgeRule("Ocean Explorer", SCORE, 10),
+    BadgeRule("Marine Scientist I", SCORE, 50),
+    BadgeRule("Deep Sea Diver", SCORE, 100),
+    BadgeRule("Reef Reporter", UPLOADS, 25),
+    BadgeRule("Trusted Observer", VALIDATED_SIGHTINGS, 10),
+    BadgeRule("Biodiversity Buff", SPECIES_OBSERVED, 5),
+)
+
+
+def rules_for(metrics: Optional[Iterable[str]] = None) -> List[BadgeRule]:
+    """The rules depending on `metrics` (all rules if None), in definition order."""
+    if metrics is None:
+        return list(BADGE_RULES)
+    metrics = set(metrics)
+    return [rule for rule in BADGE_RULES if rule.metric in metrics]
+
+
+def rules_values(rules: Sequence[BadgeRule]):
+    """The rules as a VALUES clause (name, metric, threshold) to join against in SQL."""
+    return values(
+        column("name", String(50)), column("metric", String), column("threshold", Integer), name="badge_rules",
+    ).data([(rule.name, rule.metric, rule.threshold) for rule in rules])
+
+
+def _user_metrics(user_ids: Optional[Sequence[int]]):
+    """One row per user: id, earned_badges and every metric in METRICS."""
+    validated = MediaItemModel.is_validated_by_community.is_(True)
+    media_stats = select(
+        MediaItemModel.user_id,
+        func.count().label(UPLOADS),
+        func.count().filter(validated).label(VALIDATED_SIGHTINGS),
+        func.count(MediaItemModel.effective_species.distinct()).filter(validated).label(SPECIES_OBSERVED),
+    ).group_by(MediaItemModel.user_id)
+    users = select(UserModel.id, UserModel.earned_badges, UserModel.score)
+    if user_ids is not None:
+        media_stats = media_stats.filter(MediaItemModel.user_id.in_(user_ids))
+        users = users.filter(UserModel.id.in_(user_ids))
+    media_stats = media_stats.subquery("media_stats")
+    users = users.subquery("candidates")
+    return (
+        select(
+            users.c.id.label("user_id"), users.c.earned_badges, users.c.score,
+            *(func.coalesce(media_stats.c[metric], 0).label(metric) for metric in METRICS if metric != SCORE),
+        )
+        .select_from(users.outerjoin(media_stats, media_stats.c.user_id == users.c.id))
+        .subquery("user_metrics")
+    )
+
+
+def badge_award_statement(user_ids: Optional[Sequence[int]] = None, metrics: Optional[Iterable[str]] = None):
+    """
+    One set-based UPDATE appending every badge the given users (all users if None) have
+    reached on the rules for `metrics` (all rules if None) but not earned yet.
+
+    Only users gaining a badge are written, and only earned_badges is set. The append is
+    filtered again against the locked row, so concurrent evaluations never duplicate a
+    badge. RETURNING (id, username) of every user that gained one. None if no rule applies.
+    """
+    rules = rules_for(metrics)
+    if not rules:
+        return None
+    user_metrics = _user_metrics(user_ids)
+    badge_rules = rules_values(rules)
+    metric_value = case({metric: user_metrics.c[metric] for metric in METRICS}, value=badge_rules.c.metric)
+    reached = (
+        select(
+            user_metrics.c.user_id,
+            func.array_agg(
+                aggregate_order_by(cast(badge_rules.c.name, String(50)), badge_rules.c.threshold)
+            ).label("badges"),
+        )
+        .select_from(user_metrics.join(badge_rules, and_(
+            metric_value >= badge_rules.c.threshold,
+            not_(badge_rules.c.name == any_(user_metrics.c.earned_badges)),
+        )))
+        .group_by(user_metrics.c.user_id)
+        .subquery("reached")
+    )
+
+    users = UserModel.__table__
+    badge = func.unnest(reached.c.badges).column_valued("badge")
+    # array || NULL leaves the array unchanged if another transaction got there first.
+    not_yet_earned = (
+        select(func.array_agg(badge))
+        .where(not_(badge == any_(users.c.earned_badges)))
+        .scalar_subquery()
+    )
+    return (
+        update(users)
+        .where(users.c.id == reached.c.user_id)
+        .values(earned_badges=users.c.earned_badges.concat(not_yet_earned))
+        .returning(users.c.id, users.c.username)
+    )
+
+
+async def award_badges(db: AsyncSession, user_ids: Iterable[int], metrics: Iterable[str]) -> List[int]:
+    """
+    Incremental evaluation after an event: award the badges `user_ids` reached on the
+    rules for `metrics`. Commits. Returns the ids of the users that gained a badge.
+    """
+    user_ids = sorted(set(user_ids))
+    statement = badge_award_statement(user_ids, metrics) if user_ids else None
+    if statement is None:
+        return []
+    awarded = (await db.execute(statement)).all()
+    await db.commit()
+    if awarded:
+        await auth_user_cache.invalidate(*(username for _, username in awarded))
+    return [user_id for user_id, _ in awarded]
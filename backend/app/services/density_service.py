@@ -0,0 +1,139 @@
+import math
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Label of the layer collecting every value beyond `max_layers`.
+OTHER_LAYER = "__other__"
+# Largest grid we are willing to build for one request: cells x (1 + possible layers),
+# i.e. 128 MB of int64 counts (plus a uint32 copy for the NumPy download).
+MAX_GRID_VALUES = 16_000_000
+
+
+class GridTooLargeError(ValueError):
+    """Raised when the requested bounds/resolution/layers would need more than MAX_GRID_VALUES counts."""
+
+
+class DensityGrid:
+    """
+    Accumulates point counts on a regular lat/lon grid, chunk by chunk, with vectorized
+    NumPy binning (counts over flattened cell indices, equivalent to histogram2d but
+    without re-computing bin edges per chunk).
+
+    A "total" layer is always kept. When label arrays are passed to `add` (e.g. species
+    and health status), one extra layer per distinct "<group>:<label>" is kept as well;
+    each group keeps at most `max_layers` layers and merges the rest into "<group>:__other__".
+    The counts of every layer `layer_groups` groups can produce are allocated up front, so
+    the memory of a grid is known (and bounded by MAX_GRID_VALUES) before any row is read.
+    """
+
+    def __init__(
+        self,
+        min_lat: float,
+        max_lat: float,
+        min_lon: float,
+        max_lon: float,
+        resolution: float,
+        max_layers: int = 20,
+        layer_groups: int = 0,
+    ):
+        self.min_lat, self.max_lat = min_lat, max_lat
+        self.min_lon, self.max_lon = min_lon, max_lon
+        self.resolution = resolution
+        self.ny = max(1, math.ceil((max_lat - min_lat) / resolution))
+        self.nx = max(1, math.ceil((max_lon - min_lon) / resolution))
+        # Each group holds up to `max_layers` labels plus its "__other__" layer
+        capacity = layer_groups * (max_layers + 1)
+        if self.nx * self.ny * (1 + capacity) > MAX_GRID_VALUES:
+            raise GridTooLargeError(
+                f"Grid of {self.ny}x{self.nx} cells with up to {capacity} layers exceeds the limit of "
+                f"{MAX_GRID_VALUES} counts; use a coarser resolution, smaller bounds or fewer layers."
+            )
+        self.max_layers = max_layers
+        self.layer_groups = layer_groups
+        self.layer_names: List[str] = []
+        self._layer_ids: Dict[str, int] = {}
+        self._group_sizes: Dict[str, int] = {}
+        # Row 0 is the total, row 1 + i the layer named layer_names[i]
+        self._counts = np.zeros((1 + capacity, self.ny * self.nx), dtype=np.int64)
+        self.total = self._counts[0]
+
+    def _cell_indices(self, lat: np.ndarray, lon: np.ndarray):
+        inside = (lat >= self.min_lat) & (lat <= self.max_lat) & (lon >= self.min_lon) & (lon <= self.max_lon)
+        iy = np.minimum(((lat[inside] - self.min_lat) / self.resolution).astype(np.int64), self.ny - 1)
+        ix = np.minimum(((lon[inside] - self.min_lon) / self.resolution).astype(np.int64), self.nx - 1)
+        return inside, iy * self.nx + ix
+
+    def _layer_id(self, group: str, label: str) -> int:
+        name = f"{group}:{label}"
+        if name not in self._layer_ids:
+            if group not in self._group_sizes and len(self._group_sizes) >= self.layer_groups:
+                raise ValueError(f"Layer group {group!r} exceeds the {self.layer_groups} groups this grid was sized for")
+            if self._group_sizes.get(group, 0) >= self.max_layers and label != OTHER_LAYER:
+                return self._layer_id(group, OTHER_LAYER)
+            self._group_sizes[group] = self._group_sizes.get(group, 0) + 1
+            self._layer_ids[name] = 1 + len(self.layer_names)
+            self.layer_names.append(name)
+        return self._layer_ids[name]
+
+    def add(self, lat: np.ndarray, lon: np.ndarray, labels: Optional[Dict[str, np.ndarray]] = None) -> None:
+        """
+        Bin one chunk of points.
+
+        Args:
+            lat: Latitudes (float array).
+            lon: Longitudes (float array, same length).
+            labels: Optional mapping of layer group (e.g. "species") to per-point labels
+                (object array, same length). Missing labels (None) are only counted in the total.
+        """
+        inside, cells = self._cell_indices(lat, lon)
+        self._accumulate(self.total, cells)
+        if not len(cells):
+            return
+
+        ncells = self.ny * self.nx
+        for group, values in (labels or {}).items():
+            values = values[inside]
+            present = values != None  # noqa: E711 - elementwise comparison on an object array
+            # Map this chunk's distinct labels to global layer ids, then bin (layer, cell) pairs at once.
+            unique_labels, inverse = np.unique(values[present].astype(str), return_inverse=True)
+            layer_ids = np.array([self._layer_id(group, label) for label in unique_labels], dtype=np.int64)
+            self._accumulate(self._counts.reshape(-1), layer_ids[inverse] * ncells + cells[present])
+
+    @staticmethod
+    def _accumulate(counts: np.ndarray, keys: np.ndarray) -> None:
+        # Sparse update: a chunk touches few cells, so sorting its keys is far cheaper than
+        # a dense bincount over the whole (layers x cells) grid.
+        touched, hits = np.unique(keys, return_counts=True)
+        counts[touched] += hits
+
+    def add_rows(self, rows: Sequence[Sequence], groups: Sequence[str] = ()) -> None:
+        """Bin a partition of DB rows shaped (latitude, longitude, *one label column per group)."""
+        count = len(rows)
+        lat = np.fromiter((row[0] for row in rows), dtype=np.float64, count=count)
+        lon = np.fromiter((row[1] for row in rows), dtype=np.float64, count=count)
+        labels = {
+            group: np.array([row[2 + i] for row in rows], dtype=object)
+            for i, group in enumerate(groups)
+        }
+        self.add(lat, lon, labels)
+
+    def as_array(self) -> np.ndarray:
+        """All layers stacked as uint32, shape (1 + len(layer_names), ny, nx); index 0 is the total."""
+        used = self._counts[: 1 + len(self.layer_names)]
+        return used.reshape(-1, self.ny, self.nx).astype(np.uint32)
+
+    @staticmethod
+    def _sparse(counts: np.ndarray, nx: int) -> List[List[int]]:
+        nonzero = np.flatnonzero(counts)
+        return np.column_stack((nonzero // nx, nonzero % nx, counts[nonzero])).tolist()
+
+    def to_dict(self) -> dict:
+        """Compact JSON form: non-empty cells only, as [row, col, count] triples per layer."""
+        return {
+            "resolution": self.resolution,
+            "bounds": {"min_lat": self.min_lat, "max_lat": self.max_lat, "min_lon": self.min_lon, "max_lon": self.max_lon},
+            "shape": [self.ny, self.nx],
+            "total": self._sparse(self.total, self.nx),
+            "layers": {name: self._sparse(self._counts[1 + i], self.nx) for i, name in enumerate(self.layer_names)},
+        }
@@ -1,5 +1,7 @@
 import cloudinary
+import cloudinary.api
 import cloudinary.uploader
+import cloudinary.utils
 from fastapi import UploadFile
 from typing import Optional
 from app.core.config import settings
@@ -40,4 +42,38 @@ async def upload_file_to_storage(file: UploadFile) -> Optional[str]:
             return None
     except Exception as e:
         print(f"ERROR: An exception occurred during Cloudinary upload: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+# --- Parquet snapshots (written by the Celery worker, served by the API under /exports) ---
+
+def _export_public_id(relative_path: str) -> str:
+    return f"{settings.EXPORT_SNAPSHOT_FOLDER}/{relative_path}"
+
+def export_file_url(relative_path: str) -> str:
+    """Public Cloudinary URL of a published snapshot file, e.g. "latest.json"."""
+    url, _ = cloudinary.utils.cloudinary_url(_export_public_id(relative_path), resource_type="raw", secure=True)
+    return url
+
+def upload_export_file(local_path: str, relative_path: str) -> None:
+    """Upload one snapshot file as a raw asset, replacing (and purging from the CDN) any previous version."""
+    cloudinary.uploader.upload_large(
+        local_path,
+        public_id=_export_public_id(relative_path),
+        resource_type="raw",
+        overwrite=True,
+        invalidate=True,
+    )
+
+def delete_old_export_snapshots(keep: int) -> None:
+    """Delete all but the `keep` newest snapshots (snapshot ids sort chronologically)."""
+    prefix = _export_public_id("snapshots/")
+    snapshot_ids, options = set(), {}
+    while True:
+        page = cloudinary.api.resources(type="upload", resource_type="raw", prefix=prefix, max_results=500, **options)
+        snapshot_ids.update(resource["public_id"][len(prefix):].split("/", 1)[0] for resource in page["resources"])
+        if not page.get("next_cursor"):
+            break
+        options["next_cursor"] = page["next_cursor"]
+    for snapshot_id in sorted(snapshot_ids)[:-max(keep, 1)]:
+        cloudinary.api.delete_resources_by_prefix(f"{prefix}{snapshot_id}/", resource_type="raw")
@@ -0,0 +1,213 @@
+import math
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import Date, Integer, String, cast, delete, func, literal
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+
+from app.models.media import MediaItem as MediaItemModel
+from app.models.sighting_rollup import SightingRollup as SightingRollupModel
+
+# Size of a spatial rollup cell in degrees. Changing it requires running rebuild_rollups.py.
+ROLLUP_CELL_DEGREES = 1.0
+
+# A sighting's contribution to the rollups: (UTC day, cell_lat, cell_lon, species, health_status).
+RollupKey = Tuple[date, int, int, str, str]
+# A change to one sighting: (key before, key after). None means "not counted".
+RollupChange = Tuple[Optional[RollupKey], Optional[RollupKey]]
+
+
+def cell_index(coordinate: float) -> int:
+    """Index of the rollup cell containing a latitude or longitude."""
+    return math.floor(coordinate / ROLLUP_CELL_DEGREES)
+
+
+def rollup_key(
+    latitude: Optional[float],
+    longitude: Optional[float],
+    sighting_timestamp: Optional[datetime],
+    species: Optional[str],
+    health_status: Optional[str],
+) -> Optional[RollupKey]:
+    """
+    Compute the rollup key of a sighting from its final (validated-or-AI) species/health.
+    Returns None for sightings that are not visible to research queries.
+    """
+    if latitude is None or longitude is None or sighting_timestamp is None or species is None or health_status is None:
+        return None
+    day = sighting_timestamp.astimezone(timezone.utc).date()
+    return (day, cell_index(latitude), cell_index(longitude), species, health_status)
+
+
+def rollup_key_for_item(item) -> Optional[RollupKey]:
+    """
+    Rollup key for a MediaItem (or any object with the same attribute names).
+
+    Deliberately recomputes COALESCE(validated, AI) instead of reading the effective_*
+    generated columns: on a modified ORM object those are only refreshed after the flush.
+    """
+    species = item.validated_species if item.validated_species is not None else item.species_ai_prediction
+    health = (
+        item.validated_health_status if item.validated_health_status is not None
+        else item.health_status_ai_prediction
+    )
+    return rollup_key(item.latitude, item.longitude, item.sighting_timestamp, species, health)
+
+
+def rollup_deltas(changes: Iterable[RollupChange]) -> Counter:
+    """Collapse a list of per-sighting changes into a net count delta per rollup key."""
+    deltas: Counter = Counter()
+    for old_key, new_key in changes:
+        if old_key == new_key:
+            continue
+        if old_key is not None:
+            deltas[old_key] -= 1
+        if new_key is not None:
+            deltas[new_key] += 1
+    return deltas
+
+
+def rollup_upsert_statement(deltas: Counter):
+    """
+    Build one multi-row INSERT ... ON CONFLICT DO UPDATE applying `deltas` to both the
+    day and the month rollup rows. Returns None if there is nothing to apply.
+    """
+    rows = Counter()
+    for (day, cell_lat, cell_lon, species, health), delta in deltas.items():
+        if delta == 0:
+            continue
+        rows[("day", day, cell_lat, cell_lon, species, health)] += delta
+        rows[("month", day.replace(day=1), cell_lat, cell_lon, species, health)] += delta
+    if not rows:
+        return None
+
+    # Sorted so concurrent writers always lock rollup rows in the same order.
+    values = [
+        {
+            "granularity": granularity, "period_start": period_start, "cell_lat": cell_lat,
+            "cell_lon": cell_lon, "species": species, "health_status": health, "sighting_count": delta,
+        }
+        for (granularity, period_start, cell_lat, cell_lon, species, health), delta in sorted(rows.items())
+        if delta != 0
+    ]
+    stmt = insert(SightingRollupModel).values(values)
+    return stmt.on_conflict_do_update(
+        index_elements=["granularity", "period_start", "cell_lat", "cell_lon", "species", "health_status"],
+        set_={"sighting_count": SightingRollupModel.sighting_count + stmt.excluded.sighting_count},
+    )
+
+
+async def apply_rollup_changes(db: AsyncSession, changes: Iterable[RollupChange]) -> None:
+    """
+    Apply sighting changes to the rollups inside the caller's transaction (no commit),
+    so the rollups commit or roll back together with the media_items write.
+    """
+    stmt = rollup_upsert_statement(rollup_deltas(changes))
+    if stmt is not None:
+        await db.execute(stmt)
+
+
+def apply_rollup_changes_sync(db: Session, changes: Iterable[RollupChange]) -> None:
+    """Synchronous twin of `apply_rollup_changes`, for the Celery workers."""
+    stmt = rollup_upsert_statement(rollup_deltas(changes))
+    if stmt is not None:
+        db.execute(stmt)
+
+
+def _rebuild_select(granularity: str):
+    species = MediaItemModel.effective_species
+    health = MediaItemModel.effective_health
+    utc_timestamp = func.timezone("UTC", MediaItemModel.sighting_timestamp)
+    if granularity == "day":
+        period = cast(utc_timestamp, Date)
+    else:
+        period = cast(func.date_trunc("month", utc_timestamp), Date)
+    cell_lat = cast(func.floor(MediaItemModel.latitude / ROLLUP_CELL_DEGREES), Integer)
+    cell_lon = cast(func.floor(MediaItemModel.longitude / ROLLUP_CELL_DEGREES), Integer)
+    return (
+        select(
+            literal(granularity, String).label("granularity"), period.label("period_start"),
+            cell_lat.label("cell_lat"), cell_lon.label("cell_lon"),
+            species.label("species"), health.label("health_status"),
+            func.count().label("sighting_count"),
+        )
+        .filter(MediaItemModel.latitude.isnot(None))
+        .filter(MediaItemModel.longitude.isnot(None))
+        .filter(MediaItemModel.sighting_timestamp.isnot(None))
+        .filter(species.isnot(None))
+        .filter(health.isnot(None))
+        .group_by(period, cell_lat, cell_lon, species, health)
+    )
+
+
+async def rebuild_rollups(db: AsyncSession) -> int:
+    """
+    Recompute every rollup row from media_items with two set-based INSERT ... SELECT
+    ... GROUP BY statements, replacing the current contents in one transaction.
+
+    Returns:
+        The number of rollup rows written.
+    """
+    columns = ["granularity", "period_start", "cell_lat", "cell_lon", "species", "health_status", "sighting_count"]
+    await db.execute(delete(SightingRollupModel))
+    written = 0
+    for granularity in ("day", "month"):
+        result = await db.execute(
+            insert(SightingRollupModel).from_select(columns, _rebuild_select(granularity))
+        )
+        written += result.rowcount
+    await db.commit()
+    return written
+
+
+def choose_granularity(date_from: Optional[date], date_to: Optional[date]) -> str:
+    """
+    Use the (much smaller) monthly rollups whenever the window covers whole months only.
+    """
+    starts_on_month = date_from is None or date_from.day == 1
+    ends_on_month = date_to is None or (date_to + timedelta(days=1)).day == 1
+    return "month" if starts_on_month and ends_on_month else "day"
+
+
+def apply_rollup_window(
+    query,
+    granularity: str,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    min_lat: Optional[float] = None,
+    max_lat: Optional[float] = None,
+    min_lon: Optional[float] = None,
+    max_lon: Optional[float] = None,
+    species: Optional[str] = None,
+    health_status: Optional[str] = None,
+):
+    """
+    Restrict a query over sighting_rollups to a time window (inclusive dates), a bounding
+    box and optionally one species / health status (case-insensitive exact match).
+
+    The bounding box is resolved to whole rollup cells, so counts include every cell
+    the box touches.
+    """
+    query = query.filter(SightingRollupModel.granularity == granularity)
+    if date_from is not None:
+        start = date_from if granularity == "day" else date_from.replace(day=1)
+        query = query.filter(SightingRollupModel.period_start >= start)
+    if date_to is not None:
+        query = query.filter(SightingRollupModel.period_start <= date_to)
+    if min_lat is not None:
+        query = query.filter(SightingRollupModel.cell_lat >= cell_index(min_lat))
+    if max_lat is not None:
+        query = query.filter(SightingRollupModel.cell_lat <= cell_index(max_lat))
+    if min_lon is not None:
+        query = query.filter(SightingRollupModel.cell_lon >= cell_index(min_lon))
+    if max_lon is not None:
+        query = query.filter(SightingRollupModel.cell_lon <= cell_index(max_lon))
+    if species:
+        query = query.filter(func.lower(SightingRollupModel.species) == species.lower())
+    if health_status:
+        query = query.filter(func.lower(SightingRollupModel.health_status) == health_status.lower())
+    return query.filter(SightingRollupModel.sighting_count > 0)
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.redis_client import get_async_redis
+from app.db.database import AsyncSessionLocal
+from app.services import validation_service
+
+logger = logging.getLogger(__name__)
+
+# Redis sorted set of dirty media item ids, scored by when they were first marked.
+DIRTY_KEY = "validation:dirty"
+# Redis counters of marks and re-evaluations across all processes: a vote is marked by the
+# worker that received it but evaluated by whichever worker drains the set.
+MARKED_KEY = "validation:coalesce:marked"
+EVALUATED_KEY = "validation:coalesce:evaluated"
+# Max items re-evaluated per pass; the rest wait for the next window.
+MAX_ITEMS_PER_PASS = 500
+
+
+class ValidationCoalescer:
+    """
+    Debounces consensus re-evaluation of media items that receive many votes.
+
+    With VALIDATION_COALESCE_WINDOW_SECONDS > 0 the vote endpoint commits the vote (and its
+    tallies) and only calls `mark_dirty`. A background task started in the app lifespan
+    re-evaluates every dirty item once per window, so N votes on a hot item within a window
+    cost one media_items write instead of N.
+
+    Dirty items live in a Redis sorted set when REDIS_URL is set (shared by all workers,
+    survives restarts), otherwise in this process. Consensus therefore lags votes by at
+    most about one window; the lag is reported as `validation.coalesce.staleness_seconds`.
+    The coalescing ratio (votes per re-evaluation) comes from counters kept next to the set
+    in Redis, or from this process's counters without Redis.
+    """
+
+    def __init__(self):
+        self._dirty: Dict[int, float] = {}  # media_item_id -> first marked (epoch seconds)
+        self._task: Optional[asyncio.Task] = None
+        self._shared_counts: Optional[Tuple[int, int]] = None  # (marked, evaluated) in Redis, as of the last pass
+        metrics.register_collector("validation_coalescer", self.stats)
+
+    @property
+    def enabled(self) -> bool:
+        return settings.VALIDATION_COALESCE_WINDOW_SECONDS > 0
+
+    async def mark_dirty(self, media_item_id: int) -> None:
+        """Schedule a re-evaluation of `media_item_id` at the end of the current window."""
+        metrics.inc("validation.coalesce.marked")
+        redis = get_async_redis()
+        if redis is not None:
+            try:
+                # NX keeps the first mark time, which is what staleness is measured from.
+                pipe = redis.pipeline(transaction=False)
+                pipe.zadd(DIRTY_KEY, {str(media_item_id): time.time()}, nx=True)
+                pipe.incr(MARKED_KEY)
+                await pipe.execute()
+                return
+            except Exception as e:
+                logger.warning(f"Validation coalescer: Redis unavailable, marking locally: {e}")
+        self._dirty.setdefault(media_item_id, time.time())
+
+    async def _pop_dirty(self) -> Dict[int, float]:
+        popped, self._dirty = self._dirty, {}
+        redis = get_async_redis()
+        if redis is not None:
+            try:
+                # ZPOPMIN is atomic, so each dirty item is claimed by exactly one worker and an
+                # item marked again meanwhile is simply re-added for the next window.
+                for member, marked_at in await redis.zpopmin(DIRTY_KEY, MAX_ITEMS_PER_PASS):
+                    media_item_id = int(member)
+                    popped[media_item_id] = min(marked_at, popped.get(media_item_id, marked_at))
+            except Exception as e:
+                logger.warning(f"Validation coalescer: could not read dirty items from Redis: {e}")
+        return popped
+
+    async def _count_evaluated(self, evaluated: int) -> None:
+        """Add a pass's re-evaluations to the Redis counters and refresh the cached totals."""
+        redis = get_async_redis()
+        if redis is None:
+            return
+        try:
+            pipe = redis.pipeline(transaction=False)
+            if evaluated:
+                pipe.incrby(EVALUATED_KEY, evaluated)
+            pipe.mget(MARKED_KEY, EVALUATED_KEY)
+            marked, total_evaluated = (await pipe.execute())[-1]
+            self._shared_counts = (int(marked or 0), int(total_evaluated or 0))
+        except Exception as e:
+            logger.warning(f"Validation coalescer: could not update the shared counters in Redis: {e}")
+
+    async def flush(self) -> int:
+        """Re-evaluate every currently dirty item once. Returns the number of items evaluated."""
+        dirty = await self._pop_dirty()
+        evaluated = 0
+        for media_item_id, marked_at in sorted(dirty.items()):
+            try:
+                async with AsyncSessionLocal() as db:
+                    await validation_service.re_evaluate_media_item_validation(db=db, media_item_id=media_item_id)
+            except Exception as e:
+                logger.error(f"Validation coalescer: re-evaluation of MediaItem {media_item_id} failed: {e}")
+                await self.mark_dirty(media_item_id)
+                continue
+            evaluated += 1
+            metrics.inc("validation.coalesce.evaluated")
+            metrics.observe("validation.coalesce.staleness_seconds", time.time() - marked_at)
+        await self._count_evaluated(evaluated)
+        return len(dirty)
+
+    async def _run(self) -> None:
+        window = settings.VALIDATION_COALESCE_WINDOW_SECONDS
+        while True:
+            await asyncio.sleep(window)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Validation coalescer: flush failed: {e}")
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the background loop and evaluate whatever is still dirty in this process."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        if self._shared_counts is not None:
+            (marked, evaluated), scope = self._shared_counts, "all_workers"
+        else:
+            marked = metrics.counter("validation.coalesce.marked")
+            evaluated = metrics.counter("validation.coalesce.evaluated")
+            scope = "this_process"
+        return {
+            "enabled": self.enabled,
+            "window_seconds": settings.VALIDATION_COALESCE_WINDOW_SECONDS,
+            "pending_local": len(self._dirty),
+            # Votes per re-evaluation; 1.0 means no coalescing happened.
+            "coalescing_ratio": marked / evaluated if evaluated else 0.0,
+            "coalescing_ratio_scope": scope,
+        }
+
+
+validation_coalescer = ValidationCoalescer()
@@ -1,13 +1,14 @@
+from collections import defaultdict
+from types import SimpleNamespace
+from sqlalchemy import Integer, column, update, values
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import Dict, Any, Optional
-from collections import Counter  # For counting votes
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 
+from app.core.response_cache import response_cache
 from app.models.media import MediaItem as MediaItemModel
-from app.models.validation_vote import ValidationVote as ValidationVoteModel
-from app.crud import crud_media  # To update MediaItem
-from app.schemas import media as schemas  # Import schemas for MediaItemUpdate
-from app.schemas.validation_vote import ValidationVoteCreate  # For type hinting
+from app.crud import crud_media, crud_validation_tally
+from app.services import badge_service, rollup_service
 
 # --- Constants for Validation Logic ---
 CONFIRM_VOTE_VALUE = 1
@@ -15,121 +16,295 @@ DISPUTE_VOTE_VALUE = -1
 # Threshold for consensus (e.g., if validation_score > 3, it's validated)
 CONSENSUS_THRESHOLD = 3
 
+# Weights of the validation queue priority (they sum to 1.0): uncertain AI results first,
+# then items with few votes, then items one or two votes away from consensus.
+PRIORITY_WEIGHT_UNCERTAINTY = 0.5
+PRIORITY_WEIGHT_FEW_VOTES = 0.3
+PRIORITY_WEIGHT_NEAR_CONSENSUS = 0.2
+
+# MediaItem fields owned by the consensus logic.
+CONSENSUS_FIELDS = (
+    "validation_score", "validated_species", "validated_health_status", "is_validated_by_community",
+    "validation_vote_count", "validation_leading_count", "validation_priority",
+)
+# Rows per UPDATE ... FROM (VALUES ...) statement in bulk recomputation.
+BULK_UPDATE_BATCH_SIZE = 5000
+
+
+def validation_priority(
+    ai_confidence_score: Optional[float], validation_vote_count: int, validation_leading_count: int
+) -> float:
+    """
+    How urgently an item needs community validation (0.0 - 1.0, higher first in the queue).
+
+    Args:
+        ai_confidence_score: The AI's confidence (unknown counts as 0.5).
+        validation_vote_count: Species + health opinions received so far.
+        validation_leading_count: Votes behind the best-supported value.
+    """
+    confidence = ai_confidence_score if ai_confidence_score is not None else 0.5
+    uncertainty = 1.0 - min(max(confidence, 0.0), 1.0)
+    few_votes = 1.0 / (1 + validation_vote_count)
+    near_consensus = (
+        min(validation_leading_count, CONSENSUS_THRESHOLD - 1) / (CONSENSUS_THRESHOLD - 1)
+        if CONSENSUS_THRESHOLD > 1 else 0.0
+    )
+    return round(
+        PRIORITY_WEIGHT_UNCERTAINTY * uncertainty
+        + PRIORITY_WEIGHT_FEW_VOTES * few_votes
+        + PRIORITY_WEIGHT_NEAR_CONSENSUS * near_consensus,
+        6,
+    )
+
+
+def decide_consensus(
+    species_ai_prediction: Optional[str],
+    health_status_ai_prediction: Optional[str],
+    tallies: Iterable[Tuple[str, str, str, int]],
+    ai_confidence_score: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Decides the crowdsourced validation summary of a MediaItem from its vote tallies.
+
+    Args:
+        species_ai_prediction: The item's AI species guess (what "confirm" votes confirm).
+        health_status_ai_prediction: The item's AI health guess.
+        tallies: (attribute, kind, value, vote_count) rows, see ValidationTally.
+        ai_confidence_score: The item's AI confidence, for the validation queue priority.
+
+    Returns:
+        The MediaItem fields to update, see CONSENSUS_FIELDS.
+    """
+    total_validation_score = 0
+    total_votes = 0
+    leading_count = 0  # Votes behind the best-supported value of either attribute
+    confirm_counts: Dict[str, int] = {"species": 0, "health": 0}
+    corrections: Dict[str, Dict[str, int]] = {"species": {}, "health": {}}
+    for attribute, kind, value, vote_count in tallies:
+        if vote_count <= 0:
+            continue
+        total_votes += vote_count
+        leading_count = max(leading_count, vote_count)
+        if kind == crud_validation_tally.CONFIRM:
+            confirm_counts[attribute] += vote_count
+            total_validation_score += CONFIRM_VOTE_VALUE * vote_count  # Add to overall score
+        else:
+            corrections[attribute][value] = vote_count
+            total_validation_score += DISPUTE_VOTE_VALUE * vote_count  # Disputing reduces score
+
+    # Consensus: the AI guess if enough users confirmed it, otherwise the most common
+    # correction if it reached the threshold (ties go to the alphabetically first value).
+    final_values: Dict[str, Optional[str]] = {}
+    is_validated = False
+    for attribute, ai_prediction in (("species", species_ai_prediction), ("health", health_status_ai_prediction)):
+        final_values[attribute] = None
+        if ai_prediction and confirm_counts[attribute] >= CONSENSUS_THRESHOLD:
+            final_values[attribute] = ai_prediction
+            is_validated = True
+        elif corrections[attribute]:
+            value, count = min(corrections[attribute].items(), key=lambda item: (-item[1], item[0]))
+            if count >= CONSENSUS_THRESHOLD:
+                final_values[attribute] = value
+                is_validated = True
+
+    return {
+        "validation_score": total_validation_score,
+        "validated_species": final_values["species"],
+        "validated_health_status": final_values["health"],
+        "is_validated_by_community": is_validated,
+        "validation_vote_count": total_votes,
+        "validation_leading_count": leading_count,
+        "validation_priority": validation_priority(ai_confidence_score, total_votes, leading_count),
+    }
+
 
 async def re_evaluate_media_item_validation(
     db: AsyncSession, media_item_id: int
-) -> Optional[MediaItemModel]:
+) -> Optional[Dict[str, Any]]:
     """
     Re-evaluates the crowdsourced validation summary fields for a given MediaItem
-    based on all associated ValidationVote records.
+    from its vote tallies (kept up to date with every vote write), so the cost does
+    not grow with the number of votes on the item.
+
+    Writes through the same path as `re_evaluate_media_items` and `recompute_all_consensus`,
+    so the stored values never depend on which endpoint received the votes: they are set
+    exactly, and an item that lost consensus has its validated values cleared. Commits.
 
     Args:
         db: The asynchronous database session.
         media_item_id: The ID of the MediaItem to re-evaluate.
 
     Returns:
-        The updated MediaItemModel instance, or None if not found.
+        The change written (see `recompute_all_consensus`), or None if nothing changed
+        or the item was not found.
     """
-    # 1. Retrieve the MediaItem
-    media_item = await crud_media.get_media_item(db, media_item_id)
-    if not media_item:
+    # 1. Lock the MediaItem (concurrent re-evaluations of it queue here, and each then
+    #    reads the tallies committed before it), then read its vote tallies
+    item = (await db.execute(
+        select(*CONSENSUS_ITEM_COLUMNS).filter(MediaItemModel.id == media_item_id).with_for_update()
+    )).first()
+    if item is None:
         print(f"Validation Service: MediaItem {media_item_id} not found for re-evaluation.")
         return None
+    tallies = await crud_validation_tally.get_tallies_for_media_item(db, media_item_id)
 
-    # 2. Retrieve all validation votes for this MediaItem
-    votes_for_item = await db.execute(
-        select(ValidationVoteModel).filter(ValidationVoteModel.media_item_id == media_item_id)
+    # 2. Decide consensus and write it if it changed
+    change = _consensus_change(item, [(tally.attribute, tally.kind, tally.value, tally.vote_count) for tally in tallies])
+    if change is None:
+        await db.commit()  # Releases the row lock
+        return None
+    await _apply_consensus_batch(db, [change])
+    await db.commit()
+    await _invalidate_cached_pages([change])
+
+    after = change["after"]
+    print(
+        f"Validation Service: MediaItem {media_item_id} re-evaluated. "
+        f"Score: {after['validation_score']}, Validated Species: {after['validated_species']}, "
+        f"Validated Health: {after['validated_health_status']}, Is Validated: {after['is_validated_by_community']}"
     )
-    all_votes = votes_for_item.scalars().all()
 
-    # Initialize summary variables
-    total_validation_score = 0
-    species_confirm_counts: Dict[str, int] = {}  # Counts confirms for AI guess
-    species_dispute_corrections: Dict[str, int] = {}  # Counts corrected species names
-
-    health_confirm_counts: Dict[str, int] = {}  # Counts confirms for AI guess
-    health_dispute_corrections: Dict[str, int] = {}  # Counts corrected health statuses
-
-    # 3. Process all votes
-    for vote in all_votes:
-        # Process species vote
-        if vote.vote_on_species is True:  # User confirms AI species
-            if media_item.species_ai_prediction:
-                species_confirm_counts[media_item.species_ai_prediction] = (
-                    species_confirm_counts.get(media_item.species_ai_prediction, 0) + CONFIRM_VOTE_VALUE
-                )
-            total_validation_score += CONFIRM_VOTE_VALUE  # Add to overall score
-        elif vote.vote_on_species is False and vote.corrected_species_name:  # User disputes and corrects
-            species_dispute_corrections[vote.corrected_species_name] = (
-                species_dispute_corrections.get(vote.corrected_species_name, 0) + CONFIRM_VOTE_VALUE
-            )
-            total_validation_score += DISPUTE_VOTE_VALUE  # Disputing reduces score
-
-        # Process health vote
-        if vote.vote_on_health is True:  # User confirms AI health
-            if media_item.health_status_ai_prediction:
-                health_confirm_counts[media_item.health_status_ai_prediction] = (
-                    health_confirm_counts.get(media_item.health_status_ai_prediction, 0) + CONFIRM_VOTE_VALUE
-                )
-            total_validation_score += CONFIRM_VOTE_VALUE  # Add to overall score
-        elif vote.vote_on_health is False and vote.corrected_health_status:  # User disputes and corrects
-            health_dispute_corrections[vote.corrected_health_status] = (
-                health_dispute_corrections.get(vote.corrected_health_status, 0) + CONFIRM_VOTE_VALUE
-            )
-            total_validation_score += DISPUTE_VOTE_VALUE  # Disputing reduces score
-
-    # 4. Determine Consensus (Simplistic Logic)
-    final_validated_species: Optional[str] = None
-    final_validated_health: Optional[str] = None
-    is_validated = False
+    # 3. A newly validated sighting can earn its owner a badge
+    await badge_service.award_badges(db, _newly_validated_owners([change]), badge_service.VALIDATION_METRICS)
+    return change
 
-    # Species Consensus:
-    if (
-        media_item.species_ai_prediction
-        and species_confirm_counts.get(media_item.species_ai_prediction, 0) >= CONSENSUS_THRESHOLD
-    ):
-        final_validated_species = media_item.species_ai_prediction
-        is_validated = True
-    else:
-        most_common_corrected_species = Counter(species_dispute_corrections).most_common(1)
-        if most_common_corrected_species and most_common_corrected_species[0][1] >= CONSENSUS_THRESHOLD:
-            final_validated_species = most_common_corrected_species[0][0]
-            is_validated = True
 
-    # Health Consensus:
-    if (
-        media_item.health_status_ai_prediction
-        and health_confirm_counts.get(media_item.health_status_ai_prediction, 0) >= CONSENSUS_THRESHOLD
-    ):
-        final_validated_health = media_item.health_status_ai_prediction
-        is_validated = True
-    else:
-        most_common_corrected_health = Counter(health_dispute_corrections).most_common(1)
-        if most_common_corrected_health and most_common_corrected_health[0][1] >= CONSENSUS_THRESHOLD:
-            final_validated_health = most_common_corrected_health[0][0]
-            is_validated = True
+async def _apply_consensus_batch(db: AsyncSession, changes: List[Dict[str, Any]]) -> None:
+    """Write one batch of recomputed consensus values with a single UPDATE ... FROM (VALUES ...)."""
+    new_values = values(
+        column("id", Integer),
+        *(column(field, MediaItemModel.__table__.c[field].type) for field in CONSENSUS_FIELDS),
+        name="new_values",
+    ).data([
+        (change["media_item_id"], *(change["after"][field] for field in CONSENSUS_FIELDS))
+        for change in changes
+    ])
+    await db.execute(
+        update(MediaItemModel)
+        .where(MediaItemModel.id == new_values.c.id)
+        .values(**{field: new_values.c[field] for field in CONSENSUS_FIELDS})
+        .execution_options(synchronize_session=False)
+    )
+    await rollup_service.apply_rollup_changes(db, [(change["rollup_before"], change["rollup_after"]) for change in changes])
 
-    # 5. Prepare update data for MediaItem
-    update_data: Dict[str, Any] = {
-        "validation_score": total_validation_score,
-        "validated_species": final_validated_species,
-        "validated_health_status": final_validated_health,
-        "is_validated_by_community": is_validated,
-    }
 
-    # 6. Update the MediaItem record in the database
-    media_item_update_schema = schemas.MediaItemUpdate(**update_data)  # Create Pydantic schema from dict
+# Columns of a MediaItem needed to decide and diff its consensus.
+CONSENSUS_ITEM_COLUMNS = [
+    MediaItemModel.id, MediaItemModel.user_id, MediaItemModel.species_ai_prediction, MediaItemModel.health_status_ai_prediction,
+    MediaItemModel.ai_confidence_score, MediaItemModel.latitude, MediaItemModel.longitude, MediaItemModel.sighting_timestamp,
+    *(getattr(MediaItemModel, field) for field in CONSENSUS_FIELDS),
+]
+
 
-    updated_media_item = await crud_media.update_media_item(
-        db=db,
-        db_media_item=media_item,  # Pass the original MediaItem model instance
-        media_item_in=media_item_update_schema,  # Pass the updates
+def _consensus_change(item, tallies) -> Optional[Dict[str, Any]]:
+    """Diff an item row (CONSENSUS_ITEM_COLUMNS) against the consensus of its tallies; None if unchanged."""
+    after = decide_consensus(
+        item.species_ai_prediction, item.health_status_ai_prediction, tallies, item.ai_confidence_score
     )
+    before = {field: getattr(item, field) for field in CONSENSUS_FIELDS}
+    if after == before:
+        return None
+    return {
+        "media_item_id": item.id,
+        "user_id": item.user_id,
+        "before": before,
+        "after": after,
+        "rollup_before": rollup_service.rollup_key_for_item(item),
+        "rollup_after": rollup_service.rollup_key_for_item(SimpleNamespace(**{**item._asdict(), **after})),
+    }
 
-    print(
-        f"Validation Service: MediaItem {media_item_id} re-evaluated. "
-        f"Score: {total_validation_score}, Validated Species: {final_validated_species}, "
-        f"Validated Health: {final_validated_health}, Is Validated: {is_validated}"
+
+async def _invalidate_cached_pages(changes: List[Dict[str, Any]]) -> None:
+    # Score, vote counts and priority are not in the cached map/research pages: most votes change only those.
+    if any(crud_media.cached_fields_changed(change["before"], change["after"]) for change in changes):
+        await response_cache.invalidate()
+
+
+def _newly_validated_owners(changes: List[Dict[str, Any]]) -> List[int]:
+    return [
+        change["user_id"] for change in changes
+        if change["after"]["is_validated_by_community"] and not change["before"]["is_validated_by_community"]
+    ]
+
+
+async def re_evaluate_media_items(db: AsyncSession, media_item_ids: Iterable[int]) -> List[Dict[str, Any]]:
+    """
+    Set-based counterpart of `re_evaluate_media_item_validation` for many items at once:
+    one query for their tallies, one for their current values, and batched
+    UPDATE ... FROM (VALUES ...) writes for the items whose consensus changed. Commits.
+
+    Returns:
+        The changes written (see `recompute_all_consensus`).
+    """
+    media_item_ids = sorted(set(media_item_ids))
+    if not media_item_ids:
+        return []
+    # Lock the items first (in id order, so concurrent batches cannot deadlock), then read the tallies
+    items = (await db.execute(
+        select(*CONSENSUS_ITEM_COLUMNS).filter(MediaItemModel.id.in_(media_item_ids)).order_by(MediaItemModel.id)
+        .with_for_update()
+    )).all()
+    tallies_by_item: Dict[int, list] = defaultdict(list)
+    for media_item_id, attribute, kind, value, vote_count in await crud_validation_tally.get_tallies_for_media_items(
+        db, media_item_ids
+    ):
+        tallies_by_item[media_item_id].append((attribute, kind, value, vote_count))
+
+    changes = [
+        change for item in items
+        if (change := _consensus_change(item, tallies_by_item.get(item.id, ()))) is not None
+    ]
+    for start in range(0, len(changes), BULK_UPDATE_BATCH_SIZE):
+        await _apply_consensus_batch(db, changes[start:start + BULK_UPDATE_BATCH_SIZE])
+    await db.commit()
+    await _invalidate_cached_pages(changes)
+    await badge_service.award_badges(db, _newly_validated_owners(changes), badge_service.VALIDATION_METRICS)
+    return changes
+
+
+async def recompute_all_consensus(db: AsyncSession, dry_run: bool = False) -> List[Dict[str, Any]]:
+    """
+    Recomputes the consensus fields of every MediaItem from validation_votes with
+    set-based queries, e.g. after changing CONSENSUS_THRESHOLD or the vote values.
+
+    Votes are aggregated with one GROUP BY query (the same aggregate that rebuilds
+    validation_tallies), consensus is decided with `decide_consensus`, and only the items
+    whose values change are written, in batches of BULK_UPDATE_BATCH_SIZE. Values are set
+    exactly, so items that lost consensus are cleared.
+
+    Args:
+        db: The asynchronous database session.
+        dry_run: If True, nothing is written; the changes are only computed.
+
+    Returns:
+        One {"media_item_id", "before", "after"} dict per changed item (plus the
+        rollup keys used internally), in media item id order.
+    """
+    # 1. Aggregate every vote once: (media_item_id, attribute, kind, value, vote_count)
+    tallies_by_item: Dict[int, list] = defaultdict(list)
+    tally_rows = await db.stream(crud_validation_tally.tally_aggregate_select())
+    async for media_item_id, attribute, kind, value, vote_count in tally_rows:
+        tallies_by_item[media_item_id].append((attribute, kind, value, vote_count))
+
+    # 2. Compare with the stored values of every item, streamed in id order
+    items = await db.stream(
+        select(*CONSENSUS_ITEM_COLUMNS).order_by(MediaItemModel.id)
+        .execution_options(yield_per=BULK_UPDATE_BATCH_SIZE)
     )
+    changes: List[Dict[str, Any]] = []
+    async for item in items:
+        change = _consensus_change(item, tallies_by_item.get(item.id, ()))
+        if change is not None:
+            changes.append(change)
+
+    if dry_run:
+        return changes
 
-    return updated_media_item
+    # 3. Write the changes in batches, re-sync the tallies and commit everything together
+    for start in range(0, len(changes), BULK_UPDATE_BATCH_SIZE):
+        await _apply_consensus_batch(db, changes[start:start + BULK_UPDATE_BATCH_SIZE])
+    await crud_validation_tally.rebuild_tallies(db)
+    await db.commit()
+    await _invalidate_cached_pages(changes)
+    await badge_service.award_badges(db, _newly_validated_owners(changes), badge_service.VALIDATION_METRICS)
+    return changes
@@ -5,13 +5,12 @@ import requests
 from io import BytesIO
 from PIL import Image
 from datetime import datetime, timezone
-from sqlalchemy import update
-from sqlalchemy.exc import SQLAlchemyError
+from celery.signals import worker_process_init, worker_process_shutdown
 
-from app.db.sync_database import SyncSessionLocal
+from app.db.sync_database import sync_engine
+from app.services.ai_result_writer import ai_result_writer
 import google.generativeai as genai
 from app.celery_app import celery_app
-from app.models.media import MediaItem
 from app.core.config import settings
 
 # NEW, V3 PROMPT for Google Gemini AI - More detailed and structured
@@ -62,14 +61,13 @@ If no marine life is detected, the JSON should be:
 
 def update_db_sync_operation(media_item_id: int, ai_data: dict, status: str):
     """
-    Synchronous database operation to update MediaItem record with detailed AI results.
+    Queue the detailed AI results of a MediaItem for the worker's batched DB writer,
+    which writes them together with the results of other tasks (see AIResultWriter).
     """
-    db = SyncSessionLocal()
     try:
         # Safely extract data from the new, richer JSON structure
         primary_species = ai_data.get('primary_species', {}) or {}
         health = ai_data.get('health_assessment', {}) or {}
-        env = ai_data.get('environmental_context', {}) or {}
 
         update_data = {
             "ai_processing_status": status,
@@ -81,18 +79,21 @@ def update_db_sync_operation(media_item_id: int, ai_data: dict, status: str):
             "health_status_ai_prediction": health.get("status", "N/A"),
             "ai_confidence_score": float(primary_species.get('identification_confidence', 0.0)),
         }
-        
-        stmt = update(MediaItem).where(MediaItem.id == media_item_id).values(**update_data)
-        db.execute(stmt)
-        db.commit()
-        print(f"MediaItem {media_item_id} updated successfully with DETAILED AI results and status '{status}'.")
-    except SQLAlchemyError as e:
-        db.rollback()
-        print(f"Database error updating MediaItem {media_item_id}: {e}")
+        ai_result_writer.add(media_item_id, update_data)
+        print(f"MediaItem {media_item_id} AI results with status '{status}' queued for writing.")
     except Exception as e:
         print(f"Unexpected error in update_db_sync_operation for MediaItem {media_item_id}: {e}")
-    finally:
-        db.close()
+
+
+@worker_process_init.connect
+def _reset_db_connections(**kwargs):
+    # Pool processes are forked from the worker: never reuse the parent's connections.
+    sync_engine.dispose(close=False)
+
+
+@worker_process_shutdown.connect
+def _flush_ai_results(**kwargs):
+    ai_result_writer.flush()
 
 @celery_app.task(name="tasks.process_media_with_gemini", bind=True, max_retries=3, default_retry_delay=60)
 def process_media_with_gemini(self, media_item_id: int, file_url: str):
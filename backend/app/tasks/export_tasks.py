@@ -0,0 +1,38 @@
+# E:\Marine_life\backend\app\tasks\export_tasks.py
+
+import os
+import tempfile
+
+from app.celery_app import celery_app
+from app.core.config import settings
+from app.crud.crud_research import ResearchFilters, dataset_rows_query
+from app.db.sync_database import SyncSessionLocal
+from app.services.arrow_export_service import SNAPSHOT_MANIFEST, write_partitioned_snapshot
+from app.services.media_storage_service import delete_old_export_snapshots, upload_export_file
+
+
+@celery_app.task(name="tasks.write_parquet_snapshot")
+def write_parquet_snapshot():
+    """
+    Periodic Celery task that writes the full research dataset as partitioned Parquet
+    files and uploads them to Cloudinary (EXPORT_SNAPSHOT_FOLDER), which the API
+    redirects to under /exports. Rows are fetched with a server-side cursor in
+    EXPORT_BATCH_SIZE batches; the files are staged in a temporary directory.
+    """
+    query = dataset_rows_query(ResearchFilters(), oldest_first=True).execution_options(
+        yield_per=settings.EXPORT_BATCH_SIZE
+    )
+    db = SyncSessionLocal()
+    try:
+        with tempfile.TemporaryDirectory(prefix="parquet-snapshot-") as work_dir:
+            result = db.execute(query)
+            manifest = write_partitioned_snapshot(result.partitions(), work_dir)
+            for relative_path in manifest["files"]:
+                upload_export_file(os.path.join(work_dir, relative_path), relative_path)
+            # Published last, so latest.json never points at files that are not uploaded yet.
+            upload_export_file(os.path.join(work_dir, SNAPSHOT_MANIFEST), SNAPSHOT_MANIFEST)
+        delete_old_export_snapshots(keep=settings.EXPORT_SNAPSHOT_KEEP)
+        print(f"Parquet snapshot {manifest['snapshot_id']} written: {manifest['row_count']} rows in {len(manifest['files'])} files.")
+        return {"snapshot_id": manifest["snapshot_id"], "row_count": manifest["row_count"]}
+    finally:
+        db.close()
@@ -0,0 +1,47 @@
+# E:\Marine_life\backend\app\tasks\gamification_tasks.py
+
+from sqlalchemy import select
+
+from app.celery_app import celery_app
+from app.core.config import settings
+from app.core.leaderboard import leaderboard
+from app.db.sync_database import SyncSessionLocal
+from app.models.user import User as UserModel
+from app.services import badge_service
+
+
+@celery_app.task(name="tasks.rebuild_leaderboard")
+def rebuild_leaderboard():
+    """
+    Periodic Celery task that rebuilds the Redis leaderboard from users.score. The API
+    keeps it current on every award; this creates it the first time and repairs drift
+    (missed writes while Redis was down, users changed outside the API).
+    """
+    if not leaderboard.enabled:
+        return {"users": 0, "skipped": "REDIS_URL not configured"}
+    query = select(UserModel.id, UserModel.score).execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+    db = SyncSessionLocal()
+    try:
+        written = leaderboard.rebuild((row.id, row.score) for row in db.execute(query))
+        print(f"Leaderboard rebuilt: {written} users.")
+        return {"users": written}
+    finally:
+        db.close()
+
+
+@celery_app.task(name="tasks.evaluate_badges")
+def evaluate_badges():
+    """
+    Periodic Celery task that evaluates every badge rule for every user in one set-based
+    UPDATE. Events award badges incrementally; this pass awards newly added rules to
+    users who already qualify and catches anything the incremental path missed.
+    Cached principals pick up the new badges within AUTH_USER_CACHE_TTL_SECONDS.
+    """
+    db = SyncSessionLocal()
+    try:
+        awarded = db.execute(badge_service.badge_award_statement()).all()
+        db.commit()
+        print(f"Badge evaluation: {len(awarded)} users earned new badges.")
+        return {"users_awarded": len(awarded)}
+    finally:
+        db.close()
@@ -7,6 +7,7 @@ sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
 from app.db.database import AsyncSessionLocal
 from app.models.media import MediaItem
+from app.models.sighting_rollup import SightingRollup
 from sqlalchemy import delete, select
 
 async def delete_all_sightings():
@@ -20,6 +21,7 @@ async def delete_all_sightings():
             return
         # Delete all media items
         await db.execute(delete(MediaItem))
+        await db.execute(delete(SightingRollup))
         await db.commit()
         print(f"✅ Deleted {count} sightings from the database.")
 
@@ -0,0 +1,22 @@
+import asyncio
+import sys
+import os
+
+# Add the project root to the path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from app.db.database import AsyncSessionLocal
+from app.services.rollup_service import rebuild_rollups
+
+async def rebuild_all_rollups():
+    """Recompute the sighting_rollups table from media_items (e.g. after changing ROLLUP_CELL_DEGREES)."""
+    async with AsyncSessionLocal() as db:
+        try:
+            written = await rebuild_rollups(db)
+            print(f"✅ Rebuilt sighting rollups: {written} rows written.")
+        except Exception as e:
+            await db.rollback()
+            print(f"❌ Error rebuilding rollups: {e}")
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_all_rollups()) 
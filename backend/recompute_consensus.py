@@ -0,0 +1,45 @@
+import argparse
+import asyncio
+import sys
+import os
+import time
+
+# Add the project root to the path
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from app.db.database import AsyncSessionLocal
+from app.services.validation_service import CONSENSUS_FIELDS, recompute_all_consensus
+
+async def recompute(dry_run: bool, show: int):
+    """Recompute community consensus for every sighting (e.g. after changing CONSENSUS_THRESHOLD)."""
+    async with AsyncSessionLocal() as db:
+        try:
+            started = time.perf_counter()
+            changes = await recompute_all_consensus(db, dry_run=dry_run)
+            elapsed = time.perf_counter() - started
+        except Exception as e:
+            await db.rollback()
+            print(f"❌ Error recomputing consensus: {e}")
+            return
+
+    for change in changes[:show]:
+        diff = ", ".join(
+            f"{field}: {change['before'][field]!r} -> {change['after'][field]!r}"
+            for field in CONSENSUS_FIELDS
+            if change["before"][field] != change["after"][field]
+        )
+        print(f"  MediaItem {change['media_item_id']}: {diff}")
+    if len(changes) > show:
+        print(f"  ... and {len(changes) - show} more")
+
+    if dry_run:
+        print(f"✅ Dry run: {len(changes)} sightings would change ({elapsed:.1f}s). Nothing was written.")
+    else:
+        print(f"✅ Recomputed consensus: {len(changes)} sightings updated ({elapsed:.1f}s).")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=recompute.__doc__)
+    parser.add_argument("--dry-run", action="store_true", help="Only print the changes, do not write them.")
+    parser.add_argument("--show", type=int, default=50, help="Number of changed sightings to print.")
+    args = parser.parse_args()
+    asyncio.run(recompute(args.dry_run, args.show))
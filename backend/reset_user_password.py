@@ -21,7 +21,7 @@ async def reset_password_and_make_superuser(username: str, new_password: str):
         if not user:
             print(f"❌ User '{username}' not found.")
             return
-        hashed_password = get_password_hash(new_password)
+        hashed_password = await get_password_hash(new_password)
         await db.execute(
             text("UPDATE users SET hashed_password = :hashed_password WHERE username = :username"),
             {"hashed_password": hashed_password, "username": username}
@@ -0,0 +1,46 @@
+"""
+Shared test setup.
+
+Tests using the `test_database` fixture run against a dedicated, disposable PostgreSQL
+database named by TEST_POSTGRES_DB (server, port and credentials from the app settings,
+or TEST_POSTGRES_SERVER / TEST_POSTGRES_PORT). It is migrated to head before the first
+such test; without TEST_POSTGRES_DB they are skipped, so they never touch the database
+of the .env file.
+"""
+import os
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_POSTGRES_DB = os.environ.get("TEST_POSTGRES_DB")
+
+if TEST_POSTGRES_DB:
+    # Before any app import: the engines are created from the settings at import time.
+    os.environ["POSTGRES_DB"] = TEST_POSTGRES_DB
+    for name in ("SERVER", "PORT"):
+        if os.environ.get(f"TEST_POSTGRES_{name}"):
+            os.environ[f"POSTGRES_{name}"] = os.environ[f"TEST_POSTGRES_{name}"]
+    os.environ["POSTGRES_REPLICA_SERVER"] = ""  # Every read must see the test's own writes
+    os.environ["REDIS_URL"] = ""  # Nor may caches, rate limits or the leaderboard reach a shared Redis
+
+
+@pytest.fixture(scope="session")
+def test_database():
+    """The sync engine, on the TEST_POSTGRES_DB database migrated to head."""
+    if not TEST_POSTGRES_DB:
+        pytest.skip("TEST_POSTGRES_DB is not set (a disposable PostgreSQL database for the tests)")
+
+    from alembic import command
+    from alembic.config import Config
+
+    from app.core.config import settings
+    from app.db.sync_database import sync_engine
+
+    with pytest.MonkeyPatch.context() as patch:
+        # alembic/env.py builds its URL from the environment only
+        for name in ("SERVER", "PORT", "USER", "PASSWORD", "DB"):
+            patch.setenv(f"POSTGRES_{name}", str(getattr(settings, f"POSTGRES_{name}")))
+        config = Config()
+        config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+        command.upgrade(config, "head")
+    return sync_engine
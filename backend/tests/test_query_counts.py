@@ -0,0 +1,137 @@
+"""
+Query-count budgets of the hot endpoints: a change that adds queries to them (an N+1
+loop, an extra refresh) fails here.
+
+The endpoint tests need TEST_POSTGRES_DB (see conftest.py). They register one user,
+upload and vote through the API, and delete all of it again (through the delete
+endpoint, so the rollups are decremented). Storage and the Celery broker are replaced
+by fakes. Run from backend/:
+
+    TEST_POSTGRES_DB=marine_life_test python -m pytest -q tests
+"""
+import contextlib
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, delete, select, text
+
+from app.api.v1.endpoints import media as media_endpoints
+from app.core.config import settings
+from app.db.query_stats import assert_max_queries, instrument_engine
+from app.main import app
+from app.models.media import MediaItem
+from app.models.user import User
+from app.models.validation_vote import ValidationVote
+
+# Budgets per request, as measured on PostgreSQL. Lower them when an endpoint gets
+# cheaper; raise them only on purpose.
+MAX_QUERIES_MEDIA_LIST = 1
+MAX_QUERIES_UPLOAD = 6
+MAX_QUERIES_VOTE = 8
+
+
+# --- assert_max_queries itself (no database server needed) ---
+
+@pytest.fixture
+def sqlite_engine():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_assert_max_queries_counts_statements(sqlite_engine):
+    with assert_max_queries(2) as captured:
+        with sqlite_engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT :value"), {"value": "secret"})
+    assert captured.count == 2
+    assert captured.statements == ["SELECT 1", "SELECT ?"]
+
+
+def test_assert_max_queries_fails_over_budget(sqlite_engine):
+    with pytest.raises(AssertionError, match=r"at most 1 queries, 2 were executed"):
+        with assert_max_queries(1):
+            with sqlite_engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+                connection.execute(text("SELECT 2"))
+
+
+# --- Endpoints ---
+
+@pytest.fixture(scope="module")
+def client(test_database):
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+        patch.setattr(settings, "LOAD_SHED_ENABLED", False)
+        with TestClient(app) as test_client:
+            yield test_client
+
+
+@pytest.fixture(scope="module")
+def auth_headers(client, test_database):
+    username = f"qc_{uuid.uuid4().hex[:12]}"
+    password = "query-count-test"
+    response = client.post(
+        f"{settings.API_V1_STR}/users/register",
+        json={"username": username, "email": f"{username}@example.com", "password": password},
+    )
+    assert response.status_code == 201, response.text
+    user_id = response.json()["id"]
+    response = client.post(f"{settings.API_V1_STR}/users/login", data={"username": username, "password": password})
+    assert response.status_code == 200, response.text
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    yield headers
+
+    with test_database.connect() as connection:
+        media_item_ids = connection.execute(select(MediaItem.id).where(MediaItem.user_id == user_id)).scalars().all()
+    for media_item_id in media_item_ids:
+        response = client.delete(f"{settings.API_V1_STR}/media/{media_item_id}", headers=headers)
+        assert response.status_code == 204, response.text
+    with test_database.begin() as connection:
+        connection.execute(delete(ValidationVote).where(ValidationVote.user_id == user_id))
+        connection.execute(delete(User).where(User.id == user_id))
+
+
+@pytest.fixture
+def fake_storage_and_broker(monkeypatch):
+    async def upload_file_to_storage(file):
+        return f"https://example.com/media/{uuid.uuid4().hex}.jpg"
+
+    monkeypatch.setattr(media_endpoints, "upload_file_to_storage", upload_file_to_storage)
+    monkeypatch.setattr(media_endpoints.celery_app, "connection_for_write", contextlib.nullcontext)
+    monkeypatch.setattr(media_endpoints.process_media_with_gemini, "apply_async", lambda *args, **kwargs: None)
+
+
+def _upload(client, auth_headers):
+    response = client.post(
+        f"{settings.API_V1_STR}/media/upload",
+        headers=auth_headers,
+        files={"file": ("reef.jpg", b"\xff\xd8\xff\xe0 not really a jpeg", "image/jpeg")},
+        data={"latitude": "12.5", "longitude": "-45.25", "description": "query count test"},
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def test_media_list_query_budget(client):
+    with assert_max_queries(MAX_QUERIES_MEDIA_LIST):
+        response = client.get(f"{settings.API_V1_STR}/media/", params={"limit": 50})
+    assert response.status_code == 200
+
+
+def test_upload_query_budget(client, auth_headers, fake_storage_and_broker):
+    with assert_max_queries(MAX_QUERIES_UPLOAD):
+        _upload(client, auth_headers)
+
+
+def test_vote_query_budget(client, auth_headers, fake_storage_and_broker):
+    item = _upload(client, auth_headers)
+    with assert_max_queries(MAX_QUERIES_VOTE):
+        response = client.post(
+            f"{settings.API_V1_STR}/validation/media/{item['id']}/validate",
+            headers=auth_headers,
+            json={"vote_on_species": True, "vote_on_health": True},
+        )
+    assert response.status_code == 201, response.text
@@ -0,0 +1,146 @@
+"""
+Query-plan regression tests: each hot query, built by the same function its endpoint or
+task runs, must be answerable from the index added for it. A change to a query that
+stops it from using its index fails here.
+
+Needs TEST_POSTGRES_DB (see conftest.py). Synthetic users and media items are inserted
+and ANALYZEd inside a transaction that is rolled back at the end, so the planner sees a
+realistic table and the database is left as it was. Sequential scans are disabled, so
+each test shows whether the index is *usable*, independent of the table size.
+"""
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy.future import select
+
+from app.crud.crud_media import map_points_query, media_items_query, validation_queue_query
+from app.crud.crud_research import ResearchFilters, dataset_rows_query, research_page_query, research_rows_query
+from app.crud.crud_user import leaderboard_query, leaderboard_rank_query
+from app.crud.pagination import encode_cursor
+from app.models.media import MediaItem
+
+CURSOR = encode_cursor(datetime(2025, 1, 1, tzinfo=timezone.utc), 1000)
+
+# 500 users and 50,000 media items: 300 species, 5% undated, 2% not yet analyzed by the AI,
+# a third validated by the community.
+SEED_SQL = """
+INSERT INTO users (username, email, hashed_password, score, earned_badges)
+SELECT 'plan_user_' || i, 'plan_user_' || i || '@example.com', 'x', mod(i * 37, 1000), '{}'
+FROM generate_series(1, 500) AS i;
+
+INSERT INTO media_items (
+    user_id, file_url, latitude, longitude, sighting_timestamp, created_at, updated_at,
+    species_ai_prediction, health_status_ai_prediction, validated_species, validated_health_status,
+    ai_processing_status, ai_confidence_score, validation_score, is_validated_by_community, validation_priority
+)
+SELECT
+    (SELECT min(id) FROM users WHERE starts_with(username, 'plan_user_')) + mod(i, 500),
+    'https://example.com/' || i || '.jpg',
+    -60 + mod(i * 7919, 12000) / 100.0,
+    -180 + mod(i * 104729, 36000) / 100.0,
+    CASE WHEN mod(i, 20) <> 0 THEN timestamptz '2023-01-01' + mod(i * 613, 1000) * interval '1 day' + i * interval '1 second' END,
+    timestamptz '2023-01-01' + i * interval '30 minutes',
+    timestamptz '2023-01-01' + i * interval '30 minutes',
+    'Species ' || mod(i * 31, 300),
+    (ARRAY['Healthy', 'Bleached', 'Diseased', 'Injured', 'Unknown'])[1 + mod(i, 5)],
+    CASE WHEN mod(i, 3) = 0 THEN 'Species ' || mod(i * 17, 300) END,
+    CASE WHEN mod(i, 3) = 0 THEN (ARRAY['Healthy', 'Bleached', 'Diseased'])[1 + mod(i, 3)] END,
+    CASE WHEN mod(i, 50) = 0 THEN 'pending' ELSE 'completed' END,
+    mod(i, 100) / 100.0, 0, mod(i, 3) = 0, mod(i, 100) / 100.0
+FROM generate_series(1::bigint, 50000) AS i;
+
+ANALYZE users;
+ANALYZE media_items;
+"""
+
+
+@pytest.fixture(scope="module")
+def planner(test_database):
+    with test_database.connect() as connection:
+        transaction = connection.begin()
+        connection.exec_driver_sql(SEED_SQL)
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        yield connection
+        transaction.rollback()
+
+
+def _index_names(plan_node: dict) -> set:
+    names = {plan_node["Index Name"]} if "Index Name" in plan_node else set()
+    for child in plan_node.get("Plans", []):
+        names |= _index_names(child)
+    return names
+
+
+def indexes_used(connection, query) -> set:
+    compiled = query.compile(dialect=connection.dialect, compile_kwargs={"render_postcompile": True})
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar_one()
+    return _index_names(plan[0]["Plan"])
+
+
+# (test id, query, index that must appear in its plan)
+PLAN_CASES = [
+    ("media list, first page (GET /media)", media_items_query(), "ix_media_items_created_at_id"),
+    ("media list, next page (GET /media)", media_items_query(cursor=CURSOR), "ix_media_items_created_at_id"),
+    ("user media (GET /media/user/{id}, /users/me/media)",
+     media_items_query(user_id=1, cursor=CURSOR), "ix_media_items_user_id_created_at_id"),
+    ("map, first page (GET /map/data)", map_points_query(), "ix_media_items_sighting_timestamp_id"),
+    ("map, next page (GET /map/data)", map_points_query(cursor=CURSOR), "ix_media_items_sighting_timestamp_id"),
+    ("research page (GET /research/data)",
+     research_page_query(ResearchFilters(), cursor=CURSOR), "ix_media_items_sighting_timestamp_id"),
+    # Exports stream every row; the plan of their first partition is what matters
+    ("research export (GET /research/export)",
+     research_rows_query(ResearchFilters()).limit(1000), "ix_media_items_sighting_timestamp_id"),
+    ("dataset snapshot, oldest first (tasks.write_parquet_snapshot)",
+     dataset_rows_query(ResearchFilters(), oldest_first=True).limit(1000), "ix_media_items_sighting_timestamp_id"),
+    # No endpoint filters on the AI status yet: the partial index serves ad-hoc status sweeps
+    ("items with unfinished AI analysis",
+     select(MediaItem.id).filter(MediaItem.ai_processing_status != "completed").order_by(MediaItem.updated_at),
+     "ix_media_items_ai_unfinished"),
+    ("validation queue (GET /validation/queue)", validation_queue_query(user_id=1), "ix_media_items_validation_queue"),
+    ("leaderboard page (GET /gamification/leaderboard)", leaderboard_query(), "ix_users_score_id"),
+    ("leaderboard rank, SQL fallback", leaderboard_rank_query(100, 1), "ix_users_score_id"),
+]
+
+# Text searches, with terms matching few rows (a term matching a large share of the
+# table is rightly answered by walking the ordering index instead).
+SEARCH_CASES = [
+    *[
+        (f"media species search, {mode} (GET /media?species_filter=)",
+         media_items_query(species_filter="dolphin", species_match=mode), "ix_media_items_species_ai_prediction_trgm")
+        for mode in ("exact", "prefix", "contains", "fuzzy")
+    ],
+    *[
+        (f"research species search, {mode} (GET /research/data?species=)",
+         research_page_query(ResearchFilters(species="dolphin", match=mode)), "ix_media_items_effective_species_trgm")
+        for mode in ("contains", "fuzzy")
+    ],
+    # Under the C collation the btree on lower() answers LIKE 'term%' too
+    ("research species search, prefix (GET /research/data?species=)",
+     research_page_query(ResearchFilters(species="dolphin", match="prefix")),
+     ("ix_media_items_effective_species_trgm", "ix_media_items_effective_species_lower")),
+    ("research health search (GET /research/data?health_status=)",
+     research_page_query(ResearchFilters(health_status="necrosis")), "ix_media_items_effective_health_trgm"),
+    ("map species search (GET /map/data?species=)",
+     map_points_query(species="dolphin"), "ix_media_items_effective_species_trgm"),
+    ("research exact species (GET /research/data?match=exact)",
+     research_page_query(ResearchFilters(species="dolphin", match="exact")),
+     ("ix_media_items_effective_species_lower", "ix_media_items_effective_species_lower_sighting_timestamp")),
+    ("research exact species + time range (GET /research/data?match=exact&date_from=)",
+     research_page_query(ResearchFilters(species="dolphin", match="exact", date_from=datetime(2025, 1, 1, tzinfo=timezone.utc))),
+     "ix_media_items_effective_species_lower_sighting_timestamp"),
+    ("research export, exact species + time range (GET /research/export)",
+     research_rows_query(ResearchFilters(species="dolphin", match="exact", date_from=datetime(2025, 1, 1, tzinfo=timezone.utc))),
+     "ix_media_items_effective_species_lower_sighting_timestamp"),
+]
+
+
+@pytest.mark.parametrize(
+    "query, index",
+    [case[1:] for case in PLAN_CASES + SEARCH_CASES],
+    ids=[case[0] for case in PLAN_CASES + SEARCH_CASES],
+)
+def test_query_uses_index(planner, query, index):
+    """`index` is the index the plan must use, or a tuple of indexes any of which will do."""
+    accepted = {index} if isinstance(index, str) else set(index)
+    used = indexes_used(planner, query)
+    assert used & accepted, f"expected {' or '.join(sorted(accepted))}, plan uses {sorted(used) or 'no index'}"